@@ -0,0 +1,144 @@
+"""baseline
+
+Esquema existente antes de usar Alembic. En bases ya creadas basta con
+`alembic stamp 5a1e0c3d9b21`.
+
+Revision ID: 5a1e0c3d9b21
+Revises: 
+Create Date: 2026-10-19 17:01:43.228157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1e0c3d9b21'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Los enums se guardan por nombre de miembro (type1, type2, ...), igual que en los modelos
+    tipo_usuario = sa.Enum('type1', 'type2', 'type3', name='tipoenum')
+    tipo_indicador = sa.Enum('type1', 'type2', 'type3', name='tipoenumindicador')
+    tipo_entrada = sa.Enum('type1', 'type2', name='tipoenumentrada')
+
+    op.create_table(
+        'indicadores',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('nombre', sa.String(), nullable=False),
+        sa.Column('tipo', tipo_indicador, nullable=False),
+        sa.Column('descripcion', sa.String(), nullable=True),
+    )
+    op.create_table(
+        'entradas',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('nombre', sa.String()),
+        sa.Column('tipo', tipo_entrada),
+        sa.Column('descripcion', sa.String(), nullable=True),
+    )
+    op.create_table(
+        'procesos',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('nombre', sa.String(), nullable=False),
+        sa.Column('num_etapas', sa.Integer()),
+        sa.Column('descripcion', sa.String(), nullable=True),
+    )
+    op.create_table(
+        'etapas',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('num_etapa', sa.BigInteger(), nullable=False),
+        sa.Column('id_proceso', sa.BigInteger(), sa.ForeignKey('procesos.id')),
+    )
+    op.create_table(
+        'usuario',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('nombre', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False, unique=True),
+        sa.Column('tipo', tipo_usuario, nullable=False),
+        sa.Column('password', sa.String(), nullable=True),
+    )
+    op.create_table(
+        'etapa_indicadores',
+        sa.Column('id_etapa', sa.BigInteger(), sa.ForeignKey('etapas.id'), primary_key=True),
+        sa.Column('id_indicador_entrada', sa.BigInteger(), sa.ForeignKey('indicadores.id'), primary_key=True),
+    )
+    op.create_table(
+        'etapas_entradas',
+        sa.Column('id_etapa', sa.BigInteger(), sa.ForeignKey('etapas.id'), primary_key=True),
+        sa.Column('id_entrada', sa.BigInteger(), sa.ForeignKey('entradas.id'), primary_key=True),
+    )
+    op.create_table(
+        'etapas_salidas',
+        sa.Column('id_etapa', sa.BigInteger(), sa.ForeignKey('etapas.id'), primary_key=True),
+        sa.Column('id_entrada', sa.BigInteger(), sa.ForeignKey('entradas.id'), primary_key=True),
+    )
+    op.create_table(
+        'indicadores_entradas',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('id_entrada', sa.BigInteger(), sa.ForeignKey('entradas.id'), nullable=False),
+        sa.Column('id_indicador', sa.BigInteger(), sa.ForeignKey('indicadores.id')),
+    )
+    op.create_table(
+        'registro',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('id_usuario', sa.BigInteger(), sa.ForeignKey('usuario.id'), nullable=False),
+        sa.Column('descripcion', sa.String()),
+        sa.Column('creado', sa.TIMESTAMP()),
+        sa.Column('modificado', sa.TIMESTAMP()),
+    )
+    op.create_table(
+        'registro_entradas',
+        sa.Column('id_registro', sa.BigInteger(), sa.ForeignKey('registro.id'), primary_key=True),
+        sa.Column('id_entrada', sa.BigInteger(), sa.ForeignKey('entradas.id')),
+    )
+    op.create_table(
+        'registro_indicadores',
+        sa.Column('id_registro', sa.BigInteger(), sa.ForeignKey('registro.id'), primary_key=True),
+        sa.Column('id_indicador', sa.BigInteger(), sa.ForeignKey('indicadores.id')),
+    )
+    op.create_table(
+        'registro_procesos',
+        sa.Column('id_registro', sa.BigInteger(), sa.ForeignKey('registro.id'), primary_key=True),
+        sa.Column('id_proceso', sa.BigInteger(), sa.ForeignKey('procesos.id')),
+    )
+    op.create_table(
+        'procesos_ejecutados',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('id_proceso', sa.BigInteger(), sa.ForeignKey('procesos.id'), nullable=False),
+        sa.Column('no_conformidades', sa.Integer()),
+        sa.Column('conformidades', sa.Integer()),
+        sa.Column('num_etapas_con_conformidades', sa.Integer()),
+        sa.Column('tasa_de_exito', sa.Float()),
+        sa.Column('cantidad_salida', sa.Float()),
+        sa.Column('cantidad_entrada', sa.Float()),
+    )
+    op.create_table(
+        'materiales',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('id_entrada', sa.BigInteger(), sa.ForeignKey('entradas.id'), nullable=False),
+        sa.Column('cantidad_entrada', sa.Float()),
+        sa.Column('cantidad_salida', sa.Float()),
+        sa.Column('usos', sa.Integer()),
+    )
+    op.create_table(
+        'registro_proceso_ejecutado',
+        sa.Column('id_proceso_ejecutado', sa.BigInteger(), sa.ForeignKey('procesos_ejecutados.id'), primary_key=True),
+        sa.Column('id_registro', sa.BigInteger(), sa.ForeignKey('registro.id'), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    for tabla in (
+        'registro_proceso_ejecutado', 'materiales', 'procesos_ejecutados', 'registro_procesos',
+        'registro_indicadores', 'registro_entradas', 'registro', 'indicadores_entradas',
+        'etapas_salidas', 'etapas_entradas', 'etapa_indicadores', 'usuario', 'etapas',
+        'procesos', 'entradas', 'indicadores',
+    ):
+        op.drop_table(tabla)
+    for enum in ('tipoenum', 'tipoenumindicador', 'tipoenumentrada'):
+        sa.Enum(name=enum).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,63 @@
+"""registro indice
+
+Índice de auditoría unificado (tipo_entidad, id_entidad, id_registro, creado)
+y relleno a partir de las cuatro tablas de asociación.
+
+Revision ID: 8c4f2b7e1a63
+Revises: 5a1e0c3d9b21
+Create Date: 2026-10-19 17:01:43.228157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f2b7e1a63'
+down_revision: Union[str, None] = '5a1e0c3d9b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tabla de asociación y columna de la entidad para cada tipo del índice
+ASOCIACIONES = (
+    ('proceso', 'registro_procesos', 'id_proceso'),
+    ('indicador', 'registro_indicadores', 'id_indicador'),
+    ('entrada', 'registro_entradas', 'id_entrada'),
+    ('proceso_ejecutado', 'registro_proceso_ejecutado', 'id_proceso_ejecutado'),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'registro_indice',
+        sa.Column('id_registro', sa.BigInteger(), sa.ForeignKey('registro.id'), primary_key=True),
+        sa.Column('tipo_entidad', sa.Enum('proceso', 'indicador', 'entrada', 'proceso_ejecutado', name='tipoenumentidad'), nullable=False),
+        sa.Column('id_entidad', sa.BigInteger(), nullable=False),
+        sa.Column('creado', sa.TIMESTAMP(), nullable=False),
+    )
+
+    for tipo, tabla, columna in ASOCIACIONES:
+        op.execute(
+            f"""
+            INSERT INTO registro_indice (id_registro, tipo_entidad, id_entidad, creado)
+            SELECT a.id_registro, '{tipo}', a.{columna}, COALESCE(r.creado, now())
+            FROM {tabla} a
+            JOIN registro r ON r.id = a.id_registro
+            WHERE a.{columna} IS NOT NULL
+            ON CONFLICT (id_registro) DO NOTHING
+            """
+        )
+
+    # Se crean después del relleno para no mantenerlos fila a fila
+    op.create_index('ix_registro_indice_entidad', 'registro_indice', ['tipo_entidad', 'id_entidad', 'creado'])
+    op.create_index('ix_registro_indice_creado', 'registro_indice', ['creado'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_registro_indice_creado', table_name='registro_indice')
+    op.drop_index('ix_registro_indice_entidad', table_name='registro_indice')
+    op.drop_table('registro_indice')
+    sa.Enum(name='tipoenumentidad').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,105 @@
+"""indices rendimiento
+
+Índices para las llaves foráneas y filtros de las consultas frecuentes, creados
+con CREATE INDEX CONCURRENTLY para no bloquear escrituras en producción.
+
+Las columnas que ya son la primera columna de una llave primaria compuesta no
+necesitan otro índice: etapas_entradas.id_etapa, etapa_indicadores.id_etapa y
+registro_proceso_ejecutado.id_proceso_ejecutado. registro.creado ya tiene
+ix_registro_creado. En su lugar se indexa registro_proceso_ejecutado.id_registro,
+el lado del JOIN que sí recorre la tabla desde registro.
+
+Revision ID: b6d2e8f4a1c7
+Revises: f3a9c1d5e7b2
+Create Date: 2026-10-19 18:41:09.305218
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2e8f4a1c7'
+down_revision: Union[str, None] = 'f3a9c1d5e7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nombre, tabla, columnas, único)
+INDICES = (
+    ('ix_etapas_id_proceso', 'etapas', ['id_proceso'], False),
+    ('ix_registro_proceso_ejecutado_id_registro', 'registro_proceso_ejecutado', ['id_registro'], False),
+    ('ux_materiales_id_entrada', 'materiales', ['id_entrada'], True),
+)
+
+
+def borrar_invalido(nombre: str):
+    # Un CREATE INDEX CONCURRENTLY interrumpido deja el índice marcado como inválido; se recrea
+    if context.is_offline_mode():
+        return
+    invalido = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :nombre AND NOT i.indisvalid"
+    ), {"nombre": nombre}).scalar()
+    if invalido:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+
+
+def comprobar_materiales_unicos():
+    if context.is_offline_mode():
+        return
+    duplicados = op.get_bind().execute(sa.text(
+        "SELECT id_entrada FROM materiales GROUP BY id_entrada HAVING count(*) > 1"
+    )).scalars().all()
+    if duplicados:
+        raise RuntimeError(
+            f"materiales tiene filas repetidas para id_entrada {duplicados}; "
+            "consolídelas antes de crear ux_materiales_id_entrada"
+        )
+
+
+def particiones_registro():
+    return op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'registro'::regclass ORDER BY c.relname"
+    )).scalars().all()
+
+
+def indice_registro_usuario():
+    """registro está particionada y Postgres no admite CONCURRENTLY sobre la tabla padre: se crea el índice
+    solo en el padre (inválido), cada partición lo construye de forma concurrente y se adjunta."""
+    if context.is_offline_mode():
+        op.create_index('ix_registro_id_usuario', 'registro', ['id_usuario'])
+        return
+    op.execute("CREATE INDEX IF NOT EXISTS ix_registro_id_usuario ON ONLY registro (id_usuario)")
+    for particion in particiones_registro():
+        nombre = f"{particion}_id_usuario_idx"
+        borrar_invalido(nombre)
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {particion} (id_usuario)")
+        adjunto = op.get_bind().execute(sa.text(
+            "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:nombre)"
+        ), {"nombre": nombre}).scalar()
+        if not adjunto:
+            op.execute(f"ALTER INDEX ix_registro_id_usuario ATTACH PARTITION {nombre}")
+
+
+def upgrade() -> None:
+    comprobar_materiales_unicos()
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas, unico in INDICES:
+            borrar_invalido(nombre)
+            op.create_index(
+                nombre, tabla, columnas, unique=unico,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        indice_registro_usuario()
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        # El índice particionado se borra junto con los de sus particiones (sin CONCURRENTLY)
+        op.drop_index('ix_registro_id_usuario', table_name='registro', if_exists=True)
+        for nombre, tabla, _, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,119 @@
+"""particionar registro
+
+Convierte registro en una tabla particionada por rango mensual sobre creado.
+La llave primaria pasa a ser (id, creado) y las tablas de asociación pierden
+su llave foránea hacia registro.id (Postgres exige la columna de partición
+en cualquier restricción única referenciada). Se crea una partición por mes
+desde el registro más antiguo hasta unos meses en el futuro, más una
+partición DEFAULT para filas fuera de rango; la aplicación crea las futuras.
+
+Revision ID: d27b6e4a0f95
+Revises: 8c4f2b7e1a63
+Create Date: 2026-10-19 17:24:10.517392
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27b6e4a0f95'
+down_revision: Union[str, None] = '8c4f2b7e1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tablas que referencian registro.id
+REFERENCIAS = (
+    'registro_entradas', 'registro_indicadores', 'registro_procesos',
+    'registro_proceso_ejecutado', 'registro_indice',
+)
+MESES_ADELANTE = 3
+
+
+def sumar_meses(fecha: date, meses: int) -> date:
+    total = fecha.year * 12 + fecha.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    for tabla in REFERENCIAS:
+        op.execute(f"ALTER TABLE {tabla} DROP CONSTRAINT IF EXISTS {tabla}_id_registro_fkey")
+
+    op.execute("ALTER TABLE registro RENAME TO registro_legacy")
+    op.execute("ALTER TABLE registro_legacy RENAME CONSTRAINT registro_pkey TO registro_legacy_pkey")
+    op.execute("ALTER SEQUENCE registro_id_seq OWNED BY NONE")
+
+    op.execute(
+        """
+        CREATE TABLE registro (
+            id BIGINT NOT NULL DEFAULT nextval('registro_id_seq'),
+            id_usuario BIGINT NOT NULL REFERENCES usuario (id),
+            descripcion VARCHAR,
+            creado TIMESTAMP NOT NULL DEFAULT now(),
+            modificado TIMESTAMP DEFAULT now(),
+            PRIMARY KEY (id, creado)
+        ) PARTITION BY RANGE (creado)
+        """
+    )
+    op.execute("ALTER SEQUENCE registro_id_seq OWNED BY registro.id")
+
+    # Particiones mensuales desde el registro más antiguo hasta MESES_ADELANTE meses en el futuro
+    hoy = date.today().replace(day=1)
+    minimo = None
+    if not context.is_offline_mode():
+        minimo = op.get_bind().execute(sa.text("SELECT min(creado) FROM registro_legacy")).scalar()
+    mes = date(minimo.year, minimo.month, 1) if minimo else hoy
+    while mes <= sumar_meses(hoy, MESES_ADELANTE):
+        siguiente = sumar_meses(mes, 1)
+        op.execute(
+            f"CREATE TABLE registro_y{mes.year:04d}m{mes.month:02d} PARTITION OF registro "
+            f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{siguiente.isoformat()}')"
+        )
+        mes = siguiente
+    op.execute("CREATE TABLE registro_default PARTITION OF registro DEFAULT")
+
+    op.execute(
+        """
+        INSERT INTO registro (id, id_usuario, descripcion, creado, modificado)
+        SELECT id, id_usuario, descripcion, COALESCE(creado, now()), modificado
+        FROM registro_legacy
+        """
+    )
+    op.execute("DROP TABLE registro_legacy")
+
+    # Índice particionado para las consultas de "últimos registros" por fecha
+    op.create_index('ix_registro_creado', 'registro', ['creado'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_registro_creado', table_name='registro')
+    op.execute("ALTER TABLE registro RENAME TO registro_particionado")
+    op.execute("ALTER SEQUENCE registro_id_seq OWNED BY NONE")
+    op.execute(
+        """
+        CREATE TABLE registro (
+            id BIGINT PRIMARY KEY DEFAULT nextval('registro_id_seq'),
+            id_usuario BIGINT NOT NULL REFERENCES usuario (id),
+            descripcion VARCHAR,
+            creado TIMESTAMP,
+            modificado TIMESTAMP
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE registro_id_seq OWNED BY registro.id")
+    op.execute(
+        """
+        INSERT INTO registro (id, id_usuario, descripcion, creado, modificado)
+        SELECT id, id_usuario, descripcion, creado, modificado FROM registro_particionado
+        """
+    )
+    op.execute("DROP TABLE registro_particionado")
+
+    for tabla in REFERENCIAS:
+        op.execute(
+            f"ALTER TABLE {tabla} ADD CONSTRAINT {tabla}_id_registro_fkey "
+            f"FOREIGN KEY (id_registro) REFERENCES registro (id)"
+        )
@@ -0,0 +1,48 @@
+"""correo salida
+
+Bandeja de salida de correos con reintentos (una fila por lote de destinatarios).
+
+Revision ID: f3a9c1d5e7b2
+Revises: d27b6e4a0f95
+Create Date: 2026-10-19 18:02:37.441906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c1d5e7b2'
+down_revision: Union[str, None] = 'd27b6e4a0f95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'correo_salida',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('id_envio', sa.String(32), nullable=False),
+        sa.Column('id_trabajo', sa.String(32), nullable=False),
+        sa.Column('adjunto', sa.String(), nullable=False),
+        sa.Column('asunto', sa.String(), nullable=False),
+        sa.Column('destinatarios', sa.JSON(), nullable=False),
+        sa.Column('estado', sa.Enum('pendiente', 'enviando', 'enviado', 'error', name='estadocorreo'), nullable=False),
+        sa.Column('intentos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('proximo_intento', sa.TIMESTAMP(), nullable=False, server_default=sa.func.now()),
+        sa.Column('ultimo_error', sa.String()),
+        sa.Column('id_proveedor', sa.String()),
+        sa.Column('creado', sa.TIMESTAMP(), server_default=sa.func.now()),
+        sa.Column('enviado', sa.TIMESTAMP()),
+    )
+    op.create_index('ix_correo_salida_pendientes', 'correo_salida', ['estado', 'proximo_intento'])
+    op.create_index('ix_correo_salida_envio', 'correo_salida', ['id_envio'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_correo_salida_envio', table_name='correo_salida')
+    op.drop_index('ix_correo_salida_pendientes', table_name='correo_salida')
+    op.drop_table('correo_salida')
+    sa.Enum(name='estadocorreo').drop(op.get_bind(), checkfirst=True)
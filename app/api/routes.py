@@ -1,5 +1,5 @@
 from fastapi import APIRouter 
-from app.api.v1 import auth, configuration, stadistics, users, inputs, indicators, process, send as email, latex, logs, execution
+from app.api.v1 import auth, configuration, stadistics, users, inputs, indicators, process, send as email, latex, logs, execution, feed, autocompletado
 
 router_api = APIRouter()
 
@@ -14,4 +14,6 @@ router_api.include_router(logs.router, prefix="/logs", tags=["Logs"])
 router_api.include_router(stadistics.router, prefix="/stadistics", tags=["Stadistics"])
 router_api.include_router(email.router, prefix="/email", tags=["Email"])
 router_api.include_router(latex.router, prefix="/latex", tags=["LaTeX"])
+router_api.include_router(feed.router, prefix="/feed", tags=["Feed"])
+router_api.include_router(autocompletado.router, prefix="/autocomplete", tags=["Autocomplete"])
 router_api.include_router(configuration.router)
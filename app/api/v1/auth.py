@@ -5,18 +5,24 @@ from sqlalchemy.orm import Session
 from typing import Annotated
 from app.db.database import get_db
 from app.schemas.user import UserLogin
-from app.utils.jwt import create_access_token
+from app.utils.jwt import cache_tokens, create_access_token
 from app.models.models import Usuario
-from app.utils.crypto import verify_password
+from app.utils.crypto import hash_password_async, needs_rehash, pool_hash, verify_password_async
 
 router = APIRouter()
 
 @router.post("/login")
 async def login(user: UserLogin, db: Annotated[Session, Depends(get_db)]):
     db_user = db.query(Usuario).filter(Usuario.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password):
+    # bcrypt corre en el pool dedicado; el event loop sigue atendiendo otras peticiones
+    if not db_user or not db_user.password or not await verify_password_async(user.password, db_user.password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
+    # Si el costo configurado cambió, se aprovecha la contraseña en claro para rehacer el hash
+    if needs_rehash(db_user.password):
+        db_user.password = await hash_password_async(user.password)
+        db.commit()
+
     token_data = {
         "id": db_user.id,
         "sub": db_user.email,
@@ -24,3 +30,11 @@ async def login(user: UserLogin, db: Annotated[Session, Depends(get_db)]):
     }
     access_token = create_access_token(token_data)
     return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/hash/stats")
+async def hash_stats():
+    return pool_hash.estadisticas()
+
+@router.get("/token/stats")
+async def token_stats():
+    return cache_tokens.estadisticas()
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.services.autocompletado import LIMITE_DEFECTO, LIMITE_MAXIMO, indices
+from app.utils.serializacion import RespuestaJSON
+import asyncio
+
+router = APIRouter()
+
+@router.get("/stats")
+async def estadisticas_autocompletado():
+    return {nombre: indice.estadisticas() for nombre, indice in indices.items()}
+
+@router.get("/{catalogo}")
+async def autocompletar(catalogo: str, q: str, limit: int = LIMITE_DEFECTO, db: Session = Depends(get_db)):
+    # Búsqueda por prefijo sin acentos ni mayúsculas sobre el índice en memoria del worker
+    indice = indices.get(catalogo)
+    if indice is None:
+        raise HTTPException(status_code=404, detail=f"Catálogo no encontrado. Opciones: {', '.join(indices)}")
+    if limit <= 0 or limit > LIMITE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"limit debe estar entre 1 y {LIMITE_MAXIMO}.")
+    # Solo toca la base de datos si el índice no está construido, caducó o hubo escrituras desde la última
+    # consulta; esa lectura (psycopg2, síncrona) va a un hilo para no bloquear el event loop
+    await asyncio.to_thread(indice.refrescar, db)
+    return RespuestaJSON(indice.buscar(q, limit))
@@ -4,7 +4,8 @@ import json
 import os
 from app.dependencies.auth import get_current_user
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_db, metricas_pools
+from app.db.replica import estado_replica
 from app.models.models import Registro, RegistroEntradas, RegistroIndicadores, RegistroProcesos, RegistroProcesoEjecutado, ProcesosEjecutados
 from typing import Optional
 import pytz
@@ -17,7 +18,7 @@ DURACION_HORAS = 1
 RESUMEN_PATH = "data/resumen_dia.json"
 TIMEZONE = pytz.timezone("America/Bogota")  # GMT-5
 
-# Función para verificar si el usuario es admin
+# Función para verificar si el usuario es admin (usa la caché de tokens a través de get_current_user)
 async def get_admin_user(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(
@@ -67,9 +68,8 @@ def generar_resumen_diario(db: Session):
     hoy = ahora.date()
     ayer = hoy - timedelta(days=1)
 
-    # Filtrar registros en base a la zona horaria
-    registros_hoy = db.query(Registro).filter(Registro.creado >= ahora.replace(hour=0, minute=0, second=0, microsecond=0)).all()
-    registros_ayer = db.query(Registro).filter(Registro.creado >= ayer, Registro.creado < ahora.replace(hour=0, minute=0, second=0, microsecond=0)).all()
+    # Los filtros comparan "creado" con fechas sin zona horaria (mismo tipo que la columna)
+    # para que el planificador descarte las particiones de registro fuera del rango
 
     # Contar los registros del día actual desde las tablas de asociación
     resumen_hoy = {
@@ -130,3 +130,15 @@ async def obtener_resumen_del_dia():
     with open(RESUMEN_PATH, 'r') as file:
         resumen = json.load(file)
     return resumen
+
+
+# Estado y métricas de los pools de conexiones de este worker, solo para administradores
+@router.get("/config/db/pool", tags=["Base de datos"])
+async def estado_pools(admin_user: dict = Depends(get_admin_user)):
+    return {nombre: metricas.estadisticas() for nombre, metricas in metricas_pools.items()}
+
+
+# Salud y retraso de la réplica de lectura, solo para administradores
+@router.get("/config/db/replica", tags=["Base de datos"])
+async def estado_replica_lectura(admin_user: dict = Depends(get_admin_user)):
+    return estado_replica.estadisticas()
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Union
-from app.db.database import get_db
-from app.models.models import ProcesosEjecutados, Materiales, Registro, RegistroProcesoEjecutado, RegistroProcesos
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional, Tuple, Union
+from app.db.database import get_async_db
+from app.models.models import ProcesosEjecutados, Materiales, Registro, RegistroProcesoEjecutado, RegistroProcesos, TipoEnumEntidad
 from app.schemas.execution import EjecucionProcesoSchema, EtapaRegistroSchema, EtapaSchema, MaterialSchema, RegistroEjecucionSchema
+from app.services.auditoria import indexar_registro
+from app.services.feed import encolar_evento
+from app.services.planes import Compilado, evaluar_compilado, obtener_plan, validar_ejecucion
+import asyncio
 import json
 import os
 import random
@@ -38,51 +43,57 @@ def guardar_en_json(data: List[dict], filename: str):
         json.dump(existing_data, f, indent=4)
 
 
-def crear_registro_proceso(db: Session, proceso_id: int, descripcion: str, usuario_id: int = 0):
+async def crear_registro_proceso(db: AsyncSession, proceso_id: int, descripcion: str, usuario_id: int = 0):
     """Crea un registro de proceso y asocia el registro a un ID de usuario."""
     new_registro = {
         "id_usuario": usuario_id,
         "descripcion": descripcion
     }
-    result_registro = db.execute(registro_table.insert().values(new_registro))
-    registro_id = result_registro.inserted_primary_key[0]
+    result_registro = await db.execute(
+        registro_table.insert().values(new_registro).returning(registro_table.c.id, registro_table.c.creado)
+    )
+    registro_id, creado = result_registro.one()
     
     new_registro_proceso = {
         "id_registro": registro_id,
         "id_proceso_ejecutado": proceso_id
     }
-    db.execute(registro_procesos_ejecutados_table.insert().values(new_registro_proceso))
+    await db.execute(registro_procesos_ejecutados_table.insert().values(new_registro_proceso))
+    await db.run_sync(indexar_registro, registro_id, creado, TipoEnumEntidad.proceso_ejecutado, proceso_id)
 
-def actualizar_materiales(db: Session, materiales: List[MaterialSchema], es_entrada: bool):
+    # Publica el registro en el feed en vivo cuando la transacción haga commit
+    encolar_evento(db, "registro", {"id": registro_id, "creado": creado, **new_registro, "id_proceso_ejecutado": proceso_id})
+
+async def actualizar_materiales(db: AsyncSession, materiales: List[MaterialSchema], es_entrada: bool):
     """Actualiza los materiales en función de las entradas o salidas."""
+    if not materiales:
+        return
+    # Un solo UPSERT por etapa sobre el índice único de id_entrada; los ids repetidos se suman antes
+    acumulado: Dict[int, Tuple[float, int]] = {}
     for material in materiales:
-        
-        existing_material = db.execute(materiales_table.select().where(materiales_table.c.id_entrada == material.id)).first()
-        
-        if not existing_material:
-
-            new_material = {
-                "id_entrada": material.id,
-                "cantidad_entrada": 0,
-                "cantidad_salida": 0,
-                "usos": 0,
-            }
-            db.execute(materiales_table.insert().values(new_material))
-
-        existing_material = db.execute(materiales_table.select().where(materiales_table.c.id_entrada == material.id)).first()
-        
-        if es_entrada:
-            db.execute(materiales_table.update().where(materiales_table.c.id_entrada == material.id).values(
-                    cantidad_entrada=existing_material.cantidad_entrada + material.value,
-                    usos=existing_material.usos + 1))
-        else:
-            db.execute(materiales_table.update().where(materiales_table.c.id_entrada == material.id).values(
-                    cantidad_salida=existing_material.cantidad_salida + material.value,
-                    usos=existing_material.usos + 1))    
-            
+        valor, usos = acumulado.get(material.id, (0.0, 0))
+        acumulado[material.id] = (valor + material.value, usos + 1)
+
+    columna = "cantidad_entrada" if es_entrada else "cantidad_salida"
+    otra = "cantidad_salida" if es_entrada else "cantidad_entrada"
+    query = pg_insert(materiales_table).values([
+        {"id_entrada": id_entrada, columna: valor, otra: 0, "usos": usos}
+        for id_entrada, (valor, usos) in acumulado.items()
+    ])
+    query = query.on_conflict_do_update(
+        index_elements=[materiales_table.c.id_entrada],
+        set_={
+            columna: materiales_table.c[columna] + query.excluded[columna],
+            "usos": materiales_table.c.usos + query.excluded.usos,
+        },
+    )
+    await db.execute(query)
+
 
 # Ruta del archivo JSON de datos
 DATA_JSON_PATH = "data/data_procesos.json"
+# El archivo se reescribe completo en un hilo; las ejecuciones concurrentes lo hacen de una en una
+lock_json = asyncio.Lock()
 
 from typing import Dict, Union, List
 import random
@@ -116,27 +127,38 @@ def evaluar_indicador(entrada_value: float, indicador: Dict[str, Union[bool, str
             afectado = True
 
     return no_conformidad, afectado
-def procesar_etapa(etapa: EtapaSchema) -> Dict:
+def procesar_etapa(etapa: EtapaSchema, compilados: Optional[Dict[int, Compilado]] = None) -> Dict:
+    """Evalúa una etapa. Con `compilados` (del plan de ejecución) usa el tipo declarado de cada indicador;
+    sin ellos (previsualización) infiere el tipo a partir de los campos enviados."""
     total_no_conformes = 0.0
     total_conformes = 0.0
 
+    # Agrupa indicadores y salidas por entrada para recorrer la etapa una sola vez
+    indicadores_por_entrada = {}
+    for indicador in etapa.indicadores:
+        indicadores_por_entrada.setdefault(indicador.entrada_id, []).append(indicador)
+    salidas_por_id = {}
+    for salida in etapa.salidas:
+        salidas_por_id.setdefault(salida.id, []).append(salida)
+
     for entrada in etapa.entradas:
         entrada_value = entrada.value
         no_conformes = 0.0
 
-        for indicador in etapa.indicadores:
-            if indicador.entrada_id == entrada.id:
+        for indicador in indicadores_por_entrada.get(entrada.id, ()):
+            if compilados is not None:
+                no_conformidad, afectado = evaluar_compilado(compilados[indicador.id], entrada_value)
+            else:
                 no_conformidad, afectado = evaluar_indicador(entrada_value, indicador.dict())
-                no_conformes += no_conformidad
-                indicador.state = afectado  # Asigna el estado de afectación al indicador
+            no_conformes += no_conformidad
+            indicador.state = afectado  # Asigna el estado de afectación al indicador
 
         salida_value = max(0, entrada_value - no_conformes)
         total_no_conformes += no_conformes
         total_conformes += salida_value
 
-        for salida in etapa.salidas:
-            if salida.id == entrada.id:
-                salida.value = salida_value
+        for salida in salidas_por_id.get(entrada.id, ()):
+            salida.value = salida_value
 
     return {
         "conformes": int(total_conformes),
@@ -153,11 +175,19 @@ async def preview(etapa: EtapaSchema):
     return {"preview": resultado}
 
 @router.post("/")
-async def execute_proceso(data: EjecucionProcesoSchema, db: Session = Depends(get_db)):
-    with db.begin():
+async def execute_proceso(data: EjecucionProcesoSchema, db: AsyncSession = Depends(get_async_db)):
+    async with db.begin():
         id_proceso = data.id_proceso
         etapas = data.etapas
 
+        # Valida la ejecución contra el plan compilado del proceso (en caché, sin consultas del catálogo)
+        plan = await db.run_sync(obtener_plan, id_proceso)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Proceso no encontrado")
+        compilados, errores = validar_ejecucion(plan, data)
+        if errores:
+            raise HTTPException(status_code=400, detail=errores)
+
         # Crear un registro inicial en ProcesosEjecutados
         new_proceso_ejecutado = {
             "id_proceso": id_proceso,
@@ -168,7 +198,7 @@ async def execute_proceso(data: EjecucionProcesoSchema, db: Session = Depends(ge
             "cantidad_entrada": sum(entrada.value for etapa in etapas for entrada in etapa.entradas),
             "cantidad_salida": 0  # Esto se actualizará después
         }
-        proceso_ejecutado = db.execute(ProcesosEjecutados.__table__.insert().values(new_proceso_ejecutado))
+        proceso_ejecutado = await db.execute(ProcesosEjecutados.__table__.insert().values(new_proceso_ejecutado))
         proceso_ejecutado_id = proceso_ejecutado.inserted_primary_key[0]
 
         # Inicializamos acumuladores
@@ -186,7 +216,7 @@ async def execute_proceso(data: EjecucionProcesoSchema, db: Session = Depends(ge
         }
 
         for etapa in etapas:
-            resultado_etapa = procesar_etapa(etapa)
+            resultado_etapa = procesar_etapa(etapa, compilados[etapa.num_etapa])
             total_conformes += resultado_etapa["conformes"]
             total_no_conformes += resultado_etapa["no_conformes"]
 
@@ -194,8 +224,8 @@ async def execute_proceso(data: EjecucionProcesoSchema, db: Session = Depends(ge
                 num_etapas_con_conformidades += 1
 
             # Actualizar materiales en función de entradas y salidas
-            actualizar_materiales(db, etapa.entradas, es_entrada=True)
-            actualizar_materiales(db, etapa.salidas, es_entrada=False)
+            await actualizar_materiales(db, etapa.entradas, es_entrada=True)
+            await actualizar_materiales(db, etapa.salidas, es_entrada=False)
 
             etapa_data = {
                 "num_etapa": etapa.num_etapa,
@@ -216,10 +246,11 @@ async def execute_proceso(data: EjecucionProcesoSchema, db: Session = Depends(ge
         data_to_save["no_conformes"] = total_no_conformes
         data_to_save["num_etapas_con_conformidades"] = num_etapas_con_conformidades
         data_to_save["tasa_de_exito"] = tasa_de_exito
-        guardar_en_json([data_to_save], DATA_JSON_PATH)
+        async with lock_json:
+            await asyncio.to_thread(guardar_en_json, [data_to_save], DATA_JSON_PATH)
 
         # Actualizar el registro en ProcesosEjecutados
-        db.execute(
+        await db.execute(
             ProcesosEjecutados.__table__.update()
             .where(ProcesosEjecutados.__table__.c.id == proceso_ejecutado_id)
             .values(
@@ -232,7 +263,17 @@ async def execute_proceso(data: EjecucionProcesoSchema, db: Session = Depends(ge
         )
 
         descripcion = f"Ejecución ID {proceso_ejecutado_id} de proceso ID {id_proceso} con {len(etapas)} etapas."
-        crear_registro_proceso(db, proceso_ejecutado_id, descripcion)
+        await crear_registro_proceso(db, proceso_ejecutado_id, descripcion)
+
+        # Resumen de la ejecución para los tableros conectados al feed
+        encolar_evento(db, "ejecucion", {
+            "id_proceso": id_proceso,
+            "id_proceso_ejecutado": proceso_ejecutado_id,
+            "tasa_de_exito": tasa_de_exito,
+            "conformes": total_conformes,
+            "no_conformes": total_no_conformes,
+            "num_etapas_con_conformidades": num_etapas_con_conformidades,
+        })
 
     return {"message": "Proceso ejecutado y datos guardados correctamente."}
 
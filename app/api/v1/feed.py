@@ -0,0 +1,48 @@
+import asyncio
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.services.feed import broker
+
+router = APIRouter()
+
+# Intervalo para enviar comentarios keep-alive por SSE (en segundos)
+KEEP_ALIVE_SECONDS = 15
+
+@router.get("/stream")
+async def stream_eventos(request: Request):
+    suscripcion = broker.suscribir()
+
+    async def eventos():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    tipo, carga = await asyncio.wait_for(suscripcion.cola.get(), timeout=KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {tipo}\ndata: {carga}\n\n"
+        finally:
+            broker.cancelar(suscripcion)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers=headers)
+
+@router.websocket("/ws")
+async def websocket_eventos(websocket: WebSocket):
+    await websocket.accept()
+    suscripcion = broker.suscribir()
+    try:
+        while True:
+            _, carga = await suscripcion.cola.get()
+            await websocket.send_text(carga)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broker.cancelar(suscripcion)
+
+@router.get("/stats")
+async def estado_feed():
+    return {
+        "suscriptores": len(broker.suscripciones),
+        "descartados": sum(s.descartados for s in broker.suscripciones),
+    }
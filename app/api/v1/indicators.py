@@ -1,10 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
 from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.db.database import get_db  # Importa la función desde db.py
-from app.models.models import Indicadores, Registro, RegistroIndicadores
+from app.db.database import get_db, get_read_db  # Importa la función desde db.py
+from app.models.models import Indicadores, Registro, RegistroIndicadores, TipoEnumEntidad, TipoEnumIndicador
 from app.schemas.indicator import Indicator, IndicatorRead, IndicatorUpdate
-from typing import List
+from app.services.auditoria import indexar_registro
+from app.services.carga_masiva import actualizar_en_lote, crear_en_lote, leer_csv
+from app.services.cache_catalogos import cache_indicadores
+from app.services.feed import encolar_evento
+from app.utils.serializacion import respuesta_lista
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -13,15 +18,18 @@ registro_table = Registro.__table__
 registro_indicadores_table = RegistroIndicadores.__table__
 
 @router.get("/", response_model=List[IndicatorRead])
-async def read_indicators(db: Session = Depends(get_db)):
-    # Ejecuta la consulta y obtén los resultados como un iterable de diccionarios
-    result = db.execute(indicators.select()).mappings()
-    # Utiliza model_validate para validar y crear una lista de IndicatorRead
-    indicators_list = [IndicatorRead.model_validate(row) for row in result]
-    return indicators_list
+async def read_indicators(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    despues_de: Optional[int] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # Catálogo en memoria del worker; paginado por limit/offset o por cursor (despues_de = último id recibido)
+    return cache_indicadores.pagina(db, limit, offset, despues_de, fields)
 
 @router.get("/search/", response_model=List[IndicatorRead])
-async def search_indicators(name: str = None, id: int = None, db: Session = Depends(get_db)):
+async def search_indicators(name: str = None, id: int = None, db: Session = Depends(get_read_db)):
     # Crear la consulta base
     query = select(indicators)
     # Filtrar por nombre y id, si se proporciona
@@ -30,11 +38,10 @@ async def search_indicators(name: str = None, id: int = None, db: Session = Depe
     if id is not None:
         query = query.where(indicators.c.id == id)  # Búsqueda por id
     # Ejecutar la consulta y obtener el resultado
-    result = db.execute(query).mappings()
+    result = db.execute(query).mappings().all()
     # Validar el resultado y devolverlo
-    indicators_list = [IndicatorRead.model_validate(row) for row in result]
-    if indicators_list:
-        return indicators_list
+    if result:
+        return respuesta_lista(IndicatorRead, result)
     else:
         raise HTTPException(status_code=404, detail="Indicator not found")
 
@@ -45,8 +52,10 @@ def crear_registro_indicador(db: Session, indicador_id: int, descripcion: str, u
         "id_usuario": usuario_id,
         "descripcion": descripcion
     }
-    result_registro = db.execute(registro_table.insert().values(new_registro))
-    registro_id = result_registro.inserted_primary_key[0]
+    result_registro = db.execute(
+        registro_table.insert().values(new_registro).returning(registro_table.c.id, registro_table.c.creado)
+    )
+    registro_id, creado = result_registro.one()
     
     # Crear el registro para el indicador
     new_registro_indicador = {
@@ -54,6 +63,10 @@ def crear_registro_indicador(db: Session, indicador_id: int, descripcion: str, u
         "id_indicador": indicador_id
     }
     db.execute(registro_indicadores_table.insert().values(new_registro_indicador))
+    indexar_registro(db, registro_id, creado, TipoEnumEntidad.indicador, indicador_id)
+
+    # Publica el registro en el feed en vivo cuando la transacción haga commit
+    encolar_evento(db, "registro", {"id": registro_id, "creado": creado, **new_registro, "id_indicador": indicador_id})
     db.commit()
 
 @router.post("/", response_model=IndicatorRead)
@@ -106,3 +119,24 @@ async def update_indicator(input: IndicatorUpdate, db: Session = Depends(get_db)
         db.rollback()  # Revierte la transacción en caso de error
         raise HTTPException(status_code=500, detail="Error al actualizar el indicador y su registro")
 
+
+# Carga masiva: valida todo el lote antes de escribir y guarda las filas válidas junto con su auditoría
+# en una sola transacción. Con todo_o_nada=true cualquier fila inválida cancela el lote completo.
+@router.post("/bulk")
+async def create_indicadores_bulk(filas: List[dict], todo_o_nada: bool = False, db: Session = Depends(get_db)):
+    return crear_en_lote(db, Indicadores, Indicator, TipoEnumIndicador, TipoEnumEntidad.indicador, "INDICADOR", filas, todo_o_nada)
+
+
+@router.put("/bulk")
+async def update_indicadores_bulk(filas: List[dict], todo_o_nada: bool = False, db: Session = Depends(get_db)):
+    return actualizar_en_lote(db, Indicadores, IndicatorUpdate, TipoEnumIndicador, TipoEnumEntidad.indicador, "INDICADOR", filas, todo_o_nada)
+
+
+@router.post("/bulk/csv")
+async def create_indicadores_csv(archivo: UploadFile = File(...), todo_o_nada: bool = False, db: Session = Depends(get_db)):
+    return crear_en_lote(db, Indicadores, Indicator, TipoEnumIndicador, TipoEnumEntidad.indicador, "INDICADOR", leer_csv(archivo), todo_o_nada)
+
+
+@router.put("/bulk/csv")
+async def update_indicadores_csv(archivo: UploadFile = File(...), todo_o_nada: bool = False, db: Session = Depends(get_db)):
+    return actualizar_en_lote(db, Indicadores, IndicatorUpdate, TipoEnumIndicador, TipoEnumEntidad.indicador, "INDICADOR", leer_csv(archivo), todo_o_nada)
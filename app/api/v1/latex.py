@@ -1,217 +1,330 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
-import os
-import subprocess
-import tempfile
-
-from requests import Session
-from app.db.database import get_db
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+import asyncio
+import hashlib
+
+from sqlalchemy.orm import Session
+from sqlalchemy import BigInteger, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from app.config import LATEX_UPLOAD_MAX_MB, REPORTES_FILAS_POR_TABLA
+from app.db.database import SessionLocal, get_db
 from app.models.models import ProcesosEjecutados, Registro, RegistroProcesoEjecutado, Usuario
 from app.schemas.execution import EjecucionProcesoSchema
 from app.schemas.log import GeneracionDocumentoSchema
+from app.services.cache_pdf import EscritorHash, cache_pdf, clave_reporte
+from app.services.documentos import renderizar
+from app.services.reportes import Trabajo, cola_reportes
+from app.utils.serializacion import etag_coincide
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
-OUTPUT_DIR = "pdf_output"
-
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 procesos_ejecutados_table = ProcesosEjecutados.__table__
 registro_table = Registro.__table__
 usuario_table = Usuario.__table__
 registro_procesos_ejecutados_table = RegistroProcesoEjecutado.__table__
 
-@router.post("/upload")
-async def create_upload_file(file: UploadFile = File(...)):
-    # Guarda el archivo LaTeX en el directorio de uploads
-    file_location = f"{UPLOAD_DIR}/{file.filename}"
-    with open(file_location, "wb") as f:
-        f.write(await file.read())
+# Bytes extra permitidos sobre LATEX_UPLOAD_MAX_MB para los encabezados y separadores del multipart
+MARGEN_MULTIPART = 16 * 1024
+
+# El cuerpo se lee a mano (sin UploadFile) para cortar la subida apenas supera el límite;
+# este esquema mantiene el formulario en la documentación de OpenAPI
+FORMULARIO_TEX = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+
+class LectorTex:
+    """Recoge los bloques de la parte "file" de un multipart mientras el parser avanza por el cuerpo."""
+
+    def __init__(self):
+        self.campo = b""
+        self.encabezados = {}
+        self.es_archivo = False
+        self.encontrado = False
+        self.pendientes = []
+
+    def on_part_begin(self):
+        self.encabezados = {}
+        self.es_archivo = False
+
+    def on_header_field(self, datos, inicio, fin):
+        self.campo = datos[inicio:fin].lower()
+
+    def on_header_value(self, datos, inicio, fin):
+        self.encabezados[self.campo] = self.encabezados.get(self.campo, b"") + datos[inicio:fin]
+
+    def on_headers_finished(self):
+        _, opciones = parse_options_header(self.encabezados.get(b"content-disposition", b""))
+        if opciones.get(b"name") != b"file" or self.encontrado:
+            return
+        nombre = opciones.get(b"filename", b"").decode("utf-8", "replace")
+        if not nombre.lower().endswith(".tex"):
+            raise HTTPException(status_code=400, detail="Solo se aceptan archivos .tex")
+        self.es_archivo = self.encontrado = True
+
+    def on_part_data(self, datos, inicio, fin):
+        if self.es_archivo:
+            self.pendientes.append(datos[inicio:fin])
+
+    def on_part_end(self):
+        self.es_archivo = False
+
+
+async def recibir_tex(request: Request) -> Trabajo:
+    """Copia el .tex subido por bloques al directorio de un trabajo nuevo, con límite de tamaño.
+
+    El límite se aplica mientras llega el cuerpo (y antes, por Content-Length): una subida demasiado
+    grande se corta sin escribirse completa en disco. Las escrituras van a un hilo.
+    """
+    maximo = LATEX_UPLOAD_MAX_MB * 1024 * 1024
+    demasiado_grande = HTTPException(status_code=413, detail=f"El archivo supera el límite de {LATEX_UPLOAD_MAX_MB} MB")
+    longitud = request.headers.get("content-length", "")
+    if longitud.isdigit() and int(longitud) > maximo + MARGEN_MULTIPART:
+        raise demasiado_grande
+    tipo, opciones = parse_options_header(request.headers.get("content-type", ""))
+    if tipo != b"multipart/form-data" or not opciones.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Se esperaba un formulario multipart con el campo 'file'")
+
+    lector = LectorTex()
+    parser = MultipartParser(opciones[b"boundary"], {
+        nombre: getattr(lector, nombre) for nombre in (
+            "on_part_begin", "on_header_field", "on_header_value", "on_headers_finished", "on_part_data", "on_part_end",
+        )
+    })
+    trabajo = cola_reportes.crear()
+    huella = hashlib.sha256()
+    cuerpo = 0
+    recibidos = 0
+    try:
+        # El nombre del cliente no se usa como ruta; cada subida queda aislada en su directorio
+        f = await asyncio.to_thread(open, trabajo.tex, "wb")
+        try:
+            async for fragmento in request.stream():
+                cuerpo += len(fragmento)
+                if cuerpo > maximo + MARGEN_MULTIPART:
+                    raise demasiado_grande
+                parser.write(fragmento)
+                if not lector.pendientes:
+                    continue
+                bloque = b"".join(lector.pendientes)
+                lector.pendientes.clear()
+                recibidos += len(bloque)
+                if recibidos > maximo:
+                    raise demasiado_grande
+                huella.update(bloque)
+                await asyncio.to_thread(f.write, bloque)
+            parser.finalize()
+        finally:
+            await asyncio.to_thread(f.close)
+        if not lector.encontrado:
+            raise HTTPException(status_code=400, detail="Falta el archivo .tex en el campo 'file'")
+    except MultipartParseError:
+        cola_reportes.descartar(trabajo)
+        raise HTTPException(status_code=400, detail="Formulario multipart mal formado")
+    except BaseException:
+        cola_reportes.descartar(trabajo)
+        raise
+    # Mismo contenido, mismo PDF: la caché de reportes también sirve para las subidas
+    trabajo.clave = huella.hexdigest()
+    cola_reportes.enviar(trabajo)
+    return trabajo
+
+
+@router.post("/upload", openapi_extra=FORMULARIO_TEX)
+async def create_upload_file(request: Request):
+    # Compila en la cola de reportes y devuelve el PDF al terminar
+    trabajo = await cola_reportes.esperar(await recibir_tex(request))
+    if trabajo.estado != "listo":
+        print(f"Error generating PDF: {trabajo.error}")
+        raise HTTPException(status_code=500, detail="Error generating PDF")
+    return respuesta_pdf(request, trabajo)
 
-    # Genera el PDF usando pdflatex
-    pdf_filename = os.path.join(UPLOAD_DIR, file.filename.replace('.tex', '.pdf'))
-    print(f"Archivo LaTeX guardado en: {file_location}")
-    print(f"Archivo PDF esperado en: {pdf_filename}")
 
-    try:
-        result = subprocess.run(
-            ['pdflatex', '-interaction=batchmode', '-output-directory', UPLOAD_DIR, str(file_location)],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+@router.post("/upload/jobs", status_code=202, openapi_extra=FORMULARIO_TEX)
+async def crear_trabajo_subida(request: Request):
+    """Encola la compilación del .tex subido; el estado se consulta en /latex/jobs/{id}."""
+    return (await recibir_tex(request)).resumen()
+
+
+# Filas leídas del cursor por lote al generar tablas grandes
+FILAS_POR_LOTE = 500
+
+
+def _en_orden(ids: list, columna):
+    # Conserva el orden en que se pidieron los ids
+    return func.array_position(cast(array(ids), ARRAY(BigInteger)), columna)
+
+
+def consultar_procesos_reporte(db: Session, procesos_ids: list):
+    """Procesos ejecutados con su registro y el usuario del registro, en un solo JOIN por lotes."""
+    if not procesos_ids:
+        return []
+    # Primer registro asociado a cada proceso ejecutado
+    vinculo = (
+        select(
+            registro_procesos_ejecutados_table.c.id_proceso_ejecutado,
+            func.min(registro_procesos_ejecutados_table.c.id_registro).label("id_registro"),
         )
-        print("PDF generation completed successfully.")
-    except subprocess.CalledProcessError as e:
-        print("Error generating PDF:")
-        print(e.stderr.decode())
-        raise HTTPException(status_code=500, detail="Error generating PDF")
+        .where(registro_procesos_ejecutados_table.c.id_proceso_ejecutado.in_(procesos_ids))
+        .group_by(registro_procesos_ejecutados_table.c.id_proceso_ejecutado)
+        .subquery()
+    )
+    query = (
+        select(
+            procesos_ejecutados_table.c.id,
+            procesos_ejecutados_table.c.tasa_de_exito,
+            registro_table.c.id.label("id_registro"),
+            registro_table.c.descripcion,
+            registro_table.c.creado,
+            usuario_table.c.nombre,
+        )
+        .select_from(procesos_ejecutados_table)
+        .join(vinculo, vinculo.c.id_proceso_ejecutado == procesos_ejecutados_table.c.id)
+        .join(registro_table, registro_table.c.id == vinculo.c.id_registro)
+        .outerjoin(usuario_table, usuario_table.c.id == registro_table.c.id_usuario)
+        .where(procesos_ejecutados_table.c.id.in_(procesos_ids))
+        .order_by(_en_orden(procesos_ids, procesos_ejecutados_table.c.id))
+    )
+    return db.execute(query.execution_options(yield_per=FILAS_POR_LOTE))
+
+
+def consultar_registros_reporte(db: Session, registros_ids: list):
+    """Registros con el nombre de su usuario, en un solo JOIN por lotes."""
+    if not registros_ids:
+        return []
+    query = (
+        select(registro_table.c.id, registro_table.c.descripcion, registro_table.c.creado, usuario_table.c.nombre)
+        .select_from(registro_table)
+        .outerjoin(usuario_table, usuario_table.c.id == registro_table.c.id_usuario)
+        .where(registro_table.c.id.in_(registros_ids))
+        .order_by(_en_orden(registros_ids, registro_table.c.id))
+    )
+    return db.execute(query.execution_options(yield_per=FILAS_POR_LOTE))
+
+
+def _filas(consulta, db: Session, ids: list, progreso: dict):
+    # La consulta se ejecuta al empezar a recorrerla, así cada tabla usa el cursor solo mientras se escribe
+    for fila in consulta(db, ids):
+        progreso["filas"] += 1
+        yield fila
+
+
+def validar_reporte(db: Session, data: GeneracionDocumentoSchema):
+    """Usuario y destinos del reporte; 404 si no existen. Se valida antes de encolar el trabajo."""
+    # Obtener el usuario de la base de datos
+    usuario = db.execute(usuario_table.select().where(usuario_table.c.id == data.usuario)).first()
+
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    # Obtener la información de los destinos
+    destinos = db.execute(usuario_table.select().where(usuario_table.c.id.in_(data.destino))).fetchall()
+    if not destinos:
+        raise HTTPException(status_code=404, detail="Destinos no encontrados")
+    return usuario, destinos
+
+
+def escribir_tex(db: Session, data: GeneracionDocumentoSchema, usuario, destinos, salida, progreso: dict):
+    """Escribe el documento .tex en `salida` fila por fila, leyendo las tablas del cursor por lotes."""
+    # Obtener información de los procesos ejecutados y registros
+    procesos_ids = data.informacion.get("procesos_ejecutados", [])
+    registros_ids = data.informacion.get("registros", [])
+    progreso["total"] = len(procesos_ids) + len(registros_ids)
+
+    renderizar(
+        "reporte.tex",
+        salida,
+        titulo=data.titulo,
+        motivo=data.motivo,
+        usuario=usuario,
+        destinos=destinos,
+        procesos=_filas(consultar_procesos_reporte, db, procesos_ids, progreso),
+        registros=_filas(consultar_registros_reporte, db, registros_ids, progreso),
+        notas=data.notas,
+        filas_por_tabla=REPORTES_FILAS_POR_TABLA,
+    )
+
+
+def modificados_referenciados(db: Session, data: GeneracionDocumentoSchema):
+    """(id, modificado) de los registros que aparecen en el reporte, directos o de los procesos ejecutados."""
+    procesos_ids = data.informacion.get("procesos_ejecutados", [])
+    registros_ids = data.informacion.get("registros", [])
+    vinculados = select(registro_procesos_ejecutados_table.c.id_registro).where(
+        registro_procesos_ejecutados_table.c.id_proceso_ejecutado.in_(procesos_ids)
+    )
+    return db.execute(
+        select(registro_table.c.id, registro_table.c.modificado)
+        .where(or_(registro_table.c.id.in_(registros_ids), registro_table.c.id.in_(vinculados)))
+        .order_by(registro_table.c.id)
+        .execution_options(yield_per=FILAS_POR_LOTE)
+    )
+
+
+def encolar_reporte(db: Session, data: GeneracionDocumentoSchema) -> Trabajo:
+    usuario, destinos = validar_reporte(db, data)
+    trabajo = cola_reportes.crear()
+
+    def preparar(trabajo: Trabajo) -> str:
+        # Corre en un hilo con su propia sesión: la de la petición se cierra al responder
+        sesion = SessionLocal()
+        try:
+            with sesion.begin(), open(trabajo.tex, "w", encoding="utf-8") as archivo:
+                escrito = EscritorHash(archivo)
+                escribir_tex(sesion, data, usuario, destinos, escrito, trabajo.progreso)
+                return clave_reporte(escrito, modificados_referenciados(sesion, data))
+        finally:
+            sesion.close()
+
+    cola_reportes.enviar(trabajo, preparar)
+    return trabajo
+
 
-    # Devuelve el archivo PDF
-    return FileResponse(pdf_filename)
+def respuesta_pdf(request: Request, trabajo: Trabajo):
+    # La clave de contenido sirve como ETag fuerte: el mismo reporte con los mismos datos da el mismo PDF
+    headers = {"ETag": f'"{trabajo.clave}"', "Cache-Control": "no-cache"} if trabajo.clave else {}
+    if trabajo.clave and etag_coincide(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(trabajo.pdf, media_type='application/pdf', filename="documento.pdf", headers=headers)
 
 
 @router.post("/generate")
-async def execute_proceso(data: GeneracionDocumentoSchema, db: Session = Depends(get_db)):
-    """Ejecuta un proceso y guarda los resultados."""
-    # Inicia una transacción
-    with db.begin():
-        # Obtener información de los procesos ejecutados y registros
-        procesos_ids = data.informacion.get("procesos_ejecutados", [])
-        registros_ids = data.informacion.get("registros", [])
-
-        # Obtener el usuario de la base de datos
-        usuario = db.execute(usuario_table.select().where(usuario_table.c.id == data.usuario)).first()
-
-        if not usuario:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-        # Obtener la información de los destinos
-        destinos = db.execute(usuario_table.select().where(usuario_table.c.id.in_(data.destino))).fetchall()
-        if not destinos:
-            raise HTTPException(status_code=404, detail="Destinos no encontrados")
-
-        # Crear el documento .tex
-        tex_content = f"""
-\\documentclass[a4paper,10pt]{{article}}
-\\usepackage[utf8]{{inputenc}}
-\\usepackage{{graphicx}}
-\\usepackage{{longtable}}
-\\usepackage{{geometry}}
-\\geometry{{margin=1in}}
-
-% Cambiar la fuente por defecto a una más profesional
-\\renewcommand{{\\rmdefault}}{{ptm}} % Cambia a fuente Times
-\\renewcommand{{\\sfdefault}}{{phv}} % Cambia a fuente Helvetica
-
-\\begin{{document}}
-
-% Logo del software
-\\begin{{center}}
-    \\includegraphics[width=0.3\\textwidth]{{logo.jpeg}} % Asegúrate que el logo esté en la misma carpeta
-    \\\[1em]
-    {{\\LARGE \\textbf{{{data.titulo}}}}}
-\\end{{center}}
-
-\\vspace{{1em}}
-
-\\noindent \\textbf{{Motivo:}} {data.motivo} \\\[0.5em]
-
-\\noindent \\textbf{{Usuario:}} \\\\
-Nombre: {usuario.nombre} \\\\
-Correo: {usuario.email} \\\[0.5em]
-
-\\noindent \\textbf{{Destino:}} \\\\
-Nombres: {", ".join(destino.nombre for destino in destinos)} \\\\
-Correos: {", ".join(destino.email for destino in destinos)} \\\[0.5em]
-
-\\vspace{{1.5em}}
-
-% Tabla con procesos ejecutados
-\\noindent \\textbf{{Procesos Ejecutados:}} \\\\
-\\begin{{longtable}}{{|p{{0.6\\textwidth}}|p{{0.2\\textwidth}}|p{{0.2\\textwidth}}|}}
-    \\hline
-    \\textbf{{Acción}} & \\textbf{{Hora}} & \\textbf{{Usuario}} \\\\
-    \\hline
-    \\endfirsthead
-    \\hline
-    \\textbf{{Acción}} & \\textbf{{Hora}} & \\textbf{{Usuario}} \\\\
-    \\hline
-    \\endhead
-    \\hline
-    \\endfoot
-"""
-        # Aquí añades la información de procesos_ejecutados
-        for proceso_id in procesos_ids:
-            proceso = db.execute(procesos_ejecutados_table.select().where(procesos_ejecutados_table.c.id == proceso_id)).first()
-            proceso_registro_id = db.execute(registro_procesos_ejecutados_table.select().where(registro_procesos_ejecutados_table.c.id_proceso_ejecutado == proceso_id)).first()
-            registro_usuario_id = db.execute(registro_table.select().where(registro_table.c.id == proceso_registro_id.id_registro)).first()
-            
-            if proceso:
-                proceso_usuario = db.execute(usuario_table.select().where(usuario_table.c.id == registro_usuario_id.id_usuario)).first()  # Obtener el usuario asociado
-                
-                # Aquí organizamos los datos en las tres columnas
-                tex_content += (
-                    f" \\textbf{{{registro_usuario_id.descripcion}}} & "  # Acción
-                    f" {registro_usuario_id.creado} & "  # Hora del proceso
-                    f" {proceso_usuario.nombre} \\\\ \n"  # Usuario
-                    f" \\textbf{{Tasa de exito:}} {proceso.tasa_de_exito} & & \\\\ \n"  # La tasa de éxito en una fila adicional
-                    f" \\textbf{{Registro Asociado:}} {registro_usuario_id.id} & & \\\\ \n"  # Registro Asociado en otra fila
-                    f" \\hline \n"
-                )
-
-        tex_content += """
-\\end{longtable}
-
-\\vspace{1.5em}
-
-% Tabla con registros
-\\noindent \\textbf{Registros:} \\\\
-\\begin{longtable}{|p{0.6\\textwidth}|p{0.2\\textwidth}|p{0.2\\textwidth}|}
-    \\hline
-    \\textbf{Acción} & \\textbf{Hora} & \\textbf{Usuario} \\\\
-    \\hline
-    \\endfirsthead
-    \\hline
-    \\textbf{Acción} & \\textbf{Hora} & \\textbf{Usuario} \\\\
-    \\hline
-    \\endhead
-    \\hline
-    \\endfoot
-"""
-
-        # Aquí añades la información de registros
-        for registro_id in registros_ids:
-            registro = db.execute(registro_table.select().where(registro_table.c.id == registro_id)).first()
-            if registro:
-                registro_usuario = db.execute(usuario_table.select().where(usuario_table.c.id == registro.id_usuario)).first()  # Obtener el usuario asociado
-                tex_content += f"\\textbf{{{registro.descripcion}}} & {registro.creado} & {registro_usuario.nombre} \\\\ \n"
-
-        tex_content += """
-\\end{longtable}
-
-\\vspace{1.5em}
-
-\\noindent \\textbf{Notas:} \\\\"""
-        tex_content += f" - {data.notas} \\\\" + """
-
-\\vspace{4em}
-
-\\noindent \\textbf{Firma:} \\\\
-\\rule{5cm}{0.4pt} \\\\ % Línea para firma
-Nombre del Firmante \\\\
-
-\\end{document}
-"""
-        # Guardar el archivo .tex en el directorio fijo
-        tex_file_path = os.path.join(OUTPUT_DIR, "documento.tex")
-        pdf_file_path = os.path.join(OUTPUT_DIR, "documento.pdf")
-
-        print(f"Creando archivo LaTeX en {tex_file_path}")  # LOG
-        with open(tex_file_path, "w", encoding="utf-8") as f:
-            f.write(tex_content)
-
-        # Generar el PDF usando pdflatex
-        try:
-            print(f"Ejecutando pdflatex para generar el PDF en {OUTPUT_DIR}")  # LOG
-            result = subprocess.run(
-                ['pdflatex', '-interaction=batchmode', '-output-directory', OUTPUT_DIR, tex_file_path],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            print("PDF generado correctamente.")  # LOG
-        except subprocess.CalledProcessError as e:
-            print("Error generando el PDF:", e.stderr.decode())  # LOG de error
-            raise HTTPException(status_code=500, detail="Error generando el PDF")
-
-        # Comprobar si el archivo PDF fue generado
-        if not os.path.exists(pdf_file_path):
-            print(f"Archivo PDF no encontrado en {pdf_file_path}")  # LOG
-            raise HTTPException(status_code=500, detail="PDF no fue generado")
-        else:
-            print(f"Archivo PDF encontrado en {pdf_file_path}.")  # LOG adicional
-
-        print(f"Enviando archivo PDF generado desde {pdf_file_path}")  # LOG
-        return FileResponse(pdf_file_path, media_type='application/pdf', filename="documento.pdf")
\ No newline at end of file
+async def execute_proceso(request: Request, data: GeneracionDocumentoSchema, db: Session = Depends(get_db)):
+    """Genera el reporte y devuelve el PDF cuando termina la compilación (sin bloquear el worker)."""
+    trabajo = await cola_reportes.esperar(encolar_reporte(db, data))
+    if trabajo.estado != "listo":
+        raise HTTPException(status_code=500, detail="Error generando el PDF")
+    return respuesta_pdf(request, trabajo)
+
+
+@router.post("/jobs", status_code=202)
+async def crear_trabajo_reporte(data: GeneracionDocumentoSchema, db: Session = Depends(get_db)):
+    """Encola el reporte y responde de inmediato; el estado se consulta en /latex/jobs/{id}."""
+    return encolar_reporte(db, data).resumen()
+
+
+@router.get("/jobs/stats")
+async def estadisticas_reportes():
+    return {**cola_reportes.estadisticas(), "cache": cache_pdf.estadisticas()}
+
+
+@router.get("/jobs/{trabajo_id}")
+async def estado_trabajo_reporte(trabajo_id: str):
+    return cola_reportes.obtener(trabajo_id).resumen()
+
+
+@router.get("/jobs/{trabajo_id}/pdf")
+async def descargar_trabajo_reporte(request: Request, trabajo_id: str):
+    trabajo = cola_reportes.obtener(trabajo_id)
+    if trabajo.estado != "listo":
+        raise HTTPException(status_code=409, detail=f"El PDF aún no está disponible (estado: {trabajo.estado})")
+    return respuesta_pdf(request, trabajo)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.db.database import get_db  # Importa la función desde db.py
-from app.models.models import Procesos, ProcesosEjecutados, RegistroProcesoEjecutado, Usuario, Entradas, Indicadores, Etapas, Registro, RegistroProcesos, RegistroEntradas, RegistroIndicadores
+from app.db.database import get_async_db, get_async_read_db  # Importa la función desde db.py
+from app.models.models import Procesos, ProcesosEjecutados, RegistroProcesoEjecutado, Usuario, Entradas, Indicadores, Etapas, Registro, RegistroProcesos, RegistroEntradas, RegistroIndicadores, RegistroIndice, TipoEnumEntidad
 from app.schemas.execution import ProcesoEjecutadoSchema
 from app.schemas.log import RegistroRead  # Asegúrate de importar tus modelos correctamente
+from app.services.auditoria import COLUMNA_POR_ENTIDAD
+from app.utils.serializacion import RespuestaJSON, respuesta_lista
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -22,16 +24,19 @@ registro_indicador_table = RegistroIndicadores.__table__
 registro_entrada_table = RegistroEntradas.__table__
 procesos_ejecutados_table = ProcesosEjecutados.__table__
 registro_proceso_ejecutado_table = RegistroProcesoEjecutado.__table__
+registro_indice_table = RegistroIndice.__table__
+
+# Las consultas de auditoría usan la réplica de lectura cuando está disponible
 
 @router.get("/search/process/executed", response_model=List[RegistroRead])
 async def search_procesos_ejecutados(
     id_proceso: int = None, 
     id_proceso_ejecutado: int = None, 
     nombre_proceso: str = None,  # Nuevo parámetro para buscar por nombre
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Base de la consulta para obtener los procesos ejecutados y los registros
-    query = db.query(
+    query = select(
         registro_table.c.id,
         registro_table.c.id_usuario,
         registro_table.c.descripcion,
@@ -62,24 +67,19 @@ async def search_procesos_ejecutados(
         query = query.filter(proceso_table.c.nombre.ilike(f"%{nombre_proceso}%"))
 
     # Ejecutar la consulta y mapear los resultados
-    result = db.execute(query).mappings()
-
-    registros = []
-    for row in result:
-        registro = RegistroRead.model_validate(row)
-        registro.id_proceso_ejecutado = row.get("id_proceso_ejecutado")
-        registros.append(registro)
+    # El id de la entidad ya viene como columna de la consulta
+    registros = (await db.execute(query)).mappings().all()
 
     # Si hay registros, devolver la lista; si no, error 404
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron procesos ejecutados.")
 
 
 
 @router.get("/search/process/", response_model=List[RegistroRead])
-async def search_registros_por_proceso(nombre_proceso: str = None, id_proceso: int = None, db: Session = Depends(get_db)):
+async def search_registros_por_proceso(nombre_proceso: str = None, id_proceso: int = None, db: AsyncSession = Depends(get_async_read_db)):
     query = select(
         registro_table.c.id,
         registro_table.c.id_usuario,
@@ -101,21 +101,16 @@ async def search_registros_por_proceso(nombre_proceso: str = None, id_proceso: i
             .where(registro_procesos_table.c.id_proceso == id_proceso)
         )
 
-    result = db.execute(query).mappings()
-    registros = []
-    for row in result:
-        registro = RegistroRead.model_validate(row)
-        # Añade id_proceso si existe en la consulta
-        registro.id_proceso = row.get("id_proceso")
-        registros.append(registro)
+    # El id de la entidad ya viene como columna de la consulta
+    registros = (await db.execute(query)).mappings().all()
 
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron registros.")
 
 @router.get("/search/indicators/", response_model=List[RegistroRead])
-async def search_registros_por_indicador(nombre_indicador: str = None, id_indicador: int = None, db: Session = Depends(get_db)):
+async def search_registros_por_indicador(nombre_indicador: str = None, id_indicador: int = None, db: AsyncSession = Depends(get_async_read_db)):
     query = select(
         registro_table.c.id,
         registro_table.c.id_usuario,
@@ -137,22 +132,17 @@ async def search_registros_por_indicador(nombre_indicador: str = None, id_indica
             .where(registro_indicador_table.c.id_indicador == id_indicador)
         )
 
-    result = db.execute(query).mappings()
-    registros = []
-    for row in result:
-        registro = RegistroRead.model_validate(row)
-        # Añade id_indicador si existe en la consulta
-        registro.id_indicador = row.get("id_indicador")
-        registros.append(registro)
+    # El id de la entidad ya viene como columna de la consulta
+    registros = (await db.execute(query)).mappings().all()
 
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron registros.")
 
 
 @router.get("/search/inputs/", response_model=List[RegistroRead])
-async def search_registros_por_entrada(nombre_entrada: str = None, id_entrada: int = None, db: Session = Depends(get_db)):
+async def search_registros_por_entrada(nombre_entrada: str = None, id_entrada: int = None, db: AsyncSession = Depends(get_async_read_db)):
     query = select(
         registro_table.c.id,
         registro_table.c.id_usuario,
@@ -174,22 +164,17 @@ async def search_registros_por_entrada(nombre_entrada: str = None, id_entrada: i
             .where(registro_entrada_table.c.id_entrada == id_entrada)
         )
 
-    result = db.execute(query).mappings()
-    registros = []
-    for row in result:
-        registro = RegistroRead.model_validate(row)
-        # Añade id_entrada si existe en la consulta
-        registro.id_entrada = row.get("id_entrada")
-        registros.append(registro)
+    # El id de la entidad ya viene como columna de la consulta
+    registros = (await db.execute(query)).mappings().all()
 
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron registros.")
 
 
 @router.get("/search/users/", response_model=List[RegistroRead])
-async def search_registros_por_usuario(nombre_usuario: str = None, id_usuario: int = None, db: Session = Depends(get_db)):
+async def search_registros_por_usuario(nombre_usuario: str = None, id_usuario: int = None, db: AsyncSession = Depends(get_async_read_db)):
     query = select(registro_table)
 
     if nombre_usuario:
@@ -202,15 +187,13 @@ async def search_registros_por_usuario(nombre_usuario: str = None, id_usuario: i
             query.where(registro_table.c.id_usuario == id_usuario)
         )
 
-    result = db.execute(query).mappings()
-    registros = [RegistroRead.model_validate(row) for row in result]
+    registros = (await db.execute(query)).mappings().all()
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron registros.")
 
 from sqlalchemy import select, join
-from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException
 from typing import List
 
@@ -236,7 +219,7 @@ async def search_registros(
     id_entrada: int = None,
     nombre_usuario: str = None,
     id_usuario: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     query = select(registro_table)
 
@@ -252,7 +235,7 @@ async def search_registros(
             subquery_proceso = subquery_proceso.where(registro_procesos_table.c.id_proceso == id_proceso)
 
         # Ejecutar la subconsulta para obtener los resultados
-        subquery_proceso_result = db.execute(subquery_proceso).scalars().all()
+        subquery_proceso_result = (await db.execute(subquery_proceso)).scalars().all()
         if subquery_proceso_result:  # Comprobar si hay resultados
             query = query.where(registro_table.c.id.in_(subquery_proceso_result))
 
@@ -268,7 +251,7 @@ async def search_registros(
             subquery_indicador = subquery_indicador.where(registro_indicador_table.c.id_indicador == id_indicador)
 
         # Ejecutar la subconsulta para obtener los resultados
-        subquery_indicador_result = db.execute(subquery_indicador).scalars().all()
+        subquery_indicador_result = (await db.execute(subquery_indicador)).scalars().all()
         if subquery_indicador_result:  # Comprobar si hay resultados
             query = query.where(registro_table.c.id.in_(subquery_indicador_result))
 
@@ -284,7 +267,7 @@ async def search_registros(
             subquery_entrada = subquery_entrada.where(registro_entrada_table.c.id_entrada == id_entrada)
 
         # Ejecutar la subconsulta para obtener los resultados
-        subquery_entrada_result = db.execute(subquery_entrada).scalars().all()
+        subquery_entrada_result = (await db.execute(subquery_entrada)).scalars().all()
         if subquery_entrada_result:  # Comprobar si hay resultados
             query = query.where(registro_table.c.id.in_(subquery_entrada_result))
 
@@ -297,15 +280,14 @@ async def search_registros(
             subquery_usuario = subquery_usuario.where(usuario_table.c.id == id_usuario)
 
         # Ejecutar la subconsulta para obtener los resultados
-        subquery_usuario_result = db.execute(subquery_usuario).scalars().all()
+        subquery_usuario_result = (await db.execute(subquery_usuario)).scalars().all()
         if subquery_usuario_result:  # Comprobar si hay resultados
             query = query.where(registro_table.c.id_usuario.in_(subquery_usuario_result))
 
-    result = db.execute(query).mappings()
-    registros = [RegistroRead.model_validate(row) for row in result]
+    registros = (await db.execute(query)).mappings().all()
 
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron registros.")
 
@@ -313,7 +295,7 @@ async def search_registros(
 #TODO: id_proceso, id_indicador, id_entrada, id_proceso_ejecutado, por ahora estas son 0 o null.
 
 @router.get("/latest/{size}", response_model=List[RegistroRead])
-async def obtener_ultimos_registros(size: int, db: Session = Depends(get_db)):
+async def obtener_ultimos_registros(size: int, db: AsyncSession = Depends(get_async_read_db)):
     # Verifica que la size sea positiva
     if size <= 0:
         raise HTTPException(status_code=400, detail="La cantidad debe ser un número positivo.")
@@ -327,25 +309,80 @@ async def obtener_ultimos_registros(size: int, db: Session = Depends(get_db)):
     # Realizar la consulta
     query = select(registro_table).where(registro_table.c.creado >= fecha_limite).order_by(registro_table.c.creado.desc()).limit(size)
 
-    result = db.execute(query).mappings()
-    registros = [RegistroRead.model_validate(row) for row in result]
+    registros = (await db.execute(query)).mappings().all()
 
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         return []
     
+async def consultar_indice(db: AsyncSession, query):
+    """Ejecuta una consulta sobre registro_indice y asigna el id de la entidad a su columna de RegistroRead."""
+    registros = []
+    for row in (await db.execute(query)).mappings():
+        registro = dict(row)
+        registro[COLUMNA_POR_ENTIDAD[row["tipo_entidad"]]] = row["id_entidad"]
+        registros.append(registro)
+    return respuesta_lista(RegistroRead, registros)
+
+def query_indice():
+    return select(
+        registro_table.c.id,
+        registro_table.c.id_usuario,
+        registro_table.c.descripcion,
+        registro_table.c.creado,
+        registro_table.c.modificado,
+        registro_indice_table.c.tipo_entidad,
+        registro_indice_table.c.id_entidad
+    ).join(registro_table, registro_indice_table.c.id_registro == registro_table.c.id)
+
+@router.get("/timeline/{tipo_entidad}/{id_entidad}", response_model=List[RegistroRead])
+async def obtener_historial_entidad(tipo_entidad: TipoEnumEntidad, id_entidad: int, size: int = 50, db: AsyncSession = Depends(get_async_read_db)):
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="La cantidad debe ser un número positivo.")
+
+    # Un solo recorrido del índice (tipo_entidad, id_entidad, creado)
+    query = (
+        query_indice()
+        .where(registro_indice_table.c.tipo_entidad == tipo_entidad, registro_indice_table.c.id_entidad == id_entidad)
+        .order_by(registro_indice_table.c.creado.desc())
+        .limit(size)
+    )
+    return await consultar_indice(db, query)
+
+@router.get("/latest/activity/{size}", response_model=List[RegistroRead])
+async def obtener_ultima_actividad(size: int, db: AsyncSession = Depends(get_async_read_db)):
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="La cantidad debe ser un número positivo.")
+
+    # Última actividad de cualquier tipo sin unir las cuatro tablas de asociación
+    query = query_indice().order_by(registro_indice_table.c.creado.desc()).limit(size)
+    return await consultar_indice(db, query)
+
 #TODO: TRADUCIR A UN SOLO IDIOMA LOS PARAMETROS
 
+# Ventanas de búsqueda (en días) para que los "últimos N" solo recorran las particiones recientes de registro
+VENTANAS_RECIENTES = (7, 31, 366, None)
+
+async def ultimos_por_ventana(db: AsyncSession, query, size: int):
+    """Ejecuta la consulta ordenada por creado ampliando la ventana de fechas hasta reunir `size` filas."""
+    for dias in VENTANAS_RECIENTES:
+        query_ventana = query
+        if dias is not None:
+            query_ventana = query.filter(registro_table.c.creado >= datetime.now() - timedelta(days=dias))
+        rows = (await db.execute(query_ventana.limit(size))).mappings().all()
+        if len(rows) >= size or dias is None:
+            return rows
+
 @router.get("/latest/executed/{size}", response_model=List[RegistroRead])
-async def obtener_ultimos_procesos_ejecutados(size: int, db: Session = Depends(get_db)):
+async def obtener_ultimos_procesos_ejecutados(size: int, db: AsyncSession = Depends(get_async_read_db)):
     # Verifica que la size sea positiva
     if size <= 0:
         raise HTTPException(status_code=400, detail="La cantidad debe ser un número positivo.")
 
     # Realizar la consulta para obtener los últimos procesos ejecutados
     query = (
-        db.query(
+        select(
             registro_table.c.id,
             registro_table.c.id_usuario,
             registro_table.c.descripcion,
@@ -362,32 +399,26 @@ async def obtener_ultimos_procesos_ejecutados(size: int, db: Session = Depends(g
             registro_proceso_ejecutado_table.c.id_proceso_ejecutado == procesos_ejecutados_table.c.id
         )
         .order_by(registro_table.c.creado.desc())  # Ordenar por fecha de creación
-        .limit(size)
     )
 
-    result = db.execute(query).mappings()
-    registros = []
-    for row in result:
-        registro = RegistroRead.model_validate(row)
-        registro.id_proceso_ejecutado = row.get("id_proceso_ejecutado")  # Asignar el id del proceso ejecutado
-        registros.append(registro)
+    registros = await ultimos_por_ventana(db, query, size)
 
     if registros:
-        return registros
+        return respuesta_lista(RegistroRead, registros)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron procesos ejecutados.")
     
 
 
 @router.get("/latest/executed/definition/{size}")
-async def obtener_ultimos_procesos(size: int, db: Session = Depends(get_db)):
+async def obtener_ultimos_procesos(size: int, db: AsyncSession = Depends(get_async_read_db)):
     # Verifica que la size sea positiva
     if size <= 0:
         raise HTTPException(status_code=400, detail="La cantidad debe ser un número positivo.")
 
     # Realizar la consulta para obtener los últimos procesos ejecutados
     query = (
-        db.query(
+        select(
             procesos_ejecutados_table.c.id.label("id_proceso_ejecutado"),
             procesos_ejecutados_table.c.no_conformidades,
             procesos_ejecutados_table.c.conformidades,
@@ -417,29 +448,13 @@ async def obtener_ultimos_procesos(size: int, db: Session = Depends(get_db)):
             registro_table.c.id_usuario == usuario_table.c.id
         )
         .order_by(registro_table.c.creado.desc())  # Ordenar por fecha de creación
-        .limit(size)
     )
 
-    result = db.execute(query).mappings()
-    procesos = []
-    for row in result:
-        proceso = {
-            "id_proceso_ejecutado": row.get("id_proceso_ejecutado"),
-            "no_conformidades": row.get("no_conformidades"),
-            "conformidades": row.get("conformidades"),
-            "num_etapas_con_conformidades": row.get("num_etapas_con_conformidades"),
-            "tasa_de_exito": row.get("tasa_de_exito"),
-            "cantidad_salida": row.get("cantidad_salida"),
-            "cantidad_entrada": row.get("cantidad_entrada"),
-            "creado": row.get("creado"),
-            "nombre_proceso": row.get("nombre_proceso"),
-            "id_usuario": row.get("id_usuario"),  # Incluimos el id del usuario
-            "nombre_usuario": row.get("nombre_usuario"),  # Incluimos el nombre del usuario
-        }
-        procesos.append(proceso)
+    # Las columnas ya tienen los nombres de la respuesta
+    procesos = [dict(row) for row in await ultimos_por_ventana(db, query, size)]
 
     if procesos:
-        return procesos
+        return RespuestaJSON(procesos)
     else:
         raise HTTPException(status_code=404, detail="No se encontraron procesos.")
 
@@ -454,10 +469,10 @@ async def update_creation_date(
     hora: int = None,
     minuto: int = None,
     segundo: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Buscar el registro por ID
-    registro = db.query(Registro).filter(Registro.id == registro_id).first()
+    registro = (await db.execute(select(Registro).where(Registro.id == registro_id))).scalars().first()
     
     if not registro:
         raise HTTPException(status_code=404, detail="Registro no encontrado.")
@@ -475,8 +490,13 @@ async def update_creation_date(
         second=segundo if segundo is not None else fecha_creada.second,
     )
 
-    # Actualiza el campo "creado" del registro
+    # Actualiza el campo "creado" del registro y de su fila en el índice, en la misma transacción
     registro.creado = nueva_fecha
-    db.commit()
+    await db.execute(
+        registro_indice_table.update()
+        .where(registro_indice_table.c.id_registro == registro_id)
+        .values(creado=nueva_fecha)
+    )
+    await db.commit()
 
     return {"message": "Fecha y hora actualizadas exitosamente.", "nueva_fecha": registro.creado}
\ No newline at end of file
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.database import get_db  # Importa la función desde db.py
-from app.models.models import Procesos, Entradas, Indicadores, Etapas, EtapasEntradas, EtapaIndicadores, EtapasSalidas, Registro, RegistroProcesos  # Asegúrate de importar tus modelos correctamente
-from app.schemas.proceso import ProcesoCreate, ProcesoResponse, EtapaResponse, EntradaResponse, IndicadorResponse, ProcesoResponseAll, SalidaResponse  # Importa tus esquemas de Pydantic
-from typing import List
+from app.db.database import get_async_db  # Importa la función desde db.py
+from app.models.models import Procesos, Entradas, Indicadores, Etapas, EtapasEntradas, EtapaIndicadores, EtapasSalidas, Registro, RegistroProcesos, TipoEnumEntidad  # Asegúrate de importar tus modelos correctamente
+from app.schemas.proceso import ProcesoCreate, ProcesoResponse, ProcesoResponseAll  # Importa tus esquemas de Pydantic
+from app.services.auditoria import crear_registros, indexar_registro
+from app.services.cache_procesos import Snapshot, cache_procesos
+from app.services.feed import encolar_evento
+from app.services.procesos import cargar_proceso, insertar_procesos, query_catalogo_procesos
+from app.utils.serializacion import respuesta_con_etag, respuesta_lista
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -23,8 +29,10 @@ def crear_registro_proceso(db: Session, proceso_id: int, descripcion: str, usuar
         "id_usuario": usuario_id,
         "descripcion": descripcion
     }
-    result_registro = db.execute(registro_table.insert().values(new_registro))
-    registro_id = result_registro.inserted_primary_key[0]
+    result_registro = db.execute(
+        registro_table.insert().values(new_registro).returning(registro_table.c.id, registro_table.c.creado)
+    )
+    registro_id, creado = result_registro.one()
     
     # Crear el registro para el proceso
     new_registro_proceso = {
@@ -32,195 +40,101 @@ def crear_registro_proceso(db: Session, proceso_id: int, descripcion: str, usuar
         "id_proceso": proceso_id
     }
     db.execute(registro_procesos_table.insert().values(new_registro_proceso))
+    indexar_registro(db, registro_id, creado, TipoEnumEntidad.proceso, proceso_id)
+
+    # Publica el registro en el feed en vivo cuando la transacción haga commit
+    encolar_evento(db, "registro", {"id": registro_id, "creado": creado, **new_registro, "id_proceso": proceso_id})
     db.commit()
 
 
-@router.post("/")
-async def create_proceso(proceso: ProcesoCreate, db: Session = Depends(get_db)):
-   # Crea un nuevo diccionario para el proceso
-    new_proceso = {
-        "nombre": proceso.nombre,
-        "num_etapas": len(proceso.etapas),
-    }
+# Los servicios de procesos usan una Session síncrona; run_sync los ejecuta sobre la conexión
+# asyncpg de la sesión sin bloquear el event loop.
 
-    # Solo agrega "descripcion" si proceso.descripcion tiene un valor
-    if proceso.descripcion:
-        new_proceso["descripcion"] = proceso.descripcion
+@router.post("/")
+async def create_proceso(proceso: ProcesoCreate, db: AsyncSession = Depends(get_async_db)):
     # Usamos un bloque de transacción
-    with db.begin():  # Comienza la transacción
-        # Inserta el nuevo proceso en la base de datos
-        result = db.execute(proceso_table.insert().values(new_proceso))
-        
-        # Obtiene el último proceso insertado
-        proceso_id = result.inserted_primary_key[0]
-        
-        # Inserta las etapas relacionadas
-        for etapa in proceso.etapas:
-            new_etapa = {
-                "num_etapa": etapa.num_etapa,
-                "id_proceso": proceso_id
-            }
-            etapa_result = db.execute(etapas_table.insert().values(new_etapa))
-
-            etapa_id = etapa_result.inserted_primary_key[0]
-
-            # Inserta las entradas, indicadores y salidas para cada etapa
-            for entrada in etapa.entradas:
-                db.execute(etapas_entradas_table.insert().values(id_etapa=etapa_id, id_entrada=entrada.id))
-
-            for indicador in etapa.indicadores:
-                db.execute(etapas_indicadores_table.insert().values(id_etapa=etapa_id, id_indicador_entrada=indicador.id))
-
-            for salida in etapa.salidas:
-                db.execute(etapas_salidas_table.insert().values(id_etapa=etapa_id, id_entrada=salida.id))
+    async with db.begin():  # Comienza la transacción
+        # Inserta el proceso, sus etapas y sus enlaces con inserciones en lote
+        proceso_id = (await db.run_sync(insertar_procesos, [proceso]))[0]
+
+    # Registra la creación del proceso
+    await db.run_sync(crear_registro_proceso, proceso_id, f'CREACION DE PROCESO "{proceso.nombre}"')
 
     # Obtiene el proceso creado con las etapas y detalles completos
-    created_proceso = db.execute(proceso_table.select().where(proceso_table.c.id == proceso_id)).mappings().first()
+    return await db.run_sync(cargar_proceso, proceso_id)
 
-    # Registra la creación del proceso
-    crear_registro_proceso(db, proceso_id, f'CREACION DE PROCESO "{created_proceso["nombre"]}"')
-
-    # Obtiene las etapas relacionadas
-    etapas = db.execute(etapas_table.select().where(etapas_table.c.id_proceso == proceso_id)).mappings().all()
-
-    # Crea la respuesta final
-    etapas_response = []
-    for etapa in etapas:
-        # Obtiene las entradas relacionadas
-        entradas = db.execute(etapas_entradas_table.select().where(etapas_entradas_table.c.id_etapa == etapa.id)).mappings().all()
-        entrada_responses = []
-        for entrada in entradas:
-            entrada_data = db.execute(entradas_table.select().where(entradas_table.c.id == entrada.id_entrada)).mappings().first()
-            entrada_responses.append(EntradaResponse(id=entrada_data.id, nombre=entrada_data.nombre, tipo=entrada_data.tipo))
-
-        # Obtiene los indicadores relacionados
-        indicadores = db.execute(etapas_indicadores_table.select().where(etapas_indicadores_table.c.id_etapa == etapa.id)).mappings().all()
-        indicador_responses = []
-        for indicador in indicadores:
-            indicador_data = db.execute(indicadores_table.select().where(indicadores_table.c.id == indicador.id_indicador_entrada)).mappings().first()
-            indicador_responses.append(IndicadorResponse(id=indicador_data.id, nombre=indicador_data.nombre, tipo=indicador_data.tipo, entrada_id=entrada_data.id))
-
-        # Obtiene las salidas relacionadas
-        salidas = db.execute(etapas_salidas_table.select().where(etapas_salidas_table.c.id_etapa == etapa.id)).mappings().all()
-        salida_responses = []
-        for salida in salidas:
-            salida_data = db.execute(entradas_table.select().where(entradas_table.c.id == salida.id_entrada)).mappings().first()
-            salida_responses.append(SalidaResponse(id=salida_data.id, nombre=salida_data.nombre, tipo=salida_data.tipo))
-
-        etapas_response.append(EtapaResponse(
-            id=etapa.id,
-            num_etapa=etapa.num_etapa,
-            entradas=entrada_responses,
-            indicadores=indicador_responses,
-            salidas=salida_responses
-        ))
-
-    # Crea el objeto de respuesta final
-    proceso_response = {
-        "id": proceso_id,
-        "nombre": created_proceso.nombre,
-        "num_etapas": len(etapas_response),
-        "etapas": etapas_response
-    }
 
-    # Valida el objeto de respuesta
-    return ProcesoResponse.model_validate(proceso_response)
+@router.post("/import")
+async def import_procesos(procesos: List[ProcesoCreate], db: AsyncSession = Depends(get_async_db)):
+    if not procesos:
+        raise HTTPException(status_code=400, detail="No se enviaron procesos para importar.")
+
+    def importar(sesion: Session) -> List[int]:
+        proceso_ids = insertar_procesos(sesion, procesos)
+        crear_registros(sesion, TipoEnumEntidad.proceso, [
+            (proceso_id, f'CREACION DE PROCESO "{proceso.nombre}"')
+            for proceso_id, proceso in zip(proceso_ids, procesos)
+        ])
+        return proceso_ids
+
+    # Todos los procesos y sus registros se crean en una sola transacción
+    async with db.begin():
+        proceso_ids = await db.run_sync(importar)
+
+    return {"message": "Procesos importados correctamente.", "creados": len(proceso_ids), "ids": proceso_ids}
+
+
+@router.get("/cache/stats")
+async def estado_cache_procesos():
+    return cache_procesos.estadisticas()
 
 
 @router.get("/{proceso_id}", response_model=ProcesoResponse)
-async def get_proceso(proceso_id: int, db: Session = Depends(get_db)):
-    # Obtiene el proceso por ID
-    created_proceso = db.execute(proceso_table.select().where(proceso_table.c.id == proceso_id)).mappings().first()
+async def get_proceso(proceso_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    def construir(sesion: Session):
+        # Obtiene el proceso con todo su árbol de etapas en un número constante de consultas
+        proceso = cargar_proceso(sesion, proceso_id)
+        return proceso.model_dump_json(by_alias=True).encode() if proceso else None
 
-    if not created_proceso:
+    # Un acierto de la caché no toca la base de datos
+    snapshot = await db.run_sync(lambda sesion: cache_procesos.obtener_proceso(proceso_id, lambda: construir(sesion)))
+
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Proceso no encontrado")
 
-    # Obtiene las etapas relacionadas
-    etapas = db.execute(etapas_table.select().where(etapas_table.c.id_proceso == proceso_id)).mappings().all()
-
-    # Crea la respuesta final
-    etapas_response = []
-    for etapa in etapas:
-        # Obtiene las entradas relacionadas
-        entradas = db.execute(etapas_entradas_table.select().where(etapas_entradas_table.c.id_etapa == etapa.id)).mappings().all()
-        entrada_responses = []
-        for entrada in entradas:
-            entrada_data = db.execute(entradas_table.select().where(entradas_table.c.id == entrada.id_entrada)).mappings().first()
-            entrada_responses.append(EntradaResponse(id=entrada_data.id, nombre=entrada_data.nombre, tipo=entrada_data.tipo))
-
-        # Obtiene los indicadores relacionados
-        indicadores = db.execute(etapas_indicadores_table.select().where(etapas_indicadores_table.c.id_etapa == etapa.id)).mappings().all()
-        indicador_responses = []
-        for indicador in indicadores:
-            indicador_data = db.execute(indicadores_table.select().where(indicadores_table.c.id == indicador.id_indicador_entrada)).mappings().first()
-            indicador_responses.append(IndicadorResponse(id=indicador_data.id, nombre=indicador_data.nombre, tipo=indicador_data.tipo, entrada_id=entrada_data.id))
-
-        # Obtiene las salidas relacionadas
-        salidas = db.execute(etapas_salidas_table.select().where(etapas_salidas_table.c.id_etapa == etapa.id)).mappings().all()
-        salida_responses = []
-        for salida in salidas:
-            salida_data = db.execute(entradas_table.select().where(entradas_table.c.id == salida.id_entrada)).mappings().first()
-            salida_responses.append(SalidaResponse(id=salida_data.id, nombre=salida_data.nombre, tipo=salida_data.tipo))
-
-        etapas_response.append(EtapaResponse(
-            id=etapa.id,
-            num_etapa=etapa.num_etapa,
-            entradas=entrada_responses,
-            indicadores=indicador_responses,
-            salidas=salida_responses
-        ))
-
-    # Crea el objeto de respuesta final
-    proceso_response = {
-        "id": proceso_id,
-        "nombre": created_proceso.nombre,
-        "num_etapas": len(etapas_response),
-        "etapas": etapas_response
-    }
+    return respuesta_con_etag(request, snapshot.contenido, snapshot.etag)
 
-    return ProcesoResponse.model_validate(proceso_response)
 
+# Columnas por las que se puede ordenar el listado de procesos
+ORDENES_CATALOGO = ("id", "nombre", "num_etapas", "num_entradas", "num_salidas", "num_indicadores")
 
 @router.get("/", response_model=List[ProcesoResponseAll])
-async def get_all_procesos(db: Session = Depends(get_db)):
-    # Obtiene todos los procesos
-    procesos = db.execute(proceso_table.select()).mappings().all()
-
-    procesos_response = []
-    
-    for proceso in procesos:
-        # Obtiene las etapas relacionadas
-        etapas = db.execute(etapas_table.select().where(etapas_table.c.id_proceso == proceso.id)).mappings().all()
-        
-        num_etapas = len(etapas)
-        num_entradas = 0
-        num_salidas = 0
-        num_indicadores = 0
-        
-        for etapa in etapas:
-            # Cuenta las entradas
-            entradas = db.execute(etapas_entradas_table.select().where(etapas_entradas_table.c.id_etapa == etapa.id)).mappings().all()
-            num_entradas += len(entradas)
-
-            # Cuenta los indicadores
-            indicadores = db.execute(etapas_indicadores_table.select().where(etapas_indicadores_table.c.id_etapa == etapa.id)).mappings().all()
-            num_indicadores += len(indicadores)
-
-            # Cuenta las salidas
-            salidas = db.execute(etapas_salidas_table.select().where(etapas_salidas_table.c.id_etapa == etapa.id)).mappings().all()
-            num_salidas += len(salidas)
-
-        # Crea la respuesta para cada proceso
-        proceso_response = {
-            "id": proceso.id,
-            "descripcion": proceso.descripcion,
-            "nombre": proceso.nombre,
-            "num_etapas": num_etapas,
-            "num_entradas": num_entradas,
-            "num_salidas": num_salidas,
-            "num_indicadores": num_indicadores,
-        }
-
-        procesos_response.append(ProcesoResponseAll.model_validate(proceso_response))
-
-    return procesos_response
+async def get_all_procesos(
+    request: Request,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    orden: str = "id",
+    desc: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if orden not in ORDENES_CATALOGO:
+        raise HTTPException(status_code=400, detail=f"Orden inválido. Opciones: {', '.join(ORDENES_CATALOGO)}")
+    if (limit is not None and limit <= 0) or offset < 0:
+        raise HTTPException(status_code=400, detail="limit debe ser positivo y offset no negativo.")
+
+    def construir(sesion: Session):
+        # Conteos de etapas, entradas, indicadores y salidas en una sola consulta
+        query = query_catalogo_procesos()
+        columna = query.selected_columns[orden]
+        query = query.order_by(columna.desc() if desc else columna.asc(), proceso_table.c.id)
+        if limit is not None:
+            query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+
+        procesos = sesion.execute(query).mappings().all()
+        total = procesos[0]["total"] if procesos else 0
+        return Snapshot(0, respuesta_lista(ProcesoResponseAll, procesos).body, {"X-Total-Count": str(total)})
+
+    snapshot = await db.run_sync(lambda sesion: cache_procesos.obtener_listado((limit, offset, orden, desc), lambda: construir(sesion)))
+    return respuesta_con_etag(request, snapshot.contenido, snapshot.etag, snapshot.headers)
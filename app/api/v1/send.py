@@ -1,21 +1,33 @@
 import base64
-import os
 import asyncio
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 import resend
 
+from app.config import RESEND_KEY, CORREO_REMITENTE
 from app.db.database import get_db
 from app.models.models import Usuario
+from app.services.correo import ASUNTO_REPORTE, HTML_REPORTE, encolar_correos, estado_envio, remitente
+from app.services.reportes import cola_reportes
 
-RESEND_KEY = os.getenv('RESEND_KEY')
 resend.api_key = RESEND_KEY
 router = APIRouter()
 
 # Definir el tiempo máximo permitido para el envío de correos (en segundos)
 TIMEOUT_SECONDS = 50
 
+def correos_destino(db: Session, destino: List[int]) -> List[str]:
+    # Obtener los correos de los usuarios según los IDs de destino
+    users = db.execute(
+        Usuario.__table__.select().with_only_columns(Usuario.__table__.c.email).where(Usuario.__table__.c.id.in_(destino))
+    ).scalars().all()
+    emails = [email for email in users if email]
+    if not emails:
+        raise HTTPException(status_code=404, detail="No users found for the provided IDs")
+    return emails
+
+
 @router.post("/report/send")
 async def send_report(destino: List[int], pdf: UploadFile = File(...), db: Session = Depends(get_db)):
     try:
@@ -25,14 +37,7 @@ async def send_report(destino: List[int], pdf: UploadFile = File(...), db: Sessi
         # Convertir el contenido a Base64
         pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
         
-        # Obtener los correos de los usuarios según los IDs de destino
-        users = db.execute(
-            Usuario.__table__.select().where(Usuario.__table__.c.id.in_(destino))
-        ).mappings().all()
-
-        emails = [user['email'] for user in users]  # Extraer los emails
-        if not emails:
-            raise HTTPException(status_code=404, detail="No users found for the provided IDs")
+        emails = correos_destino(db, destino)
 
         # Preparar los parámetros del correo
         attachment = {
@@ -41,64 +46,10 @@ async def send_report(destino: List[int], pdf: UploadFile = File(...), db: Sessi
         }
 
         params: resend.Emails.SendParams = {
-           "from": "Panel A.C.I.B Registros <onboarding@resend.dev>",
+           "from": CORREO_REMITENTE,
            "to": emails,  # Lista de correos electrónicos
-           "subject": "Reporte Enviado - Acción Requerida",
-           "html": """
-           <html>
-             <head>
-               <style>
-                 body {
-                   font-family: Arial, sans-serif;
-                   margin: 0;
-                   padding: 20px;
-                   background-color: #f4f4f4;
-                 }
-                 .container {
-                   max-width: 600px;
-                   margin: auto;
-                   background: white;
-                   border-radius: 8px;
-                   box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);
-                   padding: 20px;
-                 }
-                 h1 {
-                   color: #333;
-                 }
-                 p {
-                   color: #666;
-                   line-height: 1.5;
-                 }
-                 .cta-button {
-                   display: inline-block;
-                   margin-top: 20px;
-                   padding: 10px 15px;
-                   background-color: #007bff;
-                   color: white;
-                   text-decoration: none;
-                   border-radius: 5px;
-                 }
-                 .footer {
-                   margin-top: 30px;
-                   font-size: 0.8em;
-                   color: #999;
-                 }
-               </style>
-             </head>
-             <body>
-               <div class="container">
-                 <h1>Estimado Gerente,</h1>
-                 <p>Se ha generado un reporte solicitado y se encuentra adjunto a este correo.</p>
-                 <p>Atentamente,</p>
-                 <p>El equipo de A.C.I.B Registros</p>
-                 <div class="footer">
-                   <p>Si no reconoce este correo, por favor, ignórelo.</p>
-                   <p>Panel A.C.I.B - URL</p>
-                 </div>
-               </div>
-             </body>
-           </html>
-           """,
+           "subject": ASUNTO_REPORTE,
+           "html": HTML_REPORTE,
            "attachments": [attachment],
         }
 
@@ -107,7 +58,37 @@ async def send_report(destino: List[int], pdf: UploadFile = File(...), db: Sessi
             email = await asyncio.wait_for(asyncio.to_thread(resend.Emails.send, params), timeout=TIMEOUT_SECONDS)
             return {"message": "Reporte enviado con éxito!", "email": email}
         except asyncio.TimeoutError:
-            return {"message": "El envío del reporte tomó demasiado tiempo. Continúa con el proceso normal."}
+            # No se sabe si el correo salió; no se reporta como éxito
+            raise HTTPException(status_code=504, detail="El envío del reporte tomó demasiado tiempo. Use /email/report/{trabajo_id}/send para envíos en segundo plano.")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno al enviar el correo: {str(e)}")
+
+
+@router.post("/report/{trabajo_id}/send", status_code=202)
+def enviar_trabajo_reporte(trabajo_id: str, destino: List[int], db: Session = Depends(get_db)):
+    """Envía por correo el PDF de un trabajo de /latex/jobs ya terminado, en segundo plano y con reintentos.
+
+    El servidor ya tiene el PDF: no hay que descargarlo y volver a subirlo. El estado se consulta en /email/outbox/{id_envio}.
+    """
+    trabajo = cola_reportes.obtener(trabajo_id)
+    if trabajo.estado != "listo":
+        raise HTTPException(status_code=409, detail=f"El PDF aún no está disponible (estado: {trabajo.estado})")
+    emails = correos_destino(db, destino)
+    id_envio = encolar_correos(db, trabajo.id, trabajo.pdf, emails)
+    return {"id_envio": id_envio, "estado": "pendiente", "destinatarios": len(emails)}
+
+
+@router.get("/outbox/stats")
+async def estadisticas_correos():
+    return remitente.estadisticas()
+
+
+@router.get("/outbox/{id_envio}")
+def estado_correos(id_envio: str, db: Session = Depends(get_db)):
+    envio = estado_envio(db, id_envio)
+    if envio is None:
+        raise HTTPException(status_code=404, detail="Envío no encontrado")
+    return envio
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_read_db
 from app.models.models import Materiales, Entradas, Procesos
 from app.schemas.stadistics import (
     MaterialEntradaSalidaSchema,
@@ -15,8 +16,10 @@ router = APIRouter()
 
 # Endpoint para Estado de Entradas y Salidas
 @router.get("/estadisticas/estado-entradas-salidas", response_model=list[MaterialEntradaSalidaSchema])
-async def obtener_estado_entradas_salidas(db: Session = Depends(get_db)):
-    materiales = db.query(Materiales, Entradas.nombre).join(Entradas, Materiales.id_entrada == Entradas.id).all()
+async def obtener_estado_entradas_salidas(db: AsyncSession = Depends(get_async_read_db)):
+    materiales = (await db.execute(
+        select(Materiales, Entradas.nombre).join(Entradas, Materiales.id_entrada == Entradas.id)
+    )).all()
     estado_entradas_salidas = [
         MaterialEntradaSalidaSchema(
             id=material.id,
@@ -68,7 +71,7 @@ async def obtener_estado_general_etapas():
 
 # Endpoint para Procesos con Mayor y Menor Éxito
 @router.get("/estadisticas/procesos-exito", response_model=dict[str, list[ProcesoExitoSchema]])
-async def obtener_procesos_exito(db: Session = Depends(get_db)):
+async def obtener_procesos_exito(db: AsyncSession = Depends(get_async_read_db)):
     json_path = os.path.join("data", "data_procesos.json")
     if not os.path.exists(json_path):
         print("Archivo de datos no encontrado en la ruta:", json_path)
@@ -89,12 +92,17 @@ async def obtener_procesos_exito(db: Session = Depends(get_db)):
         else:
             procesos_exito[id_proceso] = [exito_actual]
 
+    # Nombres de todos los procesos en una sola consulta
+    nombres = dict((await db.execute(
+        select(Procesos.id, Procesos.nombre).where(Procesos.id.in_(list(procesos_exito)))
+    )).all()) if procesos_exito else {}
+
     # Calcular el promedio de éxito y clasificar
     procesos_menos_exito = []
     procesos_mayor_exito = []
     for id_proceso, exitos in procesos_exito.items():
         promedio_exito = sum(exitos) / len(exitos)
-        proceso_nombre = db.query(Procesos.nombre).filter(Procesos.id == id_proceso).scalar()
+        proceso_nombre = nombres.get(id_proceso)
         print(f"ID Proceso: {id_proceso} - Nombre: {proceso_nombre} - Promedio de éxito: {promedio_exito}")
 
         # Verificar si el nombre del proceso existe
@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 from app.dependencies.auth import get_current_user
 from app.models.models import Usuario
 from app.schemas.user import User, UserRead, UserUpdate
+from app.services.feed import encolar_evento
+from app.utils.serializacion import respuesta_lista
 from typing import List
 
 router = APIRouter()
@@ -12,9 +14,8 @@ users = Usuario.__table__
 
 @router.get("/", response_model=List[UserRead])
 async def read_users(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    result = db.execute(users.select()).mappings()
-    users_list = [UserRead.model_validate(row) for row in result]
-    return users_list
+    result = db.execute(users.select()).mappings().all()
+    return respuesta_lista(UserRead, result)
 
 @router.get("/{email}", response_model=UserRead)
 async def read_user(email: str, db: Session = Depends(get_db)):
@@ -26,11 +27,11 @@ async def read_user(email: str, db: Session = Depends(get_db)):
 
 # app/api/v1/users.py
 
-from app.utils.crypto import hash_password, verify_password
+from app.utils.crypto import hash_password_async
 
 @router.post("/", response_model=UserRead)
 async def create_user(user: User, db: Session = Depends(get_db)):
-    hashed_password = hash_password(user.password)  # Encriptamos la contraseña
+    hashed_password = await hash_password_async(user.password)  # Encriptamos la contraseña (fuera del event loop)
     new_user = {
         "nombre": user.username,
         "email": user.email,
@@ -39,9 +40,11 @@ async def create_user(user: User, db: Session = Depends(get_db)):
     }
 
     result = db.execute(users.insert().values(new_user))
-    db.commit()
-    
     user_id = result.inserted_primary_key[0]
+    # Avisa a los índices de autocompletado (de todos los workers) al hacer commit
+    encolar_evento(db, "usuario", {"id": user_id})
+    db.commit()
+
     created_user = db.execute(users.select().where(users.c.id == user_id)).mappings().first()
     
     return UserRead.model_validate(created_user)
@@ -54,6 +57,7 @@ async def update_user(user: UserUpdate, db: Session = Depends(get_db)):
     
     update_data = user.model_dump(exclude_unset=True, by_alias=True)
     db.execute(users.update().where(users.c.id == user.id).values(update_data))
+    encolar_evento(db, "usuario", {"id": user.id})
     db.commit()
     
     updated_user = db.execute(users.select().where(users.c.id == user.id)).mappings().first()
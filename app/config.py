@@ -8,3 +8,73 @@ load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # Duración del token en minutos
+
+# Canal de eventos en vivo (SSE / WebSocket)
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "100"))  # Eventos pendientes por cliente antes de descartar
+FEED_PG_NOTIFY = os.getenv("FEED_PG_NOTIFY", "false").lower() == "true"  # Reparte eventos entre workers via LISTEN/NOTIFY
+FEED_PG_CHANNEL = os.getenv("FEED_PG_CHANNEL", "procemon_feed")
+
+# Cachés en memoria de cada worker (procesos, catálogos, autocompletado). Se invalidan con los eventos del
+# feed, que solo llegan a los demás workers con FEED_PG_NOTIFY=true: con varios workers (WEB_CONCURRENCY > 1,
+# el mismo valor que usa uvicorn para --workers) y sin NOTIFY, las cachés caducan cada CACHE_LOCAL_TTL
+# segundos para acotar cuánto tiempo un worker sirve datos que otro ya modificó.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "15" if WEB_CONCURRENCY > 1 and not FEED_PG_NOTIFY else "0"))  # 0 = sin caducidad
+
+# Particionado mensual de la tabla registro
+REGISTRO_PARTICIONES_ADELANTE = int(os.getenv("REGISTRO_PARTICIONES_ADELANTE", "3"))  # Meses futuros con partición creada
+REGISTRO_RETENCION_MESES = int(os.getenv("REGISTRO_RETENCION_MESES", "0"))  # 0 = nunca separar particiones antiguas
+
+# Hash de contraseñas (bcrypt) fuera del event loop
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Costo de los hashes nuevos; los anteriores se rehacen al iniciar sesión
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))  # Hilos dedicados a bcrypt
+HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", "64"))  # Operaciones en espera antes de responder 503
+
+# Caché de tokens JWT ya verificados
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))  # Tokens distintos guardados por worker
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))  # Segundos máximos en caché, aunque el token venza después
+
+# Trabajos de generación de reportes PDF (pdflatex)
+REPORTES_DIR = os.getenv("REPORTES_DIR", "pdf_output/trabajos")  # Un subdirectorio por trabajo
+REPORTES_WORKERS = int(os.getenv("REPORTES_WORKERS", str(os.cpu_count() or 1)))  # Compilaciones de pdflatex simultáneas
+REPORTES_MAX_PENDIENTES = int(os.getenv("REPORTES_MAX_PENDIENTES", "32"))  # Trabajos en cola antes de responder 503
+REPORTES_TIMEOUT = int(os.getenv("REPORTES_TIMEOUT", "120"))  # Segundos máximos por compilación
+REPORTES_RETENCION_MIN = int(os.getenv("REPORTES_RETENCION_MIN", "60"))  # Minutos que se conservan los trabajos terminados
+LATEX_UPLOAD_MAX_MB = int(os.getenv("LATEX_UPLOAD_MAX_MB", "5"))  # Tamaño máximo de un .tex subido a /latex/upload
+REPORTES_FILAS_POR_TABLA = int(os.getenv("REPORTES_FILAS_POR_TABLA", "1000"))  # Las tablas más largas se parten en varios longtable
+
+# Caché en disco de reportes PDF (direccionada por contenido)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "pdf_output/cache")
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "512"))  # Tamaño máximo antes de descartar los menos usados
+
+# Formato precompilado de pdflatex con el preámbulo de los reportes (se genera al construir la imagen)
+LATEX_FORMATO_DIR = os.getenv("LATEX_FORMATO_DIR", "latex_formato")
+
+# Bandeja de salida de correos (Resend)
+RESEND_KEY = os.getenv("RESEND_KEY")
+RESEND_BASE_URL = os.getenv("RESEND_BASE_URL", "https://api.resend.com")  # Se puede apuntar a un servidor local de pruebas
+CORREO_REMITENTE = os.getenv("CORREO_REMITENTE", "Panel A.C.I.B Registros <onboarding@resend.dev>")
+CORREOS_DIR = os.getenv("CORREOS_DIR", "pdf_output/correos")  # Adjuntos de los correos pendientes
+CORREO_LOTE = int(os.getenv("CORREO_LOTE", "50"))  # Destinatarios por correo (Resend admite hasta 50)
+CORREO_MAX_INTENTOS = int(os.getenv("CORREO_MAX_INTENTOS", "6"))
+CORREO_BACKOFF_BASE = int(os.getenv("CORREO_BACKOFF_BASE", "30"))  # Segundos antes del primer reintento; se duplica en cada intento
+CORREO_BACKOFF_MAX = int(os.getenv("CORREO_BACKOFF_MAX", "3600"))
+CORREO_TIMEOUT = int(os.getenv("CORREO_TIMEOUT", "30"))  # Segundos por petición HTTP a Resend
+CORREO_INTERVALO = int(os.getenv("CORREO_INTERVALO", "5"))  # Segundos entre revisiones de la bandeja
+
+# Pool de conexiones a la base de datos (por worker y por motor: síncrono y asíncrono)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Conexiones extra permitidas sobre DB_POOL_SIZE en picos
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # Segundos esperando una conexión libre antes de fallar
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Segundos antes de reemplazar una conexión (-1 = nunca)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Descarta conexiones caídas antes de usarlas
+# Detrás de un pooler en modo transacción (p. ej. PgBouncer pool_mode=transaction): sin sentencias preparadas en el servidor
+DB_POOL_TRANSACCIONAL = os.getenv("DB_POOL_TRANSACCIONAL", "false").lower() == "true"
+
+# Réplica de solo lectura (opcional). Con DB_REPLICA_NAME se puede probar con dos bases locales en el mismo servidor.
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST")  # Sin valor: todas las lecturas van a la base principal
+DB_REPLICA_PORT = int(os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT", "5432")))
+DB_REPLICA_NAME = os.getenv("DB_REPLICA_NAME", os.getenv("DB_NAME"))
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "10"))  # Segundos de retraso tolerados antes de leer de la principal
+DB_REPLICA_CHEQUEO = int(os.getenv("DB_REPLICA_CHEQUEO", "5"))  # Segundos entre comprobaciones de salud y retraso
+DB_LECTURA_PROPIA = int(os.getenv("DB_LECTURA_PROPIA", "15"))  # Segundos tras una escritura en que el cliente lee de la principal
@@ -3,7 +3,15 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.engine import URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from fastapi import Request
+
+from app.config import DB_REPLICA_HOST, DB_REPLICA_PORT, DB_REPLICA_NAME
+from app.db.pool import MetricasPool, opciones_pool, pool_medido
+from app.db.replica import estado_replica
 
 # Cargar variables de entorno del archivo .env
 load_dotenv()
@@ -18,9 +26,48 @@ url = URL.create(
     port=int(os.getenv("DB_PORT")),
 )
 
-engine = create_engine(url)
+# Métricas de cada pool de conexiones, por nombre (se exponen en /config/db/pool)
+metricas_pools = {}
+
+
+def crear_motor(url: URL, nombre: str):
+    metricas = metricas_pools[nombre] = MetricasPool(nombre)
+    motor = create_engine(url, poolclass=pool_medido(QueuePool, metricas), **opciones_pool(asincrono=False))
+    metricas.registrar(motor)
+    return motor
+
+
+def crear_motor_async(url: URL, nombre: str):
+    metricas = metricas_pools[nombre] = MetricasPool(nombre)
+    url = url.set(drivername=os.getenv("DB_ASYNC_DRIVER", "postgresql+asyncpg"))
+    motor = create_async_engine(url, poolclass=pool_medido(AsyncAdaptedQueuePool, metricas), **opciones_pool(asincrono=True))
+    metricas.registrar(motor.sync_engine)
+    return motor
+
+
+engine = crear_motor(url, "principal")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono (asyncpg) para los routers de mayor tráfico: las consultas no bloquean el event loop.
+# Las sesiones usan la misma clase que SessionLocal, así reciben los mismos eventos (p. ej. el feed en vivo).
+async_engine = crear_motor_async(url, "principal_async")
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, sync_session_class=SessionLocal.class_
+)
+
+# Réplica de solo lectura para los tableros (estadísticas, logs, búsquedas); sin DB_REPLICA_HOST todo va a la principal
+read_engine = None
+read_async_engine = None
+ReadSessionLocal = SessionLocal
+AsyncReadSessionLocal = AsyncSessionLocal
+if DB_REPLICA_HOST:
+    url_replica = url.set(host=DB_REPLICA_HOST, port=DB_REPLICA_PORT, database=DB_REPLICA_NAME)
+    read_engine = crear_motor(url_replica, "replica")
+    read_async_engine = crear_motor_async(url_replica, "replica_async")
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    AsyncReadSessionLocal = async_sessionmaker(bind=read_async_engine, autoflush=False, expire_on_commit=False)
+    estado_replica.configurada = True
+
 meta = MetaData()
 
 # Función para obtener la sesión de la base de datos
@@ -30,3 +77,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Sesión asíncrona para los handlers async
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Sesiones de solo lectura: usan la réplica si está sana, al día y el cliente no acaba de escribir
+def get_read_db(request: Request):
+    db = ReadSessionLocal() if estado_replica.elegir(request) else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    sesiones = AsyncReadSessionLocal if estado_replica.elegir(request) else AsyncSessionLocal
+    async with sesiones() as db:
+        yield db
@@ -0,0 +1,115 @@
+# app/db/pool.py
+
+import time
+import uuid
+from typing import Dict, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from app.config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_TRANSACCIONAL,
+)
+
+
+class MetricasPool:
+    """Contadores de un pool de conexiones: permiten distinguir un pool agotado de consultas lentas."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.engine = None
+        self.checkouts = 0
+        self.conexiones = 0  # Conexiones nuevas abiertas contra la base de datos
+        self.invalidaciones = 0
+        self.agotado = 0  # Esperas que superaron DB_POOL_TIMEOUT
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.overflow_max = 0
+
+    def esperar(self, segundos: float):
+        self.checkouts += 1
+        self.espera_total += segundos
+        self.espera_max = max(self.espera_max, segundos)
+        pool = self.pool
+        if pool is not None and hasattr(pool, "overflow"):
+            self.overflow_max = max(self.overflow_max, pool.overflow())
+
+    @property
+    def pool(self):
+        # engine.dispose() reemplaza el pool; siempre se lee el actual
+        return self.engine.pool if self.engine is not None else None
+
+    def registrar(self, engine: Engine):
+        self.engine = engine
+
+        @event.listens_for(engine, "connect")
+        def _conectar(conexion, registro):
+            self.conexiones += 1
+
+        @event.listens_for(engine, "invalidate")
+        def _invalidar(conexion, registro, error):
+            self.invalidaciones += 1
+
+        @event.listens_for(engine, "soft_invalidate")
+        def _invalidar_suave(conexion, registro, error):
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> dict:
+        pool = self.pool
+        estado = {}
+        if pool is not None and hasattr(pool, "checkedout"):
+            estado = {
+                "tamano": pool.size(),
+                "en_uso": pool.checkedout(),
+                "libres": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+            }
+        return {
+            "nombre": self.nombre,
+            **estado,
+            "checkouts": self.checkouts,
+            "espera_promedio_ms": self.espera_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "espera_max_ms": self.espera_max * 1000,
+            "overflow_max": self.overflow_max,
+            "agotado": self.agotado,
+            "conexiones": self.conexiones,
+            "invalidaciones": self.invalidaciones,
+        }
+
+
+def pool_medido(base: Type[Pool], metricas: MetricasPool) -> Type[Pool]:
+    """Subclase del pool que mide cuánto tarda cada checkout (esperando una conexión libre o abriendo una)."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = base._do_get(self)
+        except exc.TimeoutError:
+            metricas.agotado += 1
+            raise
+        metricas.esperar(time.perf_counter() - inicio)
+        return conexion
+
+    # pool.recreate() (p. ej. tras dispose) instancia la misma clase, así se conservan las métricas
+    return type(f"{base.__name__}Medido", (base,), {"_do_get": _do_get})
+
+
+def opciones_pool(asincrono: bool) -> Dict:
+    opciones = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_POOL_TRANSACCIONAL and asincrono:
+        # asyncpg prepara cada sentencia en el servidor; con un pooler en modo transacción la siguiente
+        # transacción puede caer en otra conexión donde la sentencia no existe. psycopg2 no prepara sentencias.
+        opciones["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return opciones
@@ -0,0 +1,126 @@
+# app/db/replica.py
+
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import DB_REPLICA_MAX_LAG, DB_REPLICA_CHEQUEO, DB_LECTURA_PROPIA
+
+# Cookie (o encabezado) con la que un cliente que acaba de escribir lee de la principal
+COOKIE_LECTURA_PROPIA = "leer_primaria"
+HEADER_LECTURA_PROPIA = "X-Leer-Primaria"
+
+# Segundos de retraso de la réplica; 0 si ya aplicó todo lo recibido o si no es una réplica (pruebas locales)
+CONSULTA_RETRASO = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class EstadoReplica:
+    """Salud y retraso de la réplica de lectura, comprobados periódicamente en cada worker.
+
+    Mientras la réplica no responda, tenga más retraso que DB_REPLICA_MAX_LAG o no se haya comprobado
+    recientemente, las lecturas van a la base principal.
+    """
+
+    def __init__(self):
+        self.configurada = False
+        self.saludable = False
+        self.retraso: Optional[float] = None
+        self.error: Optional[str] = None
+        self.ultimo_chequeo: Optional[float] = None
+        self.lecturas_replica = 0
+        self.lecturas_principal = 0
+
+    def disponible(self) -> bool:
+        if not self.configurada or not self.saludable or self.ultimo_chequeo is None:
+            return False
+        # Un chequeo atascado no debe dejar la réplica marcada como sana
+        if time.monotonic() - self.ultimo_chequeo > DB_REPLICA_CHEQUEO * 3:
+            return False
+        return self.retraso is not None and self.retraso <= DB_REPLICA_MAX_LAG
+
+    def elegir(self, request: Request) -> bool:
+        """True si la petición puede leer de la réplica."""
+        usar = self.disponible() and not escritura_reciente(request)
+        if usar:
+            self.lecturas_replica += 1
+        else:
+            self.lecturas_principal += 1
+        return usar
+
+    async def comprobar(self, motor: AsyncEngine):
+        async def consultar():
+            async with motor.connect() as conexion:
+                return await conexion.scalar(CONSULTA_RETRASO)
+
+        try:
+            # Una réplica que no responde a tiempo cuenta como caída
+            retraso = await asyncio.wait_for(consultar(), timeout=DB_REPLICA_CHEQUEO)
+            self.retraso = float(retraso)
+            self.saludable = True
+            self.error = None
+        except Exception as e:
+            if self.saludable:
+                print(f"Réplica de lectura no disponible, se lee de la principal: {e}")
+            self.saludable = False
+            self.error = str(e)
+        self.ultimo_chequeo = time.monotonic()
+
+    async def vigilar_periodicamente(self, motor: AsyncEngine):
+        while True:
+            await self.comprobar(motor)
+            await asyncio.sleep(DB_REPLICA_CHEQUEO)
+
+    def estadisticas(self) -> dict:
+        return {
+            "configurada": self.configurada,
+            "disponible": self.disponible(),
+            "saludable": self.saludable,
+            "retraso_segundos": self.retraso,
+            "max_retraso_segundos": DB_REPLICA_MAX_LAG,
+            "error": self.error,
+            "lecturas_replica": self.lecturas_replica,
+            "lecturas_principal": self.lecturas_principal,
+        }
+
+
+estado_replica = EstadoReplica()
+
+
+def escritura_reciente(request: Request) -> bool:
+    return COOKIE_LECTURA_PROPIA in request.cookies or request.headers.get(HEADER_LECTURA_PROPIA) == "1"
+
+
+class LecturaPropiaMiddleware:
+    """Tras una escritura exitosa el cliente lee de la base principal durante DB_LECTURA_PROPIA segundos,
+    así ve sus propios cambios aunque la réplica vaya atrasada.
+
+    Middleware ASGI puro: no envuelve el cuerpo de las respuestas (SSE, PDFs).
+    """
+
+    # La cookie expira cuando la réplica ya debería haber alcanzado la escritura
+    COOKIE = f"{COOKIE_LECTURA_PROPIA}=1; Max-Age={DB_LECTURA_PROPIA}; Path=/; HttpOnly; SameSite=lax".encode()
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []), (b"set-cookie", self.COOKIE)]}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
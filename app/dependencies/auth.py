@@ -1,7 +1,7 @@
 # app/dependencies/auth.py
 
 from fastapi import Depends, HTTPException, status, Request
-from app.utils.jwt import verify_token
+from app.utils.jwt import cache_tokens
 
 async def get_current_user(request: Request):
     auth_header = request.headers.get("Authorization")
@@ -12,15 +12,14 @@ async def get_current_user(request: Request):
         )
 
     token = auth_header.split(" ")[1]  # Extraemos el token después de "Bearer"
-    payload = verify_token(token)
+    # Los tokens repetidos se resuelven con una búsqueda en la caché, sin volver a verificar la firma
+    payload = cache_tokens.verificar(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
 
-    print("????")
-
     return {
         "id": payload.get("id"),
         "email": payload.get("sub"),
@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -6,9 +8,41 @@ from fastapi.responses import FileResponse
 load_dotenv()  # TODO: Mejorar
 
 from app.api.routes import router_api  # Importa el enrutador central que agrupa todas las rutas
+from app.db.database import async_engine, read_async_engine
+from app.db.replica import LecturaPropiaMiddleware, estado_replica
+from app.services import autocompletado, feed, particiones
+from app.services.correo import remitente
+from app.services.reportes import cola_reportes
+
+# Tareas de arranque y cierre de cada worker
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    feed.iniciar()
+    try:
+        # Índices de autocompletado; si la base de datos no responde se construyen en la primera consulta
+        await asyncio.to_thread(autocompletado.construir_todos)
+    except Exception as e:
+        print(f"No se pudo construir el índice de autocompletado: {e}")
+    mantenimiento = asyncio.create_task(particiones.mantener_periodicamente())
+    limpieza_reportes = asyncio.create_task(cola_reportes.limpiar_periodicamente())
+    bandeja_correos = asyncio.create_task(remitente.ejecutar_periodicamente())
+    vigilancia_replica = None
+    if read_async_engine is not None:
+        # Primer chequeo antes de atender peticiones; hasta entonces se lee de la principal
+        await estado_replica.comprobar(read_async_engine)
+        vigilancia_replica = asyncio.create_task(estado_replica.vigilar_periodicamente(read_async_engine))
+    yield
+    if vigilancia_replica is not None:
+        vigilancia_replica.cancel()
+        await read_async_engine.dispose()
+    bandeja_correos.cancel()
+    limpieza_reportes.cancel()
+    mantenimiento.cancel()
+    feed.detener()
+    await async_engine.dispose()
 
 # Crear una sola instancia de FastAPI
-app = FastAPI(title="Panel A.C.I.B API DATABASE")
+app = FastAPI(title="Panel A.C.I.B API DATABASE", lifespan=lifespan)
 
 
 # Configuración de CORS
@@ -25,6 +59,9 @@ app.add_middleware(
     allow_headers=["*"],  # Permitir todos los headers
 )
 
+# Lecturas de la base principal justo después de escribir (réplica de lectura)
+app.add_middleware(LecturaPropiaMiddleware)
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     return FileResponse("app/static/favicon.ico")  # Ajusta la ruta según tu estructura
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Integer, ForeignKey, Enum as SQLAlchemyEnum, TIMESTAMP, Float
+from sqlalchemy import Column, BigInteger, String, Integer, ForeignKey, Enum as SQLAlchemyEnum, TIMESTAMP, Float, Index, JSON, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from enum import Enum
@@ -20,6 +20,18 @@ class TipoEnumEntrada(str, Enum):
     type1 = 'int'
     type2 = 'float'
 
+class TipoEnumEntidad(str, Enum):
+    proceso = 'proceso'
+    indicador = 'indicador'
+    entrada = 'entrada'
+    proceso_ejecutado = 'proceso_ejecutado'
+
+class EstadoCorreo(str, Enum):
+    pendiente = 'pendiente'
+    enviando = 'enviando'
+    enviado = 'enviado'
+    error = 'error'
+
 class Indicadores(Base):
     __tablename__ = 'indicadores'
 
@@ -52,6 +64,10 @@ class Etapas(Base):
     id_proceso = Column(BigInteger, ForeignKey('procesos.id'))
     proceso = relationship('Procesos', backref='etapas')
 
+    __table_args__ = (
+        Index('ix_etapas_id_proceso', 'id_proceso'),
+    )
+
 class Usuario(Base):
     __tablename__ = 'usuario'
 
@@ -89,13 +105,20 @@ class IndicadoresEntradas(Base):
     id_indicador = Column(BigInteger, ForeignKey('indicadores.id'))
 
 class Registro(Base):
+    # Particionada por rango mensual sobre "creado"; la llave primaria debe incluir la columna de partición.
+    # Las llaves foráneas hacia registro.id solo existen a nivel ORM (Postgres no las admite sin "creado").
     __tablename__ = 'registro'
+    __table_args__ = (
+        Index('ix_registro_creado', 'creado'),
+        Index('ix_registro_id_usuario', 'id_usuario'),
+        {'postgresql_partition_by': 'RANGE (creado)'},
+    )
 
-    id = Column(BigInteger, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     id_usuario = Column(BigInteger, ForeignKey('usuario.id'), nullable=False)
     descripcion = Column(String)
-    creado = Column(TIMESTAMP, default="now()")
-    modificado = Column(TIMESTAMP, default="now()")
+    creado = Column(TIMESTAMP, primary_key=True, default=func.now())
+    modificado = Column(TIMESTAMP, default=func.now())
 
 class RegistroEntradas(Base):
     __tablename__ = 'registro_entradas'
@@ -115,6 +138,20 @@ class RegistroProcesos(Base):
     id_registro = Column(BigInteger, ForeignKey('registro.id'), primary_key=True)
     id_proceso = Column(BigInteger, ForeignKey('procesos.id'))
 
+class RegistroIndice(Base):
+    # Índice de auditoría desnormalizado: una fila por registro con el tipo e id de la entidad afectada
+    __tablename__ = 'registro_indice'
+
+    id_registro = Column(BigInteger, ForeignKey('registro.id'), primary_key=True)
+    tipo_entidad = Column(SQLAlchemyEnum(TipoEnumEntidad), nullable=False)
+    id_entidad = Column(BigInteger, nullable=False)
+    creado = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index('ix_registro_indice_entidad', 'tipo_entidad', 'id_entidad', 'creado'),
+        Index('ix_registro_indice_creado', 'creado'),
+    )
+
 
  #TODO: add Barrel
 
@@ -141,6 +178,10 @@ class Materiales(Base):
     usos = Column(Integer)
     entrada = relationship('Entradas', backref='materiales')  # Relación hacia las entradas
 
+    __table_args__ = (
+        Index('ux_materiales_id_entrada', 'id_entrada', unique=True),  # Un acumulado por entrada
+    )
+
 class RegistroProcesoEjecutado(Base):
     __tablename__ = 'registro_proceso_ejecutado'
 
@@ -150,3 +191,31 @@ class RegistroProcesoEjecutado(Base):
     # Puedes agregar relaciones hacia las otras tablas si es necesario
     proceso_ejecutado = relationship('ProcesosEjecutados', backref='registros')
     registro = relationship('Registro', backref='procesos_ejecutados')
+
+    # La llave primaria ya cubre id_proceso_ejecutado; este índice sirve al JOIN desde registro
+    __table_args__ = (
+        Index('ix_registro_proceso_ejecutado_id_registro', 'id_registro'),
+    )
+
+class CorreoSalida(Base):
+    # Bandeja de salida de correos: una fila por lote de destinatarios, enviada en segundo plano con reintentos
+    __tablename__ = 'correo_salida'
+
+    id = Column(BigInteger, primary_key=True)
+    id_envio = Column(String(32), nullable=False)  # Agrupa los lotes de una misma solicitud de envío
+    id_trabajo = Column(String(32), nullable=False)  # Trabajo de reporte que generó el PDF adjunto
+    adjunto = Column(String, nullable=False)
+    asunto = Column(String, nullable=False)
+    destinatarios = Column(JSON, nullable=False)
+    estado = Column(SQLAlchemyEnum(EstadoCorreo), nullable=False, default=EstadoCorreo.pendiente)
+    intentos = Column(Integer, nullable=False, default=0)
+    proximo_intento = Column(TIMESTAMP, nullable=False, default=func.now())
+    ultimo_error = Column(String)
+    id_proveedor = Column(String)  # Id del correo en Resend
+    creado = Column(TIMESTAMP, default=func.now())
+    enviado = Column(TIMESTAMP)
+
+    __table_args__ = (
+        Index('ix_correo_salida_pendientes', 'estado', 'proximo_intento'),
+        Index('ix_correo_salida_envio', 'id_envio'),
+    )
@@ -0,0 +1,64 @@
+# app/services/auditoria.py
+
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+from app.models.models import Registro, RegistroEntradas, RegistroIndicadores, RegistroProcesos, RegistroProcesoEjecutado, RegistroIndice, TipoEnumEntidad
+from app.services.feed import encolar_evento
+
+registro_table = Registro.__table__
+registro_indice_table = RegistroIndice.__table__
+
+# Tabla de asociación de cada tipo de entidad
+TABLA_POR_ENTIDAD = {
+    TipoEnumEntidad.proceso: RegistroProcesos.__table__,
+    TipoEnumEntidad.indicador: RegistroIndicadores.__table__,
+    TipoEnumEntidad.entrada: RegistroEntradas.__table__,
+    TipoEnumEntidad.proceso_ejecutado: RegistroProcesoEjecutado.__table__,
+}
+
+# Columna de RegistroRead que corresponde a cada tipo de entidad
+COLUMNA_POR_ENTIDAD = {
+    TipoEnumEntidad.proceso: "id_proceso",
+    TipoEnumEntidad.indicador: "id_indicador",
+    TipoEnumEntidad.entrada: "id_entrada",
+    TipoEnumEntidad.proceso_ejecutado: "id_proceso_ejecutado",
+}
+
+def indexar_registro(db: Session, registro_id: int, creado: datetime, tipo_entidad: TipoEnumEntidad, id_entidad: int):
+    """Escribe la fila del índice de auditoría junto a la tabla de asociación correspondiente."""
+    db.execute(registro_indice_table.insert().values(
+        id_registro=registro_id,
+        tipo_entidad=tipo_entidad,
+        id_entidad=id_entidad,
+        creado=creado,
+    ))
+
+
+def crear_registros(db: Session, tipo_entidad: TipoEnumEntidad, entidades: List[Tuple[int, str]], usuario_id: int = 0) -> List[int]:
+    """Crea en lote los registros de auditoría de varias entidades: (id_entidad, descripcion) por elemento.
+
+    Usa un INSERT multi-fila con RETURNING para registro y lotes executemany para la tabla de asociación
+    y el índice. No hace commit; queda dentro de la transacción del llamador.
+    """
+    if not entidades:
+        return []
+    columna = COLUMNA_POR_ENTIDAD[tipo_entidad]
+    filas = [{"id_usuario": usuario_id, "descripcion": descripcion} for _, descripcion in entidades]
+    creados = db.execute(
+        registro_table.insert().returning(registro_table.c.id, registro_table.c.creado, sort_by_parameter_order=True),
+        filas
+    ).all()
+
+    db.execute(TABLA_POR_ENTIDAD[tipo_entidad].insert(), [
+        {"id_registro": registro.id, columna: id_entidad}
+        for registro, (id_entidad, _) in zip(creados, entidades)
+    ])
+    db.execute(registro_indice_table.insert(), [
+        {"id_registro": registro.id, "tipo_entidad": tipo_entidad, "id_entidad": id_entidad, "creado": registro.creado}
+        for registro, (id_entidad, _) in zip(creados, entidades)
+    ])
+
+    for registro, fila, (id_entidad, _) in zip(creados, filas, entidades):
+        encolar_evento(db, "registro", {"id": registro.id, "creado": registro.creado, **fila, columna: id_entidad})
+    return [registro.id for registro in creados]
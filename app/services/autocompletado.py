@@ -0,0 +1,168 @@
+# app/services/autocompletado.py
+
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Table
+from sqlalchemy.orm import Session
+
+from app.config import CACHE_LOCAL_TTL
+from app.db.database import SessionLocal
+from app.models.models import Entradas, Indicadores, Procesos, Usuario
+from app.services.feed import broker
+
+# Resultados por defecto y máximo por consulta
+LIMITE_DEFECTO = 10
+LIMITE_MAXIMO = 50
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas sin acentos y con espacios simples: 'Presión  Máxima' -> 'presion maxima'."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.casefold().split())
+
+
+class IndiceNombres:
+    """Índice de prefijos en memoria sobre los nombres de un catálogo.
+
+    Guarda un arreglo ordenado de (palabra normalizada, id) con cada palabra de cada nombre, así una
+    consulta encuentra por prefijo de cualquier palabra con bisect, sin ir a la base de datos.
+    Las escrituras solo marcan ids pendientes; se recargan juntos (un SELECT ... IN) en la siguiente consulta.
+    Las de otros workers solo llegan con FEED_PG_NOTIFY; sin él, el índice se reconstruye cada CACHE_LOCAL_TTL segundos.
+    """
+
+    def __init__(self, tabla: Table):
+        self.tabla = tabla
+        self.nombres: Dict[int, str] = {}
+        self.claves: Dict[int, str] = {}
+        self.palabras: List[Tuple[str, int]] = []
+        self.pendientes: Set[int] = set()
+        self.construido = False
+        self.construido_en = 0.0
+        self.lock = threading.Lock()
+
+    def _quitar(self, id_: int):
+        clave = self.claves.pop(id_, None)
+        self.nombres.pop(id_, None)
+        if clave is None:
+            return
+        for palabra in set(clave.split()):
+            posicion = bisect_left(self.palabras, (palabra, id_))
+            if posicion < len(self.palabras) and self.palabras[posicion] == (palabra, id_):
+                del self.palabras[posicion]
+
+    def _poner(self, id_: int, nombre: Optional[str]):
+        self._quitar(id_)
+        clave = normalizar(nombre)
+        self.nombres[id_] = nombre or ""
+        self.claves[id_] = clave
+        for palabra in set(clave.split()):
+            insort(self.palabras, (palabra, id_))
+
+    def construir(self, db: Session):
+        filas = db.execute(self.tabla.select().with_only_columns(self.tabla.c.id, self.tabla.c.nombre)).all()
+        nombres = {id_: nombre or "" for id_, nombre in filas}
+        claves = {id_: normalizar(nombre) for id_, nombre in nombres.items()}
+        palabras = sorted((palabra, id_) for id_, clave in claves.items() for palabra in set(clave.split()))
+        with self.lock:
+            self.nombres, self.claves, self.palabras = nombres, claves, palabras
+            self.pendientes.clear()
+            self.construido = True
+            self.construido_en = time.monotonic()
+
+    def marcar(self, id_: int):
+        with self.lock:
+            self.pendientes.add(id_)
+
+    def refrescar(self, db: Session):
+        """Construye el índice si hace falta y recarga los ids modificados desde la última consulta."""
+        caducado = CACHE_LOCAL_TTL and time.monotonic() - self.construido_en > CACHE_LOCAL_TTL
+        if not self.construido or caducado:
+            self.construir(db)
+            return
+        with self.lock:
+            pendientes, self.pendientes = self.pendientes, set()
+        if not pendientes:
+            return
+        filas = dict(db.execute(
+            self.tabla.select().with_only_columns(self.tabla.c.id, self.tabla.c.nombre).where(self.tabla.c.id.in_(pendientes))
+        ).all())
+        with self.lock:
+            for id_ in pendientes:
+                if id_ in filas:
+                    self._poner(id_, filas[id_])
+                else:
+                    self._quitar(id_)
+
+    def _ids_con_prefijo(self, prefijo: str) -> Set[int]:
+        encontrados = set()
+        posicion = bisect_left(self.palabras, (prefijo,))
+        while posicion < len(self.palabras) and self.palabras[posicion][0].startswith(prefijo):
+            encontrados.add(self.palabras[posicion][1])
+            posicion += 1
+        return encontrados
+
+    def buscar(self, consulta: str, limite: int = LIMITE_DEFECTO) -> List[dict]:
+        """Ids y nombres cuyo nombre contiene una palabra que empieza por cada palabra de la consulta."""
+        terminos = normalizar(consulta).split()
+        if not terminos:
+            return []
+        with self.lock:
+            # Se empieza por el término más largo, que suele ser el más selectivo
+            candidatos: Optional[Set[int]] = None
+            for termino in sorted(terminos, key=len, reverse=True):
+                encontrados = self._ids_con_prefijo(termino)
+                candidatos = encontrados if candidatos is None else candidatos & encontrados
+                if not candidatos:
+                    return []
+            texto = " ".join(terminos)
+            # Primero los nombres que empiezan por la consulta, luego los más cortos y en orden alfabético
+            orden = sorted(candidatos, key=lambda id_: (not self.claves[id_].startswith(texto), len(self.claves[id_]), self.claves[id_], id_))
+            return [{"id": id_, "nombre": self.nombres[id_]} for id_ in orden[:limite]]
+
+    def estadisticas(self) -> dict:
+        return {"construido": self.construido, "nombres": len(self.nombres), "palabras": len(self.palabras), "pendientes": len(self.pendientes)}
+
+
+indices: Dict[str, IndiceNombres] = {
+    "entradas": IndiceNombres(Entradas.__table__),
+    "indicadores": IndiceNombres(Indicadores.__table__),
+    "procesos": IndiceNombres(Procesos.__table__),
+    "usuarios": IndiceNombres(Usuario.__table__),
+}
+
+# Columna del evento de auditoría -> índice afectado
+INDICE_POR_COLUMNA = {
+    "id_entrada": "entradas",
+    "id_indicador": "indicadores",
+    "id_proceso": "procesos",
+}
+
+
+def construir_todos(nombres: Iterable[str] = tuple(indices)):
+    db = SessionLocal()
+    try:
+        for nombre in nombres:
+            indices[nombre].construir(db)
+    finally:
+        db.close()
+
+
+def _marcar_por_evento(tipo: str, datos: dict):
+    if tipo == "usuario":
+        indices["usuarios"].marcar(datos["id"])
+        return
+    if tipo != "registro":
+        return
+    for columna, nombre in INDICE_POR_COLUMNA.items():
+        if datos.get(columna) is not None:
+            indices[nombre].marcar(datos[columna])
+
+
+broker.agregar_oyente(_marcar_por_evento)
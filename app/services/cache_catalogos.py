@@ -0,0 +1,95 @@
+# app/services/cache_catalogos.py
+
+import time
+from bisect import bisect_right
+from typing import List, Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import Table
+from sqlalchemy.orm import Session
+
+from app.config import CACHE_LOCAL_TTL
+from app.models.models import Entradas, Indicadores
+from app.schemas.indicator import IndicatorRead
+from app.schemas.input import InputRead
+from app.services.feed import broker
+from app.utils.serializacion import RespuestaJSON, adaptador_lista
+
+
+class CacheCatalogo:
+    """Copia en memoria (por worker) de un catálogo de lectura frecuente, ya validada y ordenada por id.
+
+    Se carga en la primera lectura y se descarta cuando llega el evento de auditoría de una escritura
+    sobre el catálogo (en este worker o, con LISTEN/NOTIFY, en cualquier otro). Sin NOTIFY y con
+    varios workers caduca además a los CACHE_LOCAL_TTL segundos.
+    """
+
+    def __init__(self, tabla: Table, modelo: Type[BaseModel]):
+        self.tabla = tabla
+        self.modelo = modelo
+        self.campos = frozenset(campo.alias or nombre for nombre, campo in modelo.model_fields.items())
+        self.filas: Optional[List[dict]] = None
+        self.ids: List[int] = []
+        self.cargado = 0.0
+        self.cargas = 0
+        self.invalidaciones = 0
+
+    def cargar(self, db: Session) -> List[dict]:
+        if self.filas is not None and CACHE_LOCAL_TTL and time.monotonic() - self.cargado > CACHE_LOCAL_TTL:
+            self.invalidar()
+        if self.filas is None:
+            rows = db.execute(self.tabla.select().order_by(self.tabla.c.id)).mappings().all()
+            adaptador = adaptador_lista(self.modelo)
+            filas = adaptador.dump_python(adaptador.validate_python(rows), mode="json", by_alias=True)
+            self.ids = [fila["id"] for fila in filas]
+            self.filas = filas
+            self.cargado = time.monotonic()
+            self.cargas += 1
+        return self.filas
+
+    def invalidar(self):
+        self.invalidaciones += 1
+        self.filas = None
+        self.ids = []
+
+    def pagina(self, db: Session, limit: Optional[int], offset: int, despues_de: Optional[int], fields: Optional[str]) -> RespuestaJSON:
+        """Página del catálogo por limit/offset o por cursor (`despues_de` = último id recibido), con selección de campos."""
+        if (limit is not None and limit <= 0) or offset < 0:
+            raise HTTPException(status_code=400, detail="limit debe ser positivo y offset no negativo.")
+        seleccion = None
+        if fields:
+            seleccion = [campo.strip() for campo in fields.split(",") if campo.strip()]
+            invalidos = [campo for campo in seleccion if campo not in self.campos]
+            if invalidos:
+                raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}. Opciones: {', '.join(sorted(self.campos))}")
+
+        filas = self.cargar(db)
+        inicio = bisect_right(self.ids, despues_de) if despues_de is not None else 0
+        inicio += offset
+        fin = len(filas) if limit is None else inicio + limit
+        pagina = filas[inicio:fin]
+        if seleccion:
+            pagina = [{campo: fila[campo] for campo in seleccion} for fila in pagina]
+
+        headers = {"X-Total-Count": str(len(filas))}
+        if fin < len(filas) and pagina:
+            headers["X-Next-Cursor"] = str(self.ids[fin - 1])
+        return RespuestaJSON(pagina, headers=headers)
+
+
+cache_entradas = CacheCatalogo(Entradas.__table__, InputRead)
+cache_indicadores = CacheCatalogo(Indicadores.__table__, IndicatorRead)
+
+
+def _invalidar_por_evento(tipo: str, datos: dict):
+    # create/update de entradas e indicadores siempre dejan un registro de auditoría
+    if tipo != "registro":
+        return
+    if datos.get("id_entrada") is not None:
+        cache_entradas.invalidar()
+    if datos.get("id_indicador") is not None:
+        cache_indicadores.invalidar()
+
+
+broker.agregar_oyente(_invalidar_por_evento)
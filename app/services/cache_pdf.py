@@ -0,0 +1,104 @@
+# app/services/cache_pdf.py
+
+import hashlib
+import os
+import shutil
+import threading
+from typing import IO, Iterable, Optional
+
+from app.config import PDF_CACHE_DIR, PDF_CACHE_MAX_MB
+
+
+class EscritorHash:
+    """Escribe texto en un archivo y va calculando su sha256, sin guardar el documento en memoria."""
+
+    def __init__(self, archivo: IO[str]):
+        self.archivo = archivo
+        self.huella = hashlib.sha256()
+
+    def write(self, texto: str):
+        self.archivo.write(texto)
+        self.huella.update(texto.encode("utf-8"))
+
+
+def clave_reporte(escrito: EscritorHash, modificados: Iterable) -> str:
+    """Clave del PDF: hash del .tex junto con los `modificado` de las filas referenciadas."""
+    huella = escrito.huella.copy()
+    for modificado in modificados:
+        huella.update(b"\0" + str(modificado).encode())
+    return huella.hexdigest()
+
+
+class CachePDF:
+    """PDFs generados, guardados en disco por clave de contenido y acotados por tamaño (LRU por mtime).
+
+    El directorio puede compartirse entre workers: las escrituras son atómicas (os.replace) y cada
+    acierto actualiza el mtime del archivo, que es lo que usa el recorte para descartar los menos usados.
+    """
+
+    def __init__(self, directorio: str, max_bytes: int):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartados = 0
+        self.lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def obtener(self, clave: str) -> Optional[str]:
+        ruta = self.ruta(clave)
+        try:
+            os.utime(ruta)
+        except FileNotFoundError:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return ruta
+
+    def guardar(self, clave: str, pdf: str) -> str:
+        ruta = self.ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(pdf, temporal)
+        os.replace(temporal, ruta)
+        self.recortar()
+        return ruta
+
+    def recortar(self):
+        with self.lock:
+            archivos = []
+            for entrada in os.scandir(self.directorio):
+                if entrada.name.endswith(".pdf"):
+                    try:
+                        estado = entrada.stat()
+                    except FileNotFoundError:
+                        continue
+                    archivos.append((estado.st_mtime, estado.st_size, entrada.path))
+            total = sum(tamano for _, tamano, _ in archivos)
+            for _, tamano, ruta in sorted(archivos):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(ruta)
+                    self.descartados += 1
+                except FileNotFoundError:
+                    pass
+                total -= tamano
+
+    def estadisticas(self) -> dict:
+        archivos = [entrada.stat().st_size for entrada in os.scandir(self.directorio) if entrada.name.endswith(".pdf")]
+        total = self.aciertos + self.fallos
+        return {
+            "archivos": len(archivos),
+            "bytes": sum(archivos),
+            "max_bytes": self.max_bytes,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+            "descartados": self.descartados,
+        }
+
+
+cache_pdf = CachePDF(PDF_CACHE_DIR, PDF_CACHE_MAX_MB * 1024 * 1024)
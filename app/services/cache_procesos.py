@@ -0,0 +1,143 @@
+# app/services/cache_procesos.py
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.config import CACHE_LOCAL_TTL
+from app.services.feed import broker
+
+# Máximo de variantes del listado (combinaciones de paginación/orden) guardadas a la vez
+MAX_LISTADOS = 128
+
+
+class Snapshot:
+    """Respuesta inmutable ya serializada de una definición de proceso."""
+
+    __slots__ = ("version", "contenido", "etag", "headers")
+
+    def __init__(self, version: int, contenido: bytes, headers: Optional[Dict[str, str]] = None):
+        self.version = version
+        self.contenido = contenido
+        # ETag fuerte derivado del contenido: es el mismo en todos los workers para la misma definición
+        self.etag = f'"{hashlib.sha1(contenido).hexdigest()}"'
+        self.headers = headers or {}
+
+
+class CacheProcesos:
+    """Caché en memoria de definiciones de procesos (y sus planes de ejecución), por id y versión.
+
+    Cada invalidación incrementa la versión; un snapshot construido con una versión anterior
+    (porque la definición cambió mientras se leía de la base de datos) no se guarda.
+    Con CACHE_LOCAL_TTL todo se descarta además cada ese número de segundos (ver app/config.py).
+    """
+
+    def __init__(self):
+        self.procesos: Dict[int, Snapshot] = {}
+        self.planes: Dict[int, Any] = {}
+        self.listados: "OrderedDict[Hashable, Snapshot]" = OrderedDict()
+        self.versiones: Dict[int, int] = {}
+        self.version_global = 0
+        self.vaciado = time.monotonic()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def version(self, proceso_id: int) -> int:
+        return self.version_global + self.versiones.get(proceso_id, 0)
+
+    def _caducar(self):
+        # Sin eventos de los demás workers, la única forma de ver sus escrituras es volver a leer
+        if CACHE_LOCAL_TTL and time.monotonic() - self.vaciado > CACHE_LOCAL_TTL:
+            self.invalidar_todo()
+
+    def _obtener(self, entradas: dict, proceso_id: int, construir: Callable[[], Any], empaquetar: Callable[[int, Any], Any]):
+        self._caducar()
+        guardado = entradas.get(proceso_id)
+        if guardado is not None and guardado.version == self.version(proceso_id):
+            self.aciertos += 1
+            return guardado
+
+        self.fallos += 1
+        version = self.version(proceso_id)
+        valor = construir()
+        if valor is None:
+            return None
+        guardado = empaquetar(version, valor)
+        if version == self.version(proceso_id):
+            entradas[proceso_id] = guardado
+        return guardado
+
+    def obtener_proceso(self, proceso_id: int, construir: Callable[[], Optional[bytes]]) -> Optional[Snapshot]:
+        return self._obtener(self.procesos, proceso_id, construir, Snapshot)
+
+    def obtener_plan(self, proceso_id: int, construir: Callable[[], Any]):
+        """Plan de ejecución compilado; el objeto construido debe tener un atributo `version`."""
+        def empaquetar(version, plan):
+            plan.version = version
+            return plan
+        return self._obtener(self.planes, proceso_id, construir, empaquetar)
+
+    def obtener_listado(self, clave: Hashable, construir: Callable[[], Snapshot]) -> Snapshot:
+        self._caducar()
+        snapshot = self.listados.get(clave)
+        if snapshot is not None and snapshot.version == self.version_global:
+            self.aciertos += 1
+            self.listados.move_to_end(clave)
+            return snapshot
+
+        self.fallos += 1
+        version = self.version_global
+        snapshot = construir()
+        snapshot.version = version
+        if version == self.version_global:
+            self.listados[clave] = snapshot
+            if len(self.listados) > MAX_LISTADOS:
+                self.listados.popitem(last=False)
+        return snapshot
+
+    def invalidar_proceso(self, proceso_id: int):
+        self.invalidaciones += 1
+        self.versiones[proceso_id] = self.versiones.get(proceso_id, 0) + 1
+        self.procesos.pop(proceso_id, None)
+        self.planes.pop(proceso_id, None)
+        # El listado incluye los conteos de todos los procesos
+        self.listados.clear()
+
+    def invalidar_todo(self):
+        self.invalidaciones += 1
+        self.version_global += 1
+        self.vaciado = time.monotonic()
+        self.procesos.clear()
+        self.planes.clear()
+        self.listados.clear()
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "procesos": len(self.procesos),
+            "planes": len(self.planes),
+            "listados": len(self.listados),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+            "invalidaciones": self.invalidaciones,
+        }
+
+
+cache_procesos = CacheProcesos()
+
+
+def _invalidar_por_evento(tipo: str, datos: dict):
+    # Los registros de auditoría se publican en cada escritura de procesos, entradas e indicadores
+    if tipo != "registro":
+        return
+    if datos.get("id_proceso") is not None:
+        cache_procesos.invalidar_proceso(datos["id_proceso"])
+    elif datos.get("id_entrada") is not None or datos.get("id_indicador") is not None:
+        # Un cambio de nombre o tipo puede aparecer en cualquier árbol de proceso
+        cache_procesos.invalidar_todo()
+
+
+broker.agregar_oyente(_invalidar_por_evento)
@@ -0,0 +1,144 @@
+# app/services/carga_masiva.py
+
+import csv
+import io
+from enum import Enum
+from typing import Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.models import TipoEnumEntidad
+from app.services.auditoria import crear_registros
+
+
+def leer_csv(archivo: UploadFile) -> List[dict]:
+    """Lee un CSV con encabezados (nombre, tipo, descripcion[, id]); las celdas vacías se omiten."""
+    try:
+        # Se decodifica el contenido completo: en Python 3.9 el SpooledTemporaryFile de Starlette no admite TextIOWrapper
+        lector = csv.DictReader(io.StringIO(archivo.file.read().decode("utf-8-sig"), newline=""))
+        return [{clave.strip(): valor.strip() for clave, valor in fila.items() if clave and valor and valor.strip()} for fila in lector]
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"CSV inválido: {e}")
+
+
+def _mensajes(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in detalle['loc'])}: {detalle['msg']}" for detalle in error.errors()]
+
+
+def validar_filas(modelo: Type[BaseModel], filas: List[dict], tipos: Type[Enum], parcial: bool = False) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """Valida todas las filas antes de escribir. Devuelve (válidas como (fila, datos), errores por fila).
+
+    Con `parcial` solo se conservan los campos enviados (actualizaciones); si no, se aplican los valores por defecto.
+    """
+    validas = []
+    errores = []
+    tipos_validos = {tipo.value for tipo in tipos}
+    for indice, fila in enumerate(filas):
+        try:
+            datos = modelo.model_validate(fila).model_dump(exclude_unset=parcial, by_alias=True)
+        except ValidationError as e:
+            errores.append({"fila": indice, "estado": "error", "errores": _mensajes(e)})
+            continue
+        if "tipo" in datos:
+            tipo = datos["tipo"].value if isinstance(datos["tipo"], Enum) else datos["tipo"]
+            if tipo not in tipos_validos:
+                errores.append({"fila": indice, "estado": "error", "errores": [f"tipo: debe ser uno de {', '.join(sorted(tipos_validos))}"]})
+                continue
+            datos["tipo"] = tipos(tipo)
+        validas.append((indice, datos))
+    return validas, errores
+
+
+def _responder(resultados: List[dict], todo_o_nada: bool, errores: List[dict]):
+    resultados.sort(key=lambda r: r["fila"])
+    resumen = {
+        "total": len(resultados),
+        "exitosos": sum(1 for r in resultados if r["estado"] != "error"),
+        "errores": sum(1 for r in resultados if r["estado"] == "error"),
+        "resultados": resultados,
+    }
+    if todo_o_nada and errores:
+        raise HTTPException(status_code=400, detail=resumen)
+    return resumen
+
+
+def crear_en_lote(db: Session, modelo_orm, modelo: Type[BaseModel], tipos: Type[Enum], tipo_entidad: TipoEnumEntidad,
+                  etiqueta: str, filas: List[dict], todo_o_nada: bool = False):
+    """Crea filas de un catálogo y sus registros de auditoría con inserciones multi-fila en una transacción."""
+    # El id lo asigna la base de datos; el esquema lo declara pero no se envía al crear
+    validas, errores = validar_filas(modelo, [{"id": None, **fila} for fila in filas], tipos)
+    resultados = list(errores)
+    if todo_o_nada and errores:
+        return _responder(resultados, todo_o_nada, errores)
+
+    if validas:
+        tabla = modelo_orm.__table__
+        valores = []
+        for _, datos in validas:
+            datos.pop("id", None)
+            valores.append({"nombre": datos.get("nombre"), "tipo": datos.get("tipo"), "descripcion": datos.get("descripcion")})
+        try:
+            with db.begin():
+                creados = db.execute(
+                    tabla.insert().returning(tabla.c.id, sort_by_parameter_order=True), valores
+                ).scalars().all()
+                crear_registros(db, tipo_entidad, [
+                    (id_creado, f'CREACION DE {etiqueta} "{fila["nombre"]}"') for id_creado, fila in zip(creados, valores)
+                ])
+        except SQLAlchemyError as e:
+            print(f"Error en la carga masiva: {e}")
+            raise HTTPException(status_code=500, detail="Error al guardar el lote; no se aplicó ningún cambio")
+        resultados += [{"fila": indice, "estado": "creado", "id": id_creado} for (indice, _), id_creado in zip(validas, creados)]
+
+    return _responder(resultados, todo_o_nada, errores)
+
+
+def actualizar_en_lote(db: Session, modelo_orm, modelo: Type[BaseModel], tipos: Type[Enum], tipo_entidad: TipoEnumEntidad,
+                       etiqueta: str, filas: List[dict], todo_o_nada: bool = False):
+    """Actualiza filas de un catálogo por id (UPDATE en lote por llave primaria) y registra cada cambio."""
+    validas, errores = validar_filas(modelo, filas, tipos, parcial=True)
+    tabla = modelo_orm.__table__
+
+    # Un solo SELECT para comprobar que existen todos los ids
+    ids = [datos["id"] for _, datos in validas]
+    existentes: Dict[int, Optional[str]] = dict(
+        db.execute(tabla.select().with_only_columns(tabla.c.id, tabla.c.nombre).where(tabla.c.id.in_(ids))).all()
+    ) if ids else {}
+    db.rollback()  # Cierra la transacción implícita de la consulta antes de abrir la de escritura
+
+    vistos = set()
+    cambios = []
+    for indice, datos in validas:
+        if set(datos) <= {"id"}:
+            # Sin campos que cambiar; no debe llegar al UPDATE en lote
+            errores.append({"fila": indice, "estado": "error", "errores": ["la fila solo tiene id; no hay campos para actualizar"]})
+        elif datos["id"] not in existentes:
+            errores.append({"fila": indice, "estado": "error", "errores": [f"id: {datos['id']} no existe"]})
+        elif datos["id"] in vistos:
+            errores.append({"fila": indice, "estado": "error", "errores": [f"id: {datos['id']} está repetido en el lote"]})
+        else:
+            vistos.add(datos["id"])
+            cambios.append((indice, datos))
+
+    resultados = list(errores)
+    if todo_o_nada and errores:
+        return _responder(resultados, todo_o_nada, errores)
+
+    if cambios:
+        try:
+            with db.begin():
+                db.execute(update(modelo_orm), [datos for _, datos in cambios])
+                crear_registros(db, tipo_entidad, [
+                    (datos["id"], f'ACTUALIZACION DE {etiqueta} "{existentes[datos["id"]]} -> {datos.get("nombre", existentes[datos["id"]])}"')
+                    for _, datos in cambios
+                ])
+        except SQLAlchemyError as e:
+            print(f"Error en la carga masiva: {e}")
+            raise HTTPException(status_code=500, detail="Error al guardar el lote; no se aplicó ningún cambio")
+        resultados += [{"fila": indice, "estado": "actualizado", "id": datos["id"]} for indice, datos in cambios]
+
+    return _responder(resultados, todo_o_nada, errores)
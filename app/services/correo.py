@@ -0,0 +1,297 @@
+# app/services/correo.py
+
+import asyncio
+import base64
+import os
+import uuid
+from datetime import timedelta
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import (
+    RESEND_KEY, RESEND_BASE_URL, CORREO_REMITENTE, CORREOS_DIR, CORREO_LOTE, CORREO_MAX_INTENTOS,
+    CORREO_BACKOFF_BASE, CORREO_BACKOFF_MAX, CORREO_TIMEOUT, CORREO_INTERVALO,
+)
+from app.db.database import SessionLocal
+from app.models.models import CorreoSalida, EstadoCorreo
+from app.services.reportes import enlazar
+
+correo_table = CorreoSalida.__table__
+
+# Correos reclamados por ciclo del remitente
+RECLAMO_POR_CICLO = 20
+# Si un worker muere con un correo "enviando", otro lo retoma pasado este tiempo. Cubre el peor caso de un
+# ciclo (cada petición puede esperar CORREO_TIMEOUT al conectar y otro tanto al leer) más un margen, para
+# que ningún correo del lote se reclame de nuevo mientras el worker original aún lo está enviando
+RECLAMO_VENCE = timedelta(seconds=RECLAMO_POR_CICLO * 2 * CORREO_TIMEOUT + 60)
+
+ASUNTO_REPORTE = "Reporte Enviado - Acción Requerida"
+HTML_REPORTE = """
+<html>
+  <head>
+    <style>
+      body {
+        font-family: Arial, sans-serif;
+        margin: 0;
+        padding: 20px;
+        background-color: #f4f4f4;
+      }
+      .container {
+        max-width: 600px;
+        margin: auto;
+        background: white;
+        border-radius: 8px;
+        box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);
+        padding: 20px;
+      }
+      h1 {
+        color: #333;
+      }
+      p {
+        color: #666;
+        line-height: 1.5;
+      }
+      .footer {
+        margin-top: 30px;
+        font-size: 0.8em;
+        color: #999;
+      }
+    </style>
+  </head>
+  <body>
+    <div class="container">
+      <h1>Estimado Gerente,</h1>
+      <p>Se ha generado un reporte solicitado y se encuentra adjunto a este correo.</p>
+      <p>Atentamente,</p>
+      <p>El equipo de A.C.I.B Registros</p>
+      <div class="footer">
+        <p>Si no reconoce este correo, por favor, ignórelo.</p>
+        <p>Panel A.C.I.B - URL</p>
+      </div>
+    </div>
+  </body>
+</html>
+"""
+
+
+class ErrorEnvio(Exception):
+    def __init__(self, mensaje: str, reintentar: bool):
+        super().__init__(mensaje)
+        self.reintentar = reintentar
+
+
+class ClienteResend:
+    """Cliente HTTP de la API de Resend con una sesión (y conexiones) reutilizada entre envíos."""
+
+    def __init__(self, base_url: str, api_key: Optional[str], timeout: int):
+        self.url = f"{base_url.rstrip('/')}/emails"
+        self.timeout = timeout
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.headers.update({"Authorization": f"Bearer {api_key or ''}"})
+
+    def enviar(self, parametros: dict) -> Optional[str]:
+        """Envía un correo y devuelve su id. Los errores de red, 429 y 5xx se marcan para reintento."""
+        try:
+            respuesta = self.sesion.post(self.url, json=parametros, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ErrorEnvio(f"Error de conexión: {e}", reintentar=True)
+        if respuesta.status_code == 429 or respuesta.status_code >= 500:
+            raise ErrorEnvio(f"HTTP {respuesta.status_code}: {respuesta.text[:200]}", reintentar=True)
+        if respuesta.status_code >= 400:
+            raise ErrorEnvio(f"HTTP {respuesta.status_code}: {respuesta.text[:200]}", reintentar=False)
+        return respuesta.json().get("id")
+
+
+def encolar_correos(db: Session, id_trabajo: str, pdf: str, emails: List[str], asunto: str = ASUNTO_REPORTE) -> str:
+    """Guarda en la bandeja de salida un correo por cada lote de destinatarios. Devuelve el id del envío."""
+    id_envio = uuid.uuid4().hex
+    os.makedirs(CORREOS_DIR, exist_ok=True)
+    adjunto = os.path.abspath(os.path.join(CORREOS_DIR, f"{id_envio}.pdf"))
+    # El trabajo de reporte se limpia por retención; el adjunto queda enlazado hasta terminar el envío
+    enlazar(pdf, adjunto)
+
+    lotes = [emails[i:i + CORREO_LOTE] for i in range(0, len(emails), CORREO_LOTE)]
+    db.execute(correo_table.insert(), [
+        {
+            "id_envio": id_envio,
+            "id_trabajo": id_trabajo,
+            "adjunto": adjunto,
+            "asunto": asunto,
+            "destinatarios": lote,
+            "estado": EstadoCorreo.pendiente,
+            "intentos": 0,
+        }
+        for lote in lotes
+    ])
+    db.commit()
+    remitente.despertar()
+    return id_envio
+
+
+def estado_envio(db: Session, id_envio: str) -> Optional[dict]:
+    filas = db.execute(
+        select(correo_table).where(correo_table.c.id_envio == id_envio).order_by(correo_table.c.id)
+    ).mappings().all()
+    if not filas:
+        return None
+    estados = {fila["estado"] for fila in filas}
+    if estados == {EstadoCorreo.enviado}:
+        general = "enviado"
+    elif estados <= {EstadoCorreo.enviado, EstadoCorreo.error}:
+        general = "error"
+    else:
+        general = "pendiente"
+    return {
+        "id_envio": id_envio,
+        "estado": general,
+        "correos": [
+            {
+                "id": fila["id"],
+                "estado": fila["estado"].value,
+                "destinatarios": fila["destinatarios"],
+                "intentos": fila["intentos"],
+                "proximo_intento": fila["proximo_intento"] if fila["estado"] in (EstadoCorreo.pendiente, EstadoCorreo.enviando) else None,
+                "ultimo_error": fila["ultimo_error"],
+                "id_proveedor": fila["id_proveedor"],
+                "enviado": fila["enviado"],
+            }
+            for fila in filas
+        ],
+    }
+
+
+class RemitenteCorreos:
+    """Envía en segundo plano los correos pendientes de la bandeja, con reintentos y backoff exponencial.
+
+    Los correos se reclaman con FOR UPDATE SKIP LOCKED, así varios workers pueden compartir la bandeja.
+    """
+
+    def __init__(self, cliente: ClienteResend):
+        self.cliente = cliente
+        self._evento: Optional[asyncio.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.enviados = 0
+        self.reintentos = 0
+        self.fallidos = 0
+
+    def despertar(self):
+        # Puede llamarse desde cualquier hilo
+        if self.loop is not None and self._evento is not None:
+            self.loop.call_soon_threadsafe(self._evento.set)
+
+    def reclamar(self, db: Session) -> list:
+        filas = db.execute(
+            select(correo_table)
+            .where(correo_table.c.estado.in_([EstadoCorreo.pendiente, EstadoCorreo.enviando]))
+            .where(correo_table.c.proximo_intento <= func.now())
+            .order_by(correo_table.c.proximo_intento)
+            .limit(RECLAMO_POR_CICLO)
+            .with_for_update(skip_locked=True)
+        ).mappings().all()
+        # Un correo "enviando" cuyo reclamo venció ya gastó sus intentos si el worker murió en el último
+        agotadas = [fila for fila in filas if fila["intentos"] >= CORREO_MAX_INTENTOS]
+        filas = [fila for fila in filas if fila["intentos"] < CORREO_MAX_INTENTOS]
+        if agotadas:
+            db.execute(
+                update(correo_table)
+                .where(correo_table.c.id.in_([fila["id"] for fila in agotadas]))
+                .values(estado=EstadoCorreo.error, ultimo_error="Intentos agotados: el último envío quedó sin confirmar")
+            )
+            self.fallidos += len(agotadas)
+        if filas:
+            db.execute(
+                update(correo_table)
+                .where(correo_table.c.id.in_([fila["id"] for fila in filas]))
+                .values(estado=EstadoCorreo.enviando, intentos=correo_table.c.intentos + 1, proximo_intento=func.now() + RECLAMO_VENCE)
+            )
+        db.commit()
+        for fila in agotadas:
+            self._terminar_envio(db, fila)
+        db.commit()
+        return filas
+
+    def _enviar(self, fila) -> Optional[str]:
+        try:
+            with open(fila["adjunto"], "rb") as f:
+                contenido = base64.b64encode(f.read()).decode("utf-8")
+        except OSError as e:
+            raise ErrorEnvio(f"Adjunto no disponible: {e}", reintentar=False)
+        return self.cliente.enviar({
+            "from": CORREO_REMITENTE,
+            "to": fila["destinatarios"],
+            "subject": fila["asunto"],
+            "html": HTML_REPORTE,
+            "attachments": [{"content": contenido, "filename": "reporte.pdf"}],
+        })
+
+    def _terminar_envio(self, db: Session, fila):
+        # Cuando ningún lote del envío queda pendiente, el adjunto ya no se necesita
+        pendientes = db.execute(
+            select(func.count()).select_from(correo_table)
+            .where(correo_table.c.id_envio == fila["id_envio"])
+            .where(correo_table.c.estado.in_([EstadoCorreo.pendiente, EstadoCorreo.enviando]))
+        ).scalar()
+        if not pendientes:
+            try:
+                os.remove(fila["adjunto"])
+            except OSError:
+                pass
+
+    def procesar(self) -> int:
+        """Un ciclo: reclama correos vencidos y los envía. Devuelve cuántos procesó."""
+        db = SessionLocal()
+        try:
+            filas = self.reclamar(db)
+            for fila in filas:
+                intentos = fila["intentos"] + 1
+                valores = {}
+                try:
+                    valores = {"estado": EstadoCorreo.enviado, "id_proveedor": self._enviar(fila), "enviado": func.now(), "ultimo_error": None}
+                    self.enviados += 1
+                except ErrorEnvio as e:
+                    if e.reintentar and intentos < CORREO_MAX_INTENTOS:
+                        espera = min(CORREO_BACKOFF_BASE * 2 ** (intentos - 1), CORREO_BACKOFF_MAX)
+                        valores = {"estado": EstadoCorreo.pendiente, "proximo_intento": func.now() + timedelta(seconds=espera), "ultimo_error": str(e)}
+                        self.reintentos += 1
+                    else:
+                        valores = {"estado": EstadoCorreo.error, "ultimo_error": str(e)}
+                        self.fallidos += 1
+                    print(f"Error enviando el correo {fila['id']} (intento {intentos}): {e}")
+                db.execute(update(correo_table).where(correo_table.c.id == fila["id"]).values(**valores))
+                db.commit()
+                if valores["estado"] != EstadoCorreo.pendiente:
+                    self._terminar_envio(db, fila)
+                    db.commit()
+            return len(filas)
+        finally:
+            db.close()
+
+    async def ejecutar_periodicamente(self):
+        self.loop = asyncio.get_running_loop()
+        self._evento = asyncio.Event()
+        while True:
+            try:
+                procesados = await asyncio.to_thread(self.procesar)
+            except Exception as e:
+                print(f"Error en la bandeja de correos: {e}")
+                procesados = 0
+            if procesados:
+                continue
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=CORREO_INTERVALO)
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+
+    def estadisticas(self) -> dict:
+        return {"enviados": self.enviados, "reintentos": self.reintentos, "fallidos": self.fallidos}
+
+
+remitente = RemitenteCorreos(ClienteResend(RESEND_BASE_URL, RESEND_KEY, CORREO_TIMEOUT))
@@ -0,0 +1,94 @@
+# app/services/documentos.py
+#
+# Renderizado de reportes LaTeX a partir de plantillas Mako (app/templates/latex) y formato
+# precompilado de pdflatex con el preámbulo fijo. Para generar el formato:
+#
+#   python -m app.services.documentos
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from typing import IO
+
+from mako.lookup import TemplateLookup
+from mako.runtime import Context
+
+from app.config import LATEX_FORMATO_DIR
+
+PLANTILLAS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "latex")
+PREAMBULO = os.path.join(PLANTILLAS_DIR, "preambulo.tex")
+FORMATO = "reporte"
+FORMATO_DIR = os.path.abspath(LATEX_FORMATO_DIR)
+
+_ESCAPES = str.maketrans({
+    "\\": r"\textbackslash{}",
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+})
+
+
+def escapar(valor) -> str:
+    """Texto literal para LaTeX: escapa los caracteres especiales. None se escribe vacío."""
+    if valor is None:
+        return ""
+    return str(valor).translate(_ESCAPES)
+
+
+def _preprocesar(fuente: str) -> str:
+    # En Mako "\" al final de la línea une líneas; el salto de línea de LaTeX "\\" debe conservarse
+    return re.sub(r"(?<=\\\\)\n", "${''}\n", fuente)
+
+
+plantillas = TemplateLookup(
+    directories=[PLANTILLAS_DIR],
+    default_filters=["escapar"],
+    imports=["from app.services.documentos import escapar"],
+    preprocessor=_preprocesar,
+    input_encoding="utf-8",
+)
+
+
+def formato_disponible() -> bool:
+    return os.path.exists(os.path.join(FORMATO_DIR, f"{FORMATO}.fmt"))
+
+
+def encabezado() -> str:
+    """Con el formato precompilado el documento solo lo referencia (%&); si no, lleva el preámbulo completo."""
+    if formato_disponible():
+        return f"%&{FORMATO}"
+    with open(PREAMBULO, encoding="utf-8") as f:
+        return f.read()
+
+
+def renderizar(nombre: str, salida: IO[str], **contexto):
+    """Escribe la plantilla directamente en `salida` (archivo o buffer)."""
+    plantillas.get_template(nombre).render_context(Context(salida, encabezado=encabezado(), **contexto))
+
+
+def construir_formato(directorio: str = FORMATO_DIR) -> str:
+    """Genera `reporte.fmt` volcando el preámbulo con pdflatex -ini."""
+    os.makedirs(directorio, exist_ok=True)
+    with tempfile.TemporaryDirectory() as temporal:
+        fuente = os.path.join(temporal, f"{FORMATO}.tex")
+        with open(fuente, "w", encoding="utf-8") as f:
+            f.write(f"\\input{{{PREAMBULO}}}\n\\dump\n")
+        subprocess.run(
+            ["pdflatex", "-ini", f"-jobname={FORMATO}", "&pdflatex", fuente],
+            cwd=temporal, check=True, stdout=subprocess.DEVNULL,
+        )
+        destino = os.path.join(directorio, f"{FORMATO}.fmt")
+        shutil.move(os.path.join(temporal, f"{FORMATO}.fmt"), destino)
+    return destino
+
+
+if __name__ == "__main__":
+    print(f"Formato generado en {construir_formato()}")
@@ -0,0 +1,189 @@
+# app/services/feed.py
+
+import asyncio
+import json
+import select
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.config import FEED_QUEUE_SIZE, FEED_PG_NOTIFY, FEED_PG_CHANNEL, DB_POOL_TRANSACCIONAL, WEB_CONCURRENCY, CACHE_LOCAL_TTL
+from app.db.database import SessionLocal, engine
+
+PENDIENTES_KEY = "feed_pendientes"
+NOTIFICADOS_KEY = "feed_notificados"
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente conectado al feed."""
+
+    def __init__(self, maxsize: int):
+        self.cola = asyncio.Queue(maxsize=maxsize)
+        self.descartados = 0
+
+    def entregar(self, evento):
+        # Backpressure: si el cliente no consume a tiempo se descarta el evento más antiguo
+        if self.cola.full():
+            self.cola.get_nowait()
+            self.descartados += 1
+        self.cola.put_nowait(evento)
+
+
+class Broker:
+    """Pub/sub en proceso. Cada evento se serializa una sola vez y se reparte a todas las colas.
+
+    Además de las colas de los clientes, admite oyentes internos (por ejemplo, invalidación de cachés)
+    que se llaman con (tipo, datos) por cada evento.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.suscripciones = set()
+        self.oyentes = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def suscribir(self) -> Suscripcion:
+        suscripcion = Suscripcion(self.maxsize)
+        self.suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        self.suscripciones.discard(suscripcion)
+
+    def agregar_oyente(self, oyente: Callable[[str, dict], None]):
+        self.oyentes.append(oyente)
+
+    def notificar_oyentes(self, tipo: str, datos: dict):
+        for oyente in self.oyentes:
+            try:
+                oyente(tipo, datos)
+            except Exception as e:
+                print(f"Error en oyente del feed: {e}")
+
+    def _distribuir(self, tipo: str, carga: str, datos: dict):
+        self.notificar_oyentes(tipo, datos)
+        for suscripcion in list(self.suscripciones):
+            suscripcion.entregar((tipo, carga))
+
+    def publicar_serializado(self, carga: str):
+        """Publica un evento ya serializado en JSON. Puede llamarse desde cualquier hilo."""
+        mensaje = json.loads(carga)
+        tipo, datos = mensaje.get("tipo", "mensaje"), mensaje.get("datos", {})
+        if self.loop is None:
+            # Sin loop (fuera del servidor) no hay clientes, pero los oyentes internos siguen aplicando
+            self.notificar_oyentes(tipo, datos)
+            return
+        try:
+            en_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            en_loop = False
+        if en_loop:
+            self._distribuir(tipo, carga, datos)
+        else:
+            self.loop.call_soon_threadsafe(self._distribuir, tipo, carga, datos)
+
+    def publicar(self, tipo: str, datos: dict):
+        self.publicar_serializado(serializar(tipo, datos))
+
+
+broker = Broker(FEED_QUEUE_SIZE)
+
+
+def serializar(tipo: str, datos: dict) -> str:
+    return json.dumps({"tipo": tipo, "datos": datos}, default=str)
+
+
+def encolar_evento(db: Session, tipo: str, datos: dict):
+    """Deja un evento pendiente en la sesión; solo se publica cuando la transacción hace commit."""
+    db.info.setdefault(PENDIENTES_KEY, []).append(serializar(tipo, datos))
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _notificar_postgres(session):
+    # Con LISTEN/NOTIFY el aviso viaja dentro de la transacción y Postgres lo entrega al hacer commit
+    if not FEED_PG_NOTIFY:
+        return
+    cargas = session.info.pop(PENDIENTES_KEY, [])
+    for carga in cargas:
+        session.execute(text("SELECT pg_notify(:canal, :carga)"), {"canal": FEED_PG_CHANNEL, "carga": carga})
+    session.info[NOTIFICADOS_KEY] = cargas
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publicar_pendientes(session):
+    for carga in session.info.pop(PENDIENTES_KEY, []):
+        broker.publicar_serializado(carga)
+    # Los eventos enviados por NOTIFY llegan de vuelta por el oyente; los oyentes internos
+    # de este worker se avisan ya para que lean sus propias escrituras
+    for carga in session.info.pop(NOTIFICADOS_KEY, []):
+        mensaje = json.loads(carga)
+        broker.notificar_oyentes(mensaje["tipo"], mensaje["datos"])
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_pendientes(session):
+    session.info.pop(PENDIENTES_KEY, None)
+    session.info.pop(NOTIFICADOS_KEY, None)
+
+
+class OyentePostgres(threading.Thread):
+    """Hilo que escucha el canal de NOTIFY y reenvía los eventos al broker local."""
+
+    def __init__(self, canal: str):
+        super().__init__(name="feed-listener", daemon=True)
+        self.canal = canal
+        self.detener = threading.Event()
+
+    def run(self):
+        while not self.detener.is_set():
+            conexion = None
+            try:
+                conexion = engine.raw_connection()
+                dbapi = conexion.driver_connection
+                dbapi.autocommit = True
+                with dbapi.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.canal}"')
+                while not self.detener.is_set():
+                    if select.select([dbapi], [], [], 1.0) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        broker.publicar_serializado(dbapi.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Error en el oyente del feed: {e}")
+                time.sleep(1)
+            finally:
+                if conexion is not None:
+                    # La conexión quedó en autocommit; no se devuelve al pool
+                    conexion.invalidate()
+
+
+_oyente: Optional[OyentePostgres] = None
+
+
+def iniciar():
+    global _oyente
+    broker.loop = asyncio.get_running_loop()
+    if WEB_CONCURRENCY > 1 and not FEED_PG_NOTIFY:
+        print(
+            f"WEB_CONCURRENCY={WEB_CONCURRENCY} sin FEED_PG_NOTIFY: las cachés de cada worker no ven las escrituras "
+            f"de los demás y caducan cada {CACHE_LOCAL_TTL} s (CACHE_LOCAL_TTL)"
+        )
+    if FEED_PG_NOTIFY:
+        if DB_POOL_TRANSACCIONAL:
+            # LISTEN necesita una sesión propia; un pooler en modo transacción no la conserva
+            print("FEED_PG_NOTIFY con DB_POOL_TRANSACCIONAL: el oyente debe conectarse a Postgres directamente o vía pool de sesión")
+        _oyente = OyentePostgres(FEED_PG_CHANNEL)
+        _oyente.start()
+
+
+def detener():
+    global _oyente
+    if _oyente is not None:
+        _oyente.detener.set()
+        _oyente.join(timeout=5)
+        _oyente = None
+    broker.loop = None
@@ -0,0 +1,123 @@
+# app/services/particiones.py
+
+import asyncio
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import REGISTRO_PARTICIONES_ADELANTE, REGISTRO_RETENCION_MESES
+from app.db.database import SessionLocal
+
+TABLA = "registro"
+PARTICION_DEFAULT = f"{TABLA}_default"
+PATRON_PARTICION = re.compile(r"^registro_y(\d{4})m(\d{2})$")
+INTERVALO_MANTENIMIENTO = 24 * 60 * 60  # Una vez al día (en segundos)
+# Clave del advisory lock para que un solo worker mantenga las particiones a la vez
+LOCK_PARTICIONES = 702801
+
+
+def sumar_meses(fecha: date, meses: int) -> date:
+    total = fecha.year * 12 + fecha.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nombre_particion(mes: date) -> str:
+    return f"{TABLA}_y{mes.year:04d}m{mes.month:02d}"
+
+
+def crear_particion(db: Session, mes: date) -> bool:
+    """Crea la partición de `mes` si falta, pasándole las filas de ese mes que ya cayeron en DEFAULT."""
+    nombre = nombre_particion(mes)
+    if db.execute(text("SELECT to_regclass(:nombre)"), {"nombre": nombre}).scalar():
+        return False
+    desde, hasta = mes, sumar_meses(mes, 1)
+    # CREATE TABLE ... PARTITION OF falla si DEFAULT ya tiene filas del rango: la tabla se crea suelta,
+    # recibe esas filas y se adjunta; ATTACH comprueba DEFAULT sin las filas que ya se movieron
+    db.execute(text(f"CREATE TABLE {nombre} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    movidas = db.execute(text(
+        f"WITH movidas AS ("
+        f"DELETE FROM {PARTICION_DEFAULT} WHERE creado >= :desde AND creado < :hasta RETURNING *"
+        f") INSERT INTO {nombre} SELECT * FROM movidas"
+    ), {"desde": desde, "hasta": hasta}).rowcount
+    db.execute(text(
+        f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} "
+        f"FOR VALUES FROM ('{desde.isoformat()}') TO ('{hasta.isoformat()}')"
+    ))
+    if movidas:
+        print(f"Partición {nombre} creada con {movidas} filas movidas desde {PARTICION_DEFAULT}")
+    return True
+
+
+def crear_particiones(db: Session, desde: date, meses: int):
+    """Crea las particiones mensuales que falten desde el mes de `desde` en adelante.
+
+    Cada mes va en su propio SAVEPOINT: si uno falla se informa y se sigue con los demás.
+    """
+    inicio = date(desde.year, desde.month, 1)
+    creadas = []
+    for i in range(meses + 1):
+        mes = sumar_meses(inicio, i)
+        try:
+            with db.begin_nested():
+                if crear_particion(db, mes):
+                    creadas.append(nombre_particion(mes))
+        except Exception as e:
+            print(f"Error creando la partición {nombre_particion(mes)}: {e}")
+    return creadas
+
+
+def particiones_existentes(db: Session):
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :tabla"
+    ), {"tabla": TABLA}).scalars().all()
+    particiones = {}
+    for nombre in rows:
+        m = PATRON_PARTICION.match(nombre)
+        if m:
+            particiones[nombre] = date(int(m.group(1)), int(m.group(2)), 1)
+    return particiones
+
+
+def separar_particiones(db: Session, meses_retencion: int):
+    """Separa (DETACH) las particiones más antiguas que la retención; quedan como tablas sueltas para archivarlas."""
+    limite = sumar_meses(date.today().replace(day=1), -meses_retencion)
+    separadas = []
+    for nombre, mes in sorted(particiones_existentes(db).items(), key=lambda p: p[1]):
+        if mes >= limite:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(text(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}"))
+            separadas.append(nombre)
+        except Exception as e:
+            print(f"Error separando la partición {nombre}: {e}")
+    return separadas
+
+
+def mantener_particiones():
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": LOCK_PARTICIONES})
+        creadas = crear_particiones(db, date.today(), REGISTRO_PARTICIONES_ADELANTE)
+        separadas = separar_particiones(db, REGISTRO_RETENCION_MESES) if REGISTRO_RETENCION_MESES > 0 else []
+        db.commit()
+        if creadas:
+            print(f"Particiones de registro creadas: {', '.join(creadas)}")
+        if separadas:
+            print(f"Particiones de registro separadas: {', '.join(separadas)}")
+    except Exception as e:
+        db.rollback()
+        print(f"Error manteniendo las particiones de registro: {e}")
+    finally:
+        db.close()
+
+
+async def mantener_periodicamente():
+    while True:
+        await asyncio.to_thread(mantener_particiones)
+        await asyncio.sleep(INTERVALO_MANTENIMIENTO)
@@ -0,0 +1,146 @@
+# app/services/planes.py
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import TipoEnumIndicador
+from app.schemas.execution import EjecucionProcesoSchema, IndicadorSchema
+from app.schemas.proceso import ProcesoResponse
+from app.services.cache_procesos import cache_procesos
+from app.services.procesos import cargar_proceso
+
+
+class PlanEtapa:
+    __slots__ = ("num_etapa", "entradas", "salidas", "indicadores")
+
+    def __init__(self, num_etapa: int, entradas: frozenset, salidas: frozenset, indicadores: Dict[int, TipoEnumIndicador]):
+        self.num_etapa = num_etapa
+        self.entradas = entradas
+        self.salidas = salidas
+        self.indicadores = indicadores  # id_indicador -> tipo declarado
+
+
+class PlanEjecucion:
+    """Plan compilado de un proceso: orden de etapas, ids permitidos y tipo declarado de cada indicador."""
+
+    __slots__ = ("id_proceso", "etapas", "orden", "version")
+
+    def __init__(self, id_proceso: int, etapas: Dict[int, PlanEtapa]):
+        self.id_proceso = id_proceso
+        self.etapas = etapas
+        self.orden = {num_etapa: posicion for posicion, num_etapa in enumerate(etapas)}
+        self.version = 0
+
+
+def compilar_plan(proceso: ProcesoResponse) -> PlanEjecucion:
+    etapas = {}
+    for etapa in proceso.etapas:
+        etapas[etapa.num_etapa] = PlanEtapa(
+            num_etapa=etapa.num_etapa,
+            entradas=frozenset(entrada.id for entrada in etapa.entradas),
+            salidas=frozenset(salida.id for salida in etapa.salidas),
+            indicadores={indicador.id: TipoEnumIndicador(indicador.tipo.value) for indicador in etapa.indicadores},
+        )
+    return PlanEjecucion(proceso.id, etapas)
+
+
+def obtener_plan(db: Session, proceso_id: int) -> Optional[PlanEjecucion]:
+    """Plan de ejecución del proceso; se compila una vez y queda en caché hasta que cambie la definición."""
+    def construir():
+        proceso = cargar_proceso(db, proceso_id)
+        return compilar_plan(proceso) if proceso else None
+    return cache_procesos.obtener_plan(proceso_id, construir)
+
+
+# Indicador compilado: (tipo declarado, umbral ya interpretado)
+Compilado = Tuple[TipoEnumIndicador, object]
+
+
+def compilar_umbral(indicador: IndicadorSchema, tipo: TipoEnumIndicador):
+    """Interpreta una sola vez el umbral del indicador según su tipo declarado. Lanza ValueError si no es válido."""
+    if tipo == TipoEnumIndicador.type1:
+        if not indicador.range:
+            raise ValueError("requiere 'range'")
+        min_val, max_val = map(float, indicador.range.split("-"))
+        return (min_val, max_val)
+    if tipo == TipoEnumIndicador.type2:
+        if indicador.checkbox is None:
+            raise ValueError("requiere 'checkbox'")
+        return indicador.checkbox
+    if not indicador.criteria:
+        raise ValueError("requiere 'criteria'")
+    if "%" in indicador.criteria:
+        return ("%", float(indicador.criteria.strip("%")) / 100)
+    return ("abs", float(indicador.criteria))
+
+
+def validar_ejecucion(plan: PlanEjecucion, data: EjecucionProcesoSchema) -> Tuple[Dict[int, Dict[int, Compilado]], List[str]]:
+    """Valida la ejecución contra el plan en una sola pasada y compila los indicadores de cada etapa.
+
+    Devuelve (compilados por num_etapa, errores).
+    """
+    errores = []
+    compilados = {}
+    posicion_anterior = -1
+
+    for etapa in data.etapas:
+        plan_etapa = plan.etapas.get(etapa.num_etapa)
+        if plan_etapa is None:
+            errores.append(f"La etapa {etapa.num_etapa} no pertenece al proceso {plan.id_proceso}.")
+            continue
+        if etapa.num_etapa in compilados:
+            errores.append(f"La etapa {etapa.num_etapa} está repetida.")
+            continue
+        posicion = plan.orden[etapa.num_etapa]
+        if posicion < posicion_anterior:
+            errores.append(f"La etapa {etapa.num_etapa} está fuera del orden del proceso.")
+        posicion_anterior = max(posicion_anterior, posicion)
+
+        entradas = set()
+        for entrada in etapa.entradas:
+            if entrada.id not in plan_etapa.entradas:
+                errores.append(f"Etapa {etapa.num_etapa}: la entrada {entrada.id} no está permitida.")
+            entradas.add(entrada.id)
+        for salida in etapa.salidas:
+            if salida.id not in plan_etapa.salidas:
+                errores.append(f"Etapa {etapa.num_etapa}: la salida {salida.id} no está permitida.")
+
+        compilados_etapa = {}
+        indicadores = set()
+        for indicador in etapa.indicadores:
+            # Un segundo umbral para el mismo indicador reemplazaría al primero
+            if indicador.id in indicadores:
+                errores.append(f"Etapa {etapa.num_etapa}: el indicador {indicador.id} está repetido.")
+                continue
+            indicadores.add(indicador.id)
+            tipo = plan_etapa.indicadores.get(indicador.id)
+            if tipo is None:
+                errores.append(f"Etapa {etapa.num_etapa}: el indicador {indicador.id} no está permitido.")
+                continue
+            if indicador.entrada_id not in entradas:
+                errores.append(f"Etapa {etapa.num_etapa}: el indicador {indicador.id} evalúa una entrada ausente ({indicador.entrada_id}).")
+            try:
+                compilados_etapa[indicador.id] = (tipo, compilar_umbral(indicador, tipo))
+            except ValueError as e:
+                errores.append(f"Etapa {etapa.num_etapa}: el indicador {indicador.id} ({tipo.value}) {e}.")
+        compilados[etapa.num_etapa] = compilados_etapa
+
+    return compilados, errores
+
+
+def evaluar_compilado(compilado: Compilado, entrada_value: float) -> Tuple[float, bool]:
+    """Evalúa un indicador con su tipo declarado y su umbral ya interpretado."""
+    tipo, umbral = compilado
+    if tipo == TipoEnumIndicador.type1:
+        min_val, max_val = umbral
+        if entrada_value < min_val or entrada_value > max_val:
+            return abs(entrada_value - max(min_val, min(entrada_value, max_val))), True
+        return 0.0, False
+    if tipo == TipoEnumIndicador.type2:
+        if not umbral:  # Si es False, introduce una no conformidad aleatoria
+            return random.uniform(0, entrada_value * 0.1), True
+        return 0.0, False
+    modo, valor = umbral
+    return (entrada_value * valor if modo == "%" else valor), True
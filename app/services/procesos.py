@@ -0,0 +1,140 @@
+# app/services/procesos.py
+
+from typing import List, Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.models.models import Procesos, Etapas, Entradas, Indicadores, EtapasEntradas, EtapaIndicadores, EtapasSalidas
+from app.schemas.proceso import ProcesoCreate, ProcesoResponse
+
+proceso_table = Procesos.__table__
+etapas_table = Etapas.__table__
+entradas_table = Entradas.__table__
+indicadores_table = Indicadores.__table__
+etapas_entradas_table = EtapasEntradas.__table__
+etapas_indicadores_table = EtapaIndicadores.__table__
+etapas_salidas_table = EtapasSalidas.__table__
+
+
+
+def insertar_procesos(db: Session, procesos: List[ProcesoCreate]) -> List[int]:
+    """Inserta procesos con sus etapas y enlaces en pocas sentencias.
+
+    Procesos y etapas usan un INSERT multi-fila con RETURNING (en el mismo orden de los parámetros)
+    y los enlaces de entradas, indicadores y salidas se escriben en lotes executemany.
+    No hace commit; queda dentro de la transacción del llamador.
+    """
+    filas_procesos = [
+        {"nombre": proceso.nombre, "num_etapas": len(proceso.etapas), "descripcion": proceso.descripcion or None}
+        for proceso in procesos
+    ]
+    proceso_ids = db.execute(
+        proceso_table.insert().returning(proceso_table.c.id, sort_by_parameter_order=True), filas_procesos
+    ).scalars().all()
+
+    filas_etapas = []
+    etapas = []
+    for proceso_id, proceso in zip(proceso_ids, procesos):
+        for etapa in proceso.etapas:
+            filas_etapas.append({"num_etapa": etapa.num_etapa, "id_proceso": proceso_id})
+            etapas.append(etapa)
+    if not filas_etapas:
+        return proceso_ids
+
+    etapa_ids = db.execute(
+        etapas_table.insert().returning(etapas_table.c.id, sort_by_parameter_order=True), filas_etapas
+    ).scalars().all()
+
+    enlaces = (
+        (etapas_entradas_table, [{"id_etapa": etapa_id, "id_entrada": e.id} for etapa_id, etapa in zip(etapa_ids, etapas) for e in etapa.entradas]),
+        (etapas_indicadores_table, [{"id_etapa": etapa_id, "id_indicador_entrada": i.id} for etapa_id, etapa in zip(etapa_ids, etapas) for i in etapa.indicadores]),
+        (etapas_salidas_table, [{"id_etapa": etapa_id, "id_entrada": s.id} for etapa_id, etapa in zip(etapa_ids, etapas) for s in etapa.salidas]),
+    )
+    for tabla, filas in enlaces:
+        if filas:
+            db.execute(tabla.insert(), filas)
+
+    return proceso_ids
+
+def _items_por_proceso(db: Session, enlace, columna_enlace, catalogo, proceso_id: int):
+    """Trae todos los elementos de un tipo enlazados a las etapas de un proceso en una sola consulta."""
+    query = (
+        select(enlace.c.id_etapa, catalogo.c.id, catalogo.c.nombre, catalogo.c.tipo)
+        .join(catalogo, columna_enlace == catalogo.c.id)
+        .join(etapas_table, enlace.c.id_etapa == etapas_table.c.id)
+        .where(etapas_table.c.id_proceso == proceso_id)
+        # Orden fijo: el árbol, el ETag y la entrada elegida para cada indicador no dependen del plan de la consulta
+        .order_by(enlace.c.id_etapa, catalogo.c.id)
+    )
+    return db.execute(query).mappings().all()
+
+
+def cargar_proceso(db: Session, proceso_id: int) -> Optional[ProcesoResponse]:
+    """Carga el árbol completo de un proceso con un número constante de consultas (5), sin importar su tamaño."""
+    proceso = db.execute(proceso_table.select().where(proceso_table.c.id == proceso_id)).mappings().first()
+    if not proceso:
+        return None
+
+    etapas = db.execute(
+        etapas_table.select().where(etapas_table.c.id_proceso == proceso_id).order_by(etapas_table.c.id)
+    ).mappings().all()
+
+    # Arma las etapas en memoria, indexadas por id
+    por_etapa = {
+        etapa.id: {"id": etapa.id, "num_etapa": etapa.num_etapa, "entradas": [], "indicadores": [], "salidas": []}
+        for etapa in etapas
+    }
+
+    for row in _items_por_proceso(db, etapas_entradas_table, etapas_entradas_table.c.id_entrada, entradas_table, proceso_id):
+        por_etapa[row.id_etapa]["entradas"].append({"id": row.id, "nombre": row.nombre, "tipo": row.tipo})
+
+    for row in _items_por_proceso(db, etapas_salidas_table, etapas_salidas_table.c.id_entrada, entradas_table, proceso_id):
+        por_etapa[row.id_etapa]["salidas"].append({"id": row.id, "nombre": row.nombre, "tipo": row.tipo})
+
+    for row in _items_por_proceso(db, etapas_indicadores_table, etapas_indicadores_table.c.id_indicador_entrada, indicadores_table, proceso_id):
+        etapa = por_etapa[row.id_etapa]
+        # etapa_indicadores no guarda la entrada evaluada; se mantiene la última entrada de la etapa como antes
+        entrada_id = etapa["entradas"][-1]["id"] if etapa["entradas"] else 0
+        etapa["indicadores"].append({"id": row.id, "nombre": row.nombre, "tipo": row.tipo, "entrada_id": entrada_id})
+
+    return ProcesoResponse.model_validate({
+        "id": proceso.id,
+        "nombre": proceso.nombre,
+        "num_etapas": len(etapas),
+        "etapas": list(por_etapa.values()),
+    })
+
+
+def _conteo_por_proceso(enlace=None):
+    """Subconsulta (id_proceso, total) agrupada; cuenta etapas o los enlaces de sus etapas."""
+    if enlace is None:
+        query = select(etapas_table.c.id_proceso, func.count().label("total"))
+    else:
+        query = select(etapas_table.c.id_proceso, func.count().label("total")).select_from(
+            enlace.join(etapas_table, enlace.c.id_etapa == etapas_table.c.id)
+        )
+    return query.group_by(etapas_table.c.id_proceso).subquery()
+
+
+def query_catalogo_procesos():
+    """Listado de procesos con sus conteos en una sola consulta (subconsultas agrupadas + LEFT JOIN)."""
+    etapas = _conteo_por_proceso()
+    entradas = _conteo_por_proceso(etapas_entradas_table)
+    indicadores = _conteo_por_proceso(etapas_indicadores_table)
+    salidas = _conteo_por_proceso(etapas_salidas_table)
+
+    return select(
+        proceso_table.c.id,
+        proceso_table.c.descripcion,
+        proceso_table.c.nombre,
+        func.coalesce(etapas.c.total, 0).label("num_etapas"),
+        func.coalesce(entradas.c.total, 0).label("num_entradas"),
+        func.coalesce(salidas.c.total, 0).label("num_salidas"),
+        func.coalesce(indicadores.c.total, 0).label("num_indicadores"),
+        func.count().over().label("total"),  # Total de procesos antes de paginar
+    ).select_from(
+        proceso_table
+        .outerjoin(etapas, etapas.c.id_proceso == proceso_table.c.id)
+        .outerjoin(entradas, entradas.c.id_proceso == proceso_table.c.id)
+        .outerjoin(indicadores, indicadores.c.id_proceso == proceso_table.c.id)
+        .outerjoin(salidas, salidas.c.id_proceso == proceso_table.c.id)
+    )
@@ -0,0 +1,264 @@
+# app/services/reportes.py
+
+import asyncio
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import REPORTES_DIR, REPORTES_WORKERS, REPORTES_MAX_PENDIENTES, REPORTES_TIMEOUT, REPORTES_RETENCION_MIN
+from app.services.cache_pdf import cache_pdf
+from app.services.documentos import FORMATO_DIR
+
+# Recursos compartidos por los documentos (logo.jpeg) se buscan en la raíz del proyecto
+RAIZ_PROYECTO = os.path.abspath(os.getcwd())
+ARCHIVO_TEX = "documento.tex"
+ID_VALIDO = re.compile(r"^[0-9a-f]{32}$")
+INTERVALO_LIMPIEZA = 300
+
+
+class ErrorCompilacion(Exception):
+    pass
+
+
+async def compilar(directorio: str, archivo_tex: str = ARCHIVO_TEX, timeout: int = REPORTES_TIMEOUT) -> str:
+    """Compila `archivo_tex` con pdflatex dentro de `directorio` sin bloquear el event loop. Devuelve la ruta del PDF."""
+    directorio = os.path.abspath(directorio)
+    entorno = dict(
+        os.environ,
+        TEXINPUTS=f"{directorio}{os.pathsep}{RAIZ_PROYECTO}{os.pathsep}",
+        # Formato precompilado (%&reporte en la primera línea) y fechas fijas para un PDF reproducible
+        TEXFORMATS=f"{FORMATO_DIR}{os.pathsep}",
+        SOURCE_DATE_EPOCH="0",
+        FORCE_SOURCE_DATE="1",
+    )
+    proceso = await asyncio.create_subprocess_exec(
+        "pdflatex", "-interaction=batchmode", "-halt-on-error", archivo_tex,
+        cwd=directorio, env=entorno, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proceso.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proceso.kill()
+        await proceso.wait()
+        raise ErrorCompilacion(f"pdflatex superó el tiempo límite de {timeout} s")
+
+    pdf = os.path.join(directorio, os.path.splitext(archivo_tex)[0] + ".pdf")
+    if proceso.returncode != 0 or not os.path.exists(pdf):
+        raise ErrorCompilacion(_ultimo_error(directorio, archivo_tex) or stderr.decode(errors="replace") or "pdflatex falló")
+    return pdf
+
+
+def _ultimo_error(directorio: str, archivo_tex: str) -> Optional[str]:
+    # En batchmode los errores solo quedan en el .log; las líneas de error empiezan con "!"
+    log = os.path.join(directorio, os.path.splitext(archivo_tex)[0] + ".log")
+    try:
+        with open(log, encoding="utf-8", errors="replace") as f:
+            errores = [linea.strip() for linea in f if linea.startswith("!")]
+    except OSError:
+        return None
+    return errores[0] if errores else None
+
+
+class Trabajo:
+    """Un reporte en generación: su directorio de trabajo aislado, estado, avance y resultado."""
+
+    __slots__ = ("id", "directorio", "clave", "estado", "creado", "terminado", "error", "progreso", "listo")
+
+    def __init__(self, id_: str, directorio: str, listo: Optional[asyncio.Event] = None):
+        self.id = id_
+        self.directorio = directorio
+        self.clave: Optional[str] = None  # Clave de contenido en la caché de PDFs
+        self.estado = "pendiente"
+        self.creado = time.time()
+        self.terminado: Optional[float] = None
+        self.error: Optional[str] = None
+        self.progreso = {"filas": 0, "total": None}  # Filas escritas en el .tex (se actualiza desde el hilo que lo genera)
+        # Solo los trabajos de este worker tienen evento; los reconstruidos desde disco (a veces en un hilo
+        # del threadpool, sin event loop) ya terminaron
+        self.listo = listo
+
+    @property
+    def tex(self) -> str:
+        return os.path.join(self.directorio, ARCHIVO_TEX)
+
+    @property
+    def pdf(self) -> str:
+        return os.path.join(self.directorio, "documento.pdf")
+
+    def resumen(self) -> dict:
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "creado": self.creado,
+            "terminado": self.terminado,
+            "progreso": dict(self.progreso),
+            "error": self.error,
+            "etag": f'"{self.clave}"' if self.clave else None,
+            "descarga": f"/latex/jobs/{self.id}/pdf" if self.estado == "listo" else None,
+        }
+
+
+# Genera el .tex del trabajo (en un hilo) y devuelve su clave de contenido, o None si no se cachea
+Preparar = Callable[[Trabajo], Optional[str]]
+
+
+def enlazar(origen: str, destino: str):
+    # Enlace duro cuando es posible: el PDF no se copia y sobrevive aunque la caché lo descarte
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copyfile(origen, destino)
+
+
+class ColaReportes:
+    """Cola de trabajos de pdflatex con un máximo de compilaciones simultáneas.
+
+    Cada trabajo usa su propio directorio, así que los reportes concurrentes no se pisan.
+    El .tex se genera en un hilo; si su clave ya está en la caché (o la está compilando otro
+    trabajo) no se vuelve a compilar. El estado vive en memoria del worker; el PDF en disco,
+    por lo que la descarga funciona desde cualquier worker que comparta REPORTES_DIR.
+    """
+
+    def __init__(self, directorio: str, workers: int, max_pendientes: int, retencion_min: int):
+        self.directorio = directorio
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.retencion = retencion_min * 60
+        self.trabajos: Dict[str, Trabajo] = {}
+        self.en_curso: Dict[str, Trabajo] = {}  # Clave de contenido -> trabajo que la está compilando
+        self.tareas = set()
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self.completados = 0
+        self.desde_cache = 0
+        self.fallidos = 0
+        self.rechazados = 0
+
+    @property
+    def semaforo(self) -> asyncio.Semaphore:
+        # Se crea dentro del loop del servidor
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.workers)
+        return self._semaforo
+
+    def pendientes(self) -> int:
+        return sum(1 for trabajo in self.trabajos.values() if trabajo.estado in ("pendiente", "generando", "compilando"))
+
+    def crear(self) -> Trabajo:
+        """Reserva un trabajo con su directorio vacío; 503 si la cola está llena."""
+        if self.pendientes() >= self.max_pendientes:
+            self.rechazados += 1
+            raise HTTPException(status_code=503, detail="Hay demasiados reportes en cola, intente de nuevo", headers={"Retry-After": "5"})
+        id_ = uuid.uuid4().hex
+        directorio = os.path.join(self.directorio, id_)
+        os.makedirs(directorio)
+        trabajo = Trabajo(id_, directorio, asyncio.Event())
+        self.trabajos[id_] = trabajo
+        return trabajo
+
+    def descartar(self, trabajo: Trabajo):
+        """Elimina un trabajo que no llegó a encolarse (por ejemplo, una subida rechazada)."""
+        self.trabajos.pop(trabajo.id, None)
+        shutil.rmtree(trabajo.directorio, ignore_errors=True)
+
+    def enviar(self, trabajo: Trabajo, preparar: Optional[Preparar] = None):
+        """Encola el trabajo. Sin `preparar`, el .tex ya debe estar en el directorio del trabajo."""
+        tarea = asyncio.create_task(self._ejecutar(trabajo, preparar))
+        self.tareas.add(tarea)
+        tarea.add_done_callback(self.tareas.discard)
+
+    async def _desde_cache(self, trabajo: Trabajo) -> bool:
+        otro = self.en_curso.get(trabajo.clave)
+        if otro is not None and otro is not trabajo:
+            await otro.listo.wait()
+        pdf = cache_pdf.obtener(trabajo.clave)
+        if pdf is None:
+            self.en_curso[trabajo.clave] = trabajo
+            return False
+        enlazar(pdf, trabajo.pdf)
+        return True
+
+    async def _ejecutar(self, trabajo: Trabajo, preparar: Optional[Preparar]):
+        try:
+            if preparar is not None:
+                trabajo.estado = "generando"
+                trabajo.clave = await asyncio.to_thread(preparar, trabajo)
+            if trabajo.clave and await self._desde_cache(trabajo):
+                self.desde_cache += 1
+            else:
+                async with self.semaforo:
+                    trabajo.estado = "compilando"
+                    await compilar(trabajo.directorio)
+                if trabajo.clave:
+                    await asyncio.to_thread(cache_pdf.guardar, trabajo.clave, trabajo.pdf)
+                self.completados += 1
+            trabajo.estado = "listo"
+        except Exception as e:
+            print(f"Error generando el reporte {trabajo.id}: {e}")
+            trabajo.estado = "error"
+            trabajo.error = str(e)
+            self.fallidos += 1
+        finally:
+            if trabajo.clave and self.en_curso.get(trabajo.clave) is trabajo:
+                del self.en_curso[trabajo.clave]
+            trabajo.terminado = time.time()
+            trabajo.listo.set()
+
+    async def esperar(self, trabajo: Trabajo) -> Trabajo:
+        if trabajo.listo is not None:
+            await trabajo.listo.wait()
+        return trabajo
+
+    def obtener(self, id_: str) -> Trabajo:
+        if not ID_VALIDO.match(id_):
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+        trabajo = self.trabajos.get(id_)
+        if trabajo is None:
+            # Trabajo de otro worker (o anterior a un reinicio): solo se conoce su resultado en disco
+            directorio = os.path.join(self.directorio, id_)
+            if not os.path.isdir(directorio):
+                raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+            trabajo = Trabajo(id_, directorio)
+            trabajo.estado = "listo" if os.path.exists(trabajo.pdf) else "desconocido"
+        return trabajo
+
+    def limpiar(self):
+        """Borra los trabajos terminados (y directorios huérfanos) más antiguos que la retención."""
+        limite = time.time() - self.retencion
+        for id_, trabajo in list(self.trabajos.items()):
+            if trabajo.terminado is not None and trabajo.terminado < limite:
+                del self.trabajos[id_]
+                shutil.rmtree(trabajo.directorio, ignore_errors=True)
+        if not os.path.isdir(self.directorio):
+            return
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if nombre not in self.trabajos and ID_VALIDO.match(nombre) and os.path.getmtime(ruta) < limite:
+                shutil.rmtree(ruta, ignore_errors=True)
+
+    async def limpiar_periodicamente(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.limpiar)
+            except Exception as e:
+                print(f"Error limpiando trabajos de reportes: {e}")
+            await asyncio.sleep(INTERVALO_LIMPIEZA)
+
+    def estadisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pendientes": self.pendientes(),
+            "max_pendientes": self.max_pendientes,
+            "trabajos": len(self.trabajos),
+            "completados": self.completados,
+            "desde_cache": self.desde_cache,
+            "fallidos": self.fallidos,
+            "rechazados": self.rechazados,
+        }
+
+
+cola_reportes = ColaReportes(REPORTES_DIR, REPORTES_WORKERS, REPORTES_MAX_PENDIENTES, REPORTES_RETENCION_MIN)
@@ -1,10 +1,87 @@
 # app/utils/crypto.py
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from bcrypt import hashpw, gensalt, checkpw
+from fastapi import HTTPException
+
+from app.config import BCRYPT_ROUNDS, HASH_WORKERS, HASH_QUEUE_MAX
 
-def hash_password(password: str) -> str:
-    salt = gensalt()
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    salt = gensalt(rounds=rounds)
     return hashpw(password.encode(), salt).decode()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return checkpw(plain_password.encode(), hashed_password.encode())
+
+def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    # Formato bcrypt: $2b$<costo>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+
+class PoolHash:
+    """Ejecutor dedicado y acotado para bcrypt.
+
+    bcrypt libera el GIL, así que los hilos trabajan en paralelo sin bloquear el event loop.
+    Si ya hay `max_cola` operaciones esperando, se responde 503 en lugar de acumular latencia.
+    """
+
+    def __init__(self, workers: int, max_cola: int):
+        self.workers = workers
+        self.max_cola = max_cola
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.pendientes = 0
+        self.max_pendientes = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.espera_total = 0.0
+        self.duracion_total = 0.0
+
+    async def ejecutar(self, funcion, *args):
+        if self.pendientes >= self.workers + self.max_cola:
+            self.rechazados += 1
+            raise HTTPException(status_code=503, detail="Servidor ocupado, intente de nuevo", headers={"Retry-After": "1"})
+        self.pendientes += 1
+        self.max_pendientes = max(self.max_pendientes, self.pendientes)
+        encolado = time.perf_counter()
+
+        def medir():
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args)
+            finally:
+                self.espera_total += inicio - encolado
+                self.duracion_total += time.perf_counter() - inicio
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, medir)
+        finally:
+            self.pendientes -= 1
+            self.completados += 1
+
+    def estadisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_cola": self.max_cola,
+            "rounds": BCRYPT_ROUNDS,
+            "pendientes": self.pendientes,
+            "max_pendientes": self.max_pendientes,
+            "completados": self.completados,
+            "rechazados": self.rechazados,
+            "espera_media_ms": self.espera_total / self.completados * 1000 if self.completados else 0.0,
+            "duracion_media_ms": self.duracion_total / self.completados * 1000 if self.completados else 0.0,
+        }
+
+
+pool_hash = PoolHash(HASH_WORKERS, HASH_QUEUE_MAX)
+
+async def hash_password_async(password: str) -> str:
+    return await pool_hash.ejecutar(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await pool_hash.ejecutar(verify_password, plain_password, hashed_password)
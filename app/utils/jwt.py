@@ -1,8 +1,11 @@
 # app/utils/jwt.py
 
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import JWTError, jwt
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -16,3 +19,48 @@ def verify_token(token: str):
         return payload
     except JWTError:
         return None
+
+
+class CacheTokens:
+    """LRU de token -> claims ya verificados. Cada entrada vence en el `exp` del token (o antes, por TTL)."""
+
+    def __init__(self, max_tokens: int, ttl: int):
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self.tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def verificar(self, token: str) -> Optional[dict]:
+        ahora = time.time()
+        guardado = self.tokens.get(token)
+        if guardado is not None:
+            claims, vence = guardado
+            if ahora < vence:
+                self.aciertos += 1
+                self.tokens.move_to_end(token)
+                return claims
+            del self.tokens[token]
+
+        self.fallos += 1
+        payload = verify_token(token)
+        if payload is None:
+            return None
+        vence = min(float(payload.get("exp", ahora)), ahora + self.ttl)
+        if vence > ahora:
+            self.tokens[token] = (payload, vence)
+            if len(self.tokens) > self.max_tokens:
+                self.tokens.popitem(last=False)
+        return payload
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "tokens": len(self.tokens),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+        }
+
+
+cache_tokens = CacheTokens(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
@@ -0,0 +1,57 @@
+# app/utils/serializacion.py
+
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+class RespuestaJSON(Response):
+    """Respuesta JSON serializada con orjson. Acepta bytes ya serializados sin volver a procesarlos."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+_adaptadores = {}
+
+
+def adaptador_lista(modelo: Type[BaseModel]) -> TypeAdapter:
+    # Los TypeAdapter se construyen una sola vez por modelo
+    if modelo not in _adaptadores:
+        _adaptadores[modelo] = TypeAdapter(List[modelo])
+    return _adaptadores[modelo]
+
+
+def respuesta_lista(modelo: Type[BaseModel], rows: Iterable[Any]) -> RespuestaJSON:
+    """Valida el resultado completo de una consulta de una sola vez y lo serializa directo a bytes.
+
+    Al devolver una Response, FastAPI no vuelve a validar ni serializar contra `response_model`
+    (que se mantiene en la ruta solo para la documentación OpenAPI).
+    """
+    adaptador = adaptador_lista(modelo)
+    modelos = adaptador.validate_python(rows if isinstance(rows, list) else list(rows))
+    return RespuestaJSON(adaptador.dump_json(modelos, by_alias=True))
+
+
+def etag_coincide(request: Request, etag: str) -> bool:
+    """Indica si el ETag está en el encabezado If-None-Match de la petición (acepta listas y W/)."""
+    encabezado = request.headers.get("if-none-match")
+    if not encabezado:
+        return False
+    candidatos = [valor.strip().removeprefix("W/") for valor in encabezado.split(",")]
+    return "*" in candidatos or etag in candidatos
+
+
+def respuesta_con_etag(request: Request, contenido: bytes, etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Devuelve el JSON ya serializado con su ETag, o un 304 vacío si el cliente ya tiene esa versión."""
+    encabezados = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_coincide(request, etag):
+        return Response(status_code=304, headers=encabezados)
+    return RespuestaJSON(contenido, headers=encabezados)
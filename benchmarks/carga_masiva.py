@@ -0,0 +1,83 @@
+# benchmarks/carga_masiva.py
+#
+# Compara crear N indicadores de dos formas:
+#   - uno por uno: el handler de POST /indicators/ por fila (INSERT, commit y auditoría en su propio commit)
+#   - en lote: POST /indicators/bulk (INSERT multi-fila y auditoría en lote en una sola transacción)
+# Las filas creadas y sus registros de auditoría se borran al terminar cada escenario.
+#
+# Requiere la base de datos configurada en .env y un usuario con id 0 (el que usa la auditoría por defecto).
+# Uso: python -m benchmarks.carga_masiva [filas]
+
+import asyncio
+import sys
+import time
+import uuid
+
+from app.api.v1 import indicators
+from app.db.database import SessionLocal
+from app.models.models import Registro, RegistroIndicadores, RegistroIndice
+from app.schemas.indicator import Indicator
+
+registro_table = Registro.__table__
+registro_indicadores_table = RegistroIndicadores.__table__
+registro_indice_table = RegistroIndice.__table__
+
+
+def filas_de_prueba(prefijo: str, cantidad: int):
+    return [{"nombre": f"{prefijo}-{i}", "tipo": "range", "descripcion": "benchmark carga masiva"} for i in range(cantidad)]
+
+
+async def uno_por_uno(db, filas):
+    for fila in filas:
+        await indicators.create_indicator(Indicator.model_validate({"id": None, **fila}), db=db)
+
+
+async def en_lote(db, filas):
+    respuesta = await indicators.create_indicadores_bulk(filas, todo_o_nada=True, db=db)
+    assert respuesta["errores"] == 0, respuesta
+
+
+def limpiar(db, prefijo: str):
+    tabla = indicators.indicators
+    ids = db.execute(tabla.select().with_only_columns(tabla.c.id).where(tabla.c.nombre.like(f"{prefijo}-%"))).scalars().all()
+    if not ids:
+        return
+    registros = db.execute(
+        registro_indicadores_table.select().with_only_columns(registro_indicadores_table.c.id_registro)
+        .where(registro_indicadores_table.c.id_indicador.in_(ids))
+    ).scalars().all()
+    db.execute(registro_indice_table.delete().where(registro_indice_table.c.id_registro.in_(registros)))
+    db.execute(registro_indicadores_table.delete().where(registro_indicadores_table.c.id_indicador.in_(ids)))
+    db.execute(registro_table.delete().where(registro_table.c.id.in_(registros)))
+    db.execute(tabla.delete().where(tabla.c.id.in_(ids)))
+    db.commit()
+
+
+async def escenario(nombre: str, crear, cantidad: int) -> float:
+    prefijo = f"bench-{uuid.uuid4().hex[:8]}"
+    filas = filas_de_prueba(prefijo, cantidad)
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        await crear(db, filas)
+        total = time.perf_counter() - inicio
+        print(f"{nombre:>12}: {total * 1000:9.1f} ms | {cantidad / total:9.1f} filas/s")
+        return total
+    finally:
+        db.rollback()
+        limpiar(db, prefijo)
+        db.close()
+
+
+async def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"{cantidad} indicadores")
+    # Calienta la conexión y las sentencias antes de medir
+    await escenario("calentamiento", en_lote, 10)
+    lento = await escenario("uno por uno", uno_por_uno, cantidad)
+    rapido = await escenario("en lote", en_lote, cantidad)
+    print(f"en lote es {lento / rapido:.1f}x más rápido")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+# benchmarks/consultas_async.py
+#
+# Lanza N "peticiones" concurrentes que hacen una consulta lenta (SELECT pg_sleep) y mide el throughput:
+#   - sync: Session de psycopg2 dentro de un handler async (cada consulta bloquea el event loop)
+#   - async: AsyncSession de asyncpg con distintos tamaños de pool
+# Con la sesión síncrona el throughput queda en ~1/espera por worker; con la asíncrona crece con el pool.
+#
+# Requiere la base de datos configurada en .env.
+# Uso: python -m benchmarks.consultas_async [peticiones] [espera_ms] [pools separados por coma]
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.database import SessionLocal, async_engine
+
+INTERVALO = 0.01
+
+
+async def medir_latencias(detener: asyncio.Event):
+    latencias = []
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO)
+        latencias.append(time.perf_counter() - inicio - INTERVALO)
+    return latencias
+
+
+async def peticion_sync(espera: float, _sesiones=None):
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT pg_sleep(:espera)"), {"espera": espera})
+    finally:
+        db.close()
+
+
+async def peticion_async(espera: float, sesiones):
+    async with sesiones() as db:
+        await db.execute(text("SELECT pg_sleep(:espera)"), {"espera": espera})
+
+
+async def escenario(peticion, peticiones: int, espera: float, sesiones=None):
+    detener = asyncio.Event()
+    sonda = asyncio.create_task(medir_latencias(detener))
+    await asyncio.sleep(INTERVALO * 2)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(peticion(espera, sesiones) for _ in range(peticiones)))
+    total = time.perf_counter() - inicio
+    detener.set()
+    latencias = sorted(await sonda)
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] if latencias else 0.0
+    return peticiones / total, p99 * 1000
+
+
+async def main():
+    peticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    espera = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    pools = [int(p) for p in sys.argv[3].split(",")] if len(sys.argv) > 3 else [1, 5, 10, 20]
+    print(f"{peticiones} peticiones concurrentes, consulta de {espera * 1000:.0f} ms")
+
+    por_segundo, p99 = await escenario(peticion_sync, peticiones, espera)
+    print(f"{'sync':>12}: {por_segundo:7.1f} peticiones/s | latencia del event loop p99 {p99:8.1f} ms")
+
+    for pool in pools:
+        motor = create_async_engine(async_engine.url, pool_size=pool, max_overflow=0)
+        sesiones = async_sessionmaker(bind=motor)
+        # Calienta el pool para no medir el costo de abrir conexiones
+        await asyncio.gather(*(peticion_async(0, sesiones) for _ in range(pool)))
+        por_segundo, p99 = await escenario(peticion_async, peticiones, espera, sesiones)
+        print(f"{f'async pool={pool}':>12}: {por_segundo:7.1f} peticiones/s | latencia del event loop p99 {p99:8.1f} ms")
+        await motor.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
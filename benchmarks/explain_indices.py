@@ -0,0 +1,119 @@
+# benchmarks/explain_indices.py
+#
+# Ejecuta las funciones de los endpoints más usados contra la base de datos, captura el SQL que envían
+# y corre EXPLAIN sobre cada sentencia para confirmar qué índices usan y qué tablas recorren completas.
+# Las escrituras (UPSERT de materiales) se hacen dentro de una transacción que se revierte.
+#
+# En una base de desarrollo con pocas filas el planificador prefiere Seq Scan aunque exista el índice;
+# con --forzar se desactiva enable_seqscan para comprobar que el índice es utilizable.
+#
+# Requiere la base de datos configurada en .env y las migraciones aplicadas (alembic upgrade head).
+# Uso: python -m benchmarks.explain_indices [--forzar]
+
+import asyncio
+import json
+import sys
+from typing import List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, text
+
+from app.api.v1 import execution, logs
+from app.db.database import AsyncSessionLocal, async_engine
+from app.models.models import TipoEnumEntidad
+from app.schemas.execution import MaterialSchema
+from app.services.procesos import cargar_proceso
+
+
+class Captura:
+    """Guarda las sentencias SELECT/INSERT que pasan por el motor mientras está activa."""
+
+    def __init__(self):
+        self.activa = False
+        self.sentencias: List[Tuple[str, object]] = []
+
+    def __call__(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        if self.activa and sentencia.lstrip().upper().startswith(("SELECT", "INSERT", "WITH")):
+            self.sentencias.append((sentencia, parametros))
+
+
+def recorrer(nodo: dict, indices: set, secuenciales: set):
+    if nodo.get("Index Name"):
+        indices.add(nodo["Index Name"])
+    if nodo.get("Node Type") == "Seq Scan":
+        secuenciales.add(nodo.get("Relation Name"))
+    for arbitro in nodo.get("Conflict Arbiter Indexes", []):
+        indices.add(f"{arbitro} (ON CONFLICT)")
+    for hijo in nodo.get("Plans", []):
+        recorrer(hijo, indices, secuenciales)
+
+
+async def explicar(db, sentencia: str, parametros) -> Tuple[set, set]:
+    conexion = await db.connection()
+    resultado = await conexion.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sentencia}", parametros)
+    plan = resultado.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    indices, secuenciales = set(), set()
+    recorrer(plan[0]["Plan"], indices, secuenciales)
+    return indices, secuenciales
+
+
+async def muestra(db, consulta: str, defecto: int = 1) -> int:
+    valor = (await db.execute(text(consulta))).scalar()
+    return valor if valor is not None else defecto
+
+
+async def main():
+    forzar = "--forzar" in sys.argv
+    captura = Captura()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", captura)
+
+    async with AsyncSessionLocal() as db:
+        id_proceso = await muestra(db, "SELECT id_proceso FROM etapas ORDER BY id DESC LIMIT 1")
+        id_usuario = await muestra(db, "SELECT id_usuario FROM registro ORDER BY creado DESC LIMIT 1", 0)
+        id_entrada = await muestra(db, "SELECT id FROM entradas LIMIT 1")
+        await db.rollback()
+
+    # (endpoint, corrutina que ejecuta sus consultas con la sesión)
+    endpoints = [
+        ("GET /process/{id} (árbol del proceso)", lambda db: db.run_sync(cargar_proceso, id_proceso)),
+        ("GET /logs/latest/executed/{size}", lambda db: logs.obtener_ultimos_procesos_ejecutados(size=20, db=db)),
+        ("GET /logs/latest/executed/definition/{size}", lambda db: logs.obtener_ultimos_procesos(size=20, db=db)),
+        ("GET /logs/latest/{size}", lambda db: logs.obtener_ultimos_registros(size=20, db=db)),
+        ("GET /logs/search/users/?id_usuario", lambda db: logs.search_registros_por_usuario(id_usuario=id_usuario, db=db)),
+        ("GET /logs/search/process/executed?id_proceso", lambda db: logs.search_procesos_ejecutados(id_proceso=id_proceso, db=db)),
+        ("GET /logs/timeline/{tipo}/{id}", lambda db: logs.obtener_historial_entidad(TipoEnumEntidad.proceso, id_proceso, db=db)),
+        ("POST /execution (materiales)", lambda db: execution.actualizar_materiales(db, [MaterialSchema(id=id_entrada, value=1)], True)),
+    ]
+
+    for nombre, ejecutar in endpoints:
+        async with AsyncSessionLocal() as db:
+            await db.begin()
+            captura.sentencias = []
+            captura.activa = True
+            try:
+                await ejecutar(db)
+            except HTTPException:
+                pass  # Sin filas para los ids de muestra; las sentencias ya se capturaron
+            finally:
+                captura.activa = False
+            await db.rollback()
+
+            await db.begin()
+            if forzar:
+                await db.execute(text("SET LOCAL enable_seqscan = off"))
+            print(f"\n{nombre}")
+            for sentencia, parametros in captura.sentencias:
+                indices, secuenciales = await explicar(db, sentencia, parametros)
+                resumen = " ".join(sentencia.split())[:110]
+                print(f"  {resumen}")
+                print(f"    índices: {', '.join(sorted(indices)) or '-'}")
+                if secuenciales:
+                    print(f"    Seq Scan: {', '.join(sorted(secuenciales))}")
+            await db.rollback()
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
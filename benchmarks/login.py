@@ -0,0 +1,62 @@
+# benchmarks/login.py
+#
+# Simula una ráfaga de logins (verificación bcrypt) mientras otra tarea atiende "peticiones" ligeras
+# cada 10 ms, y mide la latencia de esas peticiones:
+#   - actual: checkpw síncrono dentro del handler async (bloquea el event loop)
+#   - pool: verify_password_async sobre el ejecutor dedicado y acotado
+#
+# Uso: python -m benchmarks.login [logins] [rounds]
+
+import asyncio
+import sys
+import time
+
+from app.utils.crypto import hash_password, pool_hash, verify_password, verify_password_async
+
+INTERVALO = 0.01
+
+
+async def medir_latencias(detener: asyncio.Event):
+    latencias = []
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO)
+        latencias.append(time.perf_counter() - inicio - INTERVALO)
+    return latencias
+
+
+async def login_actual(password: str, hashed: str):
+    return verify_password(password, hashed)
+
+
+async def login_pool(password: str, hashed: str):
+    return await verify_password_async(password, hashed)
+
+
+async def escenario(login, logins: int, hashed: str):
+    detener = asyncio.Event()
+    sonda = asyncio.create_task(medir_latencias(detener))
+    await asyncio.sleep(INTERVALO * 2)
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(login("secreto", hashed) for _ in range(logins)))
+    total = time.perf_counter() - inicio
+    detener.set()
+    latencias = sorted(await sonda)
+    assert all(resultados)
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] if latencias else 0.0
+    return logins / total, p99 * 1000, latencias[-1] * 1000 if latencias else 0.0
+
+
+async def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    hashed = hash_password("secreto", rounds=rounds)
+    print(f"{logins} logins, bcrypt rounds={rounds}, workers={pool_hash.workers}")
+    for nombre, login in (("actual", login_actual), ("pool", login_pool)):
+        por_segundo, p99, maximo = await escenario(login, logins, hashed)
+        print(f"{nombre:>7}: {por_segundo:7.1f} logins/s | latencia de otras peticiones p99 {p99:8.1f} ms, máx {maximo:8.1f} ms")
+    print(pool_hash.estadisticas())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+# benchmarks/resend_local.py
+#
+# Servidor local que imita POST /emails de Resend para probar la bandeja de salida sin enviar correos reales.
+# Guarda los correos recibidos en memoria (GET /emails los lista) y puede simular fallas:
+#   FALLAR_CADA=n  responde 503 a una de cada n peticiones (0 = nunca)
+#   LIMITAR_CADA=n responde 429 a una de cada n peticiones (0 = nunca)
+#
+# Uso: uvicorn benchmarks.resend_local:app --port 8025
+#      RESEND_BASE_URL=http://localhost:8025 uvicorn app.main:app
+
+import itertools
+import os
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FALLAR_CADA = int(os.getenv("FALLAR_CADA", "0"))
+LIMITAR_CADA = int(os.getenv("LIMITAR_CADA", "0"))
+
+app = FastAPI(title="Resend local")
+contador = itertools.count(1)
+recibidos = []
+
+
+@app.post("/emails")
+async def enviar(request: Request):
+    numero = next(contador)
+    if FALLAR_CADA and numero % FALLAR_CADA == 0:
+        return JSONResponse({"message": "Falla simulada"}, status_code=503)
+    if LIMITAR_CADA and numero % LIMITAR_CADA == 0:
+        return JSONResponse({"message": "Too many requests"}, status_code=429)
+    correo = await request.json()
+    if not correo.get("to") or not correo.get("from"):
+        return JSONResponse({"message": "Faltan 'from' o 'to'"}, status_code=422)
+    id_ = str(uuid.uuid4())
+    recibidos.append({
+        "id": id_,
+        "to": correo["to"],
+        "subject": correo.get("subject"),
+        "adjuntos": [(a.get("filename"), len(a.get("content", ""))) for a in correo.get("attachments", [])],
+    })
+    return {"id": id_}
+
+
+@app.get("/emails")
+async def listar():
+    return recibidos
@@ -0,0 +1,75 @@
+# benchmarks/serializacion.py
+#
+# Compara el costo por fila de serializar una respuesta de 10k registros:
+#   - actual: model_validate fila por fila + validación/serialización de FastAPI contra response_model
+#   - rápido: TypeAdapter sobre el resultado completo + dump_json directo a bytes
+#
+# Uso: python -m benchmarks.serializacion [filas]
+
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.schemas.log import RegistroRead
+from app.utils.serializacion import respuesta_lista
+
+REPETICIONES = 5
+
+
+def generar_filas(n: int):
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "id_usuario": i % 20,
+            "descripcion": f"CREACION DE ENTRADA \"Material {i}\"",
+            "creado": base + timedelta(seconds=i),
+            "modificado": base + timedelta(seconds=i),
+            "id_entrada": i % 500,
+        }
+        for i in range(n)
+    ]
+
+
+def camino_actual(filas, campo):
+    registros = [RegistroRead.model_validate(row) for row in filas]
+    contenido = asyncio.run(serialize_response(field=campo, response_content=registros))
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def camino_rapido(filas, _campo):
+    return respuesta_lista(RegistroRead, filas).body
+
+
+def medir(nombre, funcion, filas, campo):
+    mejor = float("inf")
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(filas, campo)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    print(f"{nombre:<8} total {mejor * 1000:8.2f} ms   por fila {mejor / len(filas) * 1e6:6.2f} µs")
+    return mejor
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    filas = generar_filas(n)
+    campo = create_model_field(name="Response_bench", type_=List[RegistroRead], mode="serialization")
+
+    # Ambos caminos deben producir el mismo JSON
+    assert json.loads(camino_actual(filas, campo)) == json.loads(camino_rapido(filas, campo))
+
+    print(f"Serialización de {n} registros (mejor de {REPETICIONES})")
+    actual = medir("actual", camino_actual, filas, campo)
+    rapido = medir("rápido", camino_rapido, filas, campo)
+    print(f"Mejora: {actual / rapido:.1f}x")
+
+
+if __name__ == "__main__":
+    main()